@@ -5,17 +5,26 @@ from routes.auth_routes import auth
 from routes.community_routes import community
 from routes.events_routes import events
 from routes.me_routes import me
+from routes.search_routes import search
+from utils import db_helper, identity, json_provider, metrics, scheduler, slow_queries
 
 app = Flask(__name__)
+json_provider.init_app(app)
 CORS(app)
 
 app.config['JWT_SECRET_KEY'] = 'mindset-app-tyshii'
 jwt = JWTManager(app)
+identity.init_jwt(jwt)
+db_helper.init_app(app)
+metrics.init_app(app)
+slow_queries.init_app(app)
+scheduler.init_app(app)
 
 app.register_blueprint(auth, url_prefix='/auth')
 app.register_blueprint(community, url_prefix='/community')
 app.register_blueprint(events, url_prefix='/events')
 app.register_blueprint(me, url_prefix='/me')
+app.register_blueprint(search, url_prefix='/search')
 
 if __name__ == '__main__':
     app.run(debug=True, host="0.0.0.0", port=1345, use_reloader=True)
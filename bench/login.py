@@ -0,0 +1,110 @@
+"""Login throughput, and how much a login burst slows other endpoints.
+
+    python -m bench.login --login-clients 16 --seconds 10
+    python -m bench.login --inline        # hash on the request thread, as before
+
+Needs a database seeded with `python -m bench.seed`. First measures a probe
+endpoint (a channel's posts) on its own, then again while login clients
+hammer /auth/login. Reports login throughput/latency, 503s from backpressure,
+and the probe's p50/p95/p99 in both phases.
+"""
+import argparse
+import random
+import threading
+import time
+
+from flask_jwt_extended import create_access_token
+
+from app import app
+from bench.run import _dataset, _percentile
+from bench.seed import PASSWORD
+from utils.identity import token_claims
+from utils.passwords import hasher
+
+
+def _loop(fn, stop, latencies, statuses, lock, seed):
+    rng = random.Random(seed)
+    client = app.test_client()
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = fn(client, rng)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+def _summary(latencies, statuses, seconds):
+    latencies = sorted(latencies)
+    ms = lambda v: round(v * 1000, 2) if v is not None else None
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / seconds, 1),
+        'p50_ms': ms(_percentile(latencies, 50)),
+        'p95_ms': ms(_percentile(latencies, 95)),
+        'p99_ms': ms(_percentile(latencies, 99)),
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+
+def _phase(workers, seconds):
+    """Run (fn, n_threads) groups for `seconds`; return per-group summaries."""
+    stop = threading.Event()
+    results = []
+    threads = []
+    for i, (fn, n) in enumerate(workers):
+        latencies, statuses, lock = [], {}, threading.Lock()
+        results.append((latencies, statuses))
+        for j in range(n):
+            t = threading.Thread(target=_loop, args=(fn, stop, latencies, statuses, lock, i * 1000 + j),
+                                 daemon=True)
+            threads.append(t)
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return [_summary(lat, st, seconds) for lat, st in results]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark login under load')
+    parser.add_argument('--login-clients', type=int, default=16)
+    parser.add_argument('--probe-clients', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--inline', action='store_true', help='hash on the request thread (no process pool)')
+    args = parser.parse_args(argv)
+
+    if args.inline:
+        hasher.workers = 0
+    data = _dataset()
+    with app.app_context():
+        token = create_access_token(identity='bench1@example.com', additional_claims=token_claims(1, 'admin', 0))
+    headers = {'Authorization': f"Bearer {token}"}
+
+    def probe(client, rng):
+        return client.get(f"/community/channels/{rng.choice(data['channels'])}/posts?limit=20", headers=headers)
+
+    def login(client, rng):
+        email = f"bench{rng.randint(1, data['users'])}@example.com"
+        return client.post('/auth/login', json={'email': email, 'password': PASSWORD})
+
+    # Warm the pool's worker processes and DB connections
+    _phase([(login, 2), (probe, 1)], 1)
+
+    mode = 'inline' if args.inline else f"process pool ({hasher.workers} workers)"
+    print(f"hashing: {mode}, method {hasher.method}")
+    (idle,) = _phase([(probe, args.probe_clients)], args.seconds)
+    print(f"probe alone      p50={idle['p50_ms']}ms p95={idle['p95_ms']}ms p99={idle['p99_ms']}ms rps={idle['rps']}")
+    logins, loaded = _phase([(login, args.login_clients), (probe, args.probe_clients)], args.seconds)
+    print(f"probe w/ logins  p50={loaded['p50_ms']}ms p95={loaded['p95_ms']}ms p99={loaded['p99_ms']}ms "
+          f"rps={loaded['rps']}")
+    print(f"login            p50={logins['p50_ms']}ms p95={logins['p95_ms']}ms rps={logins['rps']} "
+          f"{logins['statuses']}")
+    print(f"hasher stats     {hasher.stats()}")
+    hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
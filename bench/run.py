@@ -0,0 +1,233 @@
+"""Drive hot endpoints through the Flask app with concurrent clients.
+
+    python -m bench.run --clients 16 --requests 2000
+    python -m bench.run --only list_posts react_to_post --compare bench/results/<older>.json
+
+Needs a database seeded with `python -m bench.seed` (same DB_* environment).
+Reports p50/p95/p99 latency, throughput and queries per request for each
+scenario (from the Server-Timing header), and writes the run to bench/results/<timestamp>.json.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask_jwt_extended import create_access_token
+
+from app import app
+from utils.db_helper import get_db_connection
+from utils.identity import token_claims
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+_local = threading.local()
+_QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+def _query_count(response):
+    """Read the statement count utils.metrics puts in the Server-Timing header."""
+    match = _QUERIES_RE.search(response.headers.get('Server-Timing', ''))
+    return int(match.group(1)) if match else 0
+
+
+def _dataset():
+    """Read the ids the scenarios sample from."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) AS n FROM users")
+        users = cursor.fetchone()['n']
+        cursor.execute("SELECT id FROM channels")
+        channels = [r['id'] for r in cursor.fetchall()]
+        cursor.execute("SELECT MAX(id) AS n FROM posts")
+        max_post = cursor.fetchone()['n'] or 0
+        cursor.execute("SELECT id FROM events WHERE status = 'upcoming'")
+        events = [r['id'] for r in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+    if not users or not channels or not max_post:
+        raise SystemExit('Database is empty; run python -m bench.seed first')
+    return {'users': users, 'channels': channels, 'max_post': max_post, 'events': events}
+
+
+def _scenarios(data, tokens):
+    def auth(rng):
+        return {'Authorization': f"Bearer {rng.choice(tokens)}"}
+
+    def list_posts(client, rng):
+        return client.get(f"/community/channels/{rng.choice(data['channels'])}/posts?limit=20", headers=auth(rng))
+
+    def feed(client, rng):
+        return client.get("/community/feed?limit=20", headers=auth(rng))
+
+    def list_events(client, rng):
+        return client.get("/events/?status=upcoming&limit=20")
+
+    def me_rsvps(client, rng):
+        return client.get("/me/rsvps?limit=50", headers=auth(rng))
+
+    def react_to_post(client, rng):
+        # Half the traffic lands on the first 1% of posts, like a viral thread
+        hot = max(1, data['max_post'] // 100)
+        post_id = rng.randint(1, hot) if rng.random() < 0.5 else rng.randint(1, data['max_post'])
+        return client.post(f"/community/posts/{post_id}/react",
+                           json={'reaction': rng.choice((1, -1, 0))}, headers=auth(rng))
+
+    def create_rsvp(client, rng):
+        if not data['events']:
+            return None
+        event_id = rng.choice(data['events'])
+        headers = auth(rng)
+        response = client.post(f"/events/{event_id}/rsvp", json={'status': 'going'}, headers=headers)
+        # Undo after the measured request so the dataset stays stable across runs
+        if response.status_code == 201:
+            _local.cleanup = lambda: client.delete(f"/events/{event_id}/rsvp", headers=headers)
+        return response
+
+    return {
+        'list_posts': list_posts,
+        'feed': feed,
+        'list_events': list_events,
+        'me_rsvps': me_rsvps,
+        'react_to_post': react_to_post,
+        'create_rsvp': create_rsvp,
+    }
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[k]
+
+
+def run_scenario(name, fn, clients, requests_total, seed):
+    latencies = []
+    queries = []
+    statuses = {}
+    lock = threading.Lock()
+    per_client = max(1, requests_total // clients)
+
+    def worker(idx):
+        rng = random.Random(seed * 1000 + idx)
+        client = app.test_client()
+        local_lat, local_q, local_status = [], [], {}
+        for _ in range(per_client):
+            started = time.perf_counter()
+            response = fn(client, rng)
+            elapsed = time.perf_counter() - started
+            cleanup = getattr(_local, 'cleanup', None)
+            if cleanup:
+                _local.cleanup = None
+                cleanup()
+            if response is None:
+                continue
+            local_lat.append(elapsed)
+            local_q.append(_query_count(response))
+            local_status[response.status_code] = local_status.get(response.status_code, 0) + 1
+        with lock:
+            latencies.extend(local_lat)
+            queries.extend(local_q)
+            for code, n in local_status.items():
+                statuses[code] = statuses.get(code, 0) + n
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(worker, range(clients)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    return {
+        'requests': len(latencies),
+        'clients': clients,
+        'wall_seconds': round(wall, 3),
+        'throughput_rps': round(len(latencies) / wall, 1) if wall else None,
+        'p50_ms': ms(_percentile(latencies, 50)),
+        'p95_ms': ms(_percentile(latencies, 95)),
+        'p99_ms': ms(_percentile(latencies, 99)),
+        'max_ms': ms(latencies[-1] if latencies else None),
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(current, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nvs {previous_path} ({previous.get('git_revision')})")
+    for name, result in current['scenarios'].items():
+        old = previous.get('scenarios', {}).get(name)
+        if not old:
+            continue
+        parts = []
+        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps', 'queries_per_request'):
+            if old.get(key) and result.get(key) is not None:
+                change = (result[key] - old[key]) / old[key] * 100
+                parts.append(f"{key} {change:+.1f}%")
+        print(f"  {name:<14} " + ', '.join(parts))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark hot endpoints')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=1000, help='requests per scenario')
+    parser.add_argument('--only', nargs='*', help='scenario names to run')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--compare', metavar='RESULT_JSON', help='earlier result to diff against')
+    args = parser.parse_args(argv)
+
+    data = _dataset()
+    rng = random.Random(args.seed)
+    with app.app_context():
+        # Bench user N has id N; user 1 is the only admin
+        tokens = []
+        for _ in range(200):
+            n = rng.randint(1, data['users'])
+            tokens.append(create_access_token(identity=f"bench{n}@example.com",
+                                              additional_claims=token_claims(n, 'admin' if n == 1 else 'user', 0)))
+    scenarios = _scenarios(data, tokens)
+
+    result = {
+        'started_at': datetime.utcnow().isoformat() + 'Z',
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'dataset': {k: (len(v) if isinstance(v, list) else v) for k, v in data.items()},
+        'scenarios': {},
+    }
+    for name, fn in scenarios.items():
+        if args.only and name not in args.only:
+            continue
+        # Warm caches and the connection pool before measuring
+        run_scenario(name, fn, args.clients, min(50, args.requests), args.seed + 1)
+        r = run_scenario(name, fn, args.clients, args.requests, args.seed)
+        result['scenarios'][name] = r
+        print(f"{name:<14} n={r['requests']:<6} rps={r['throughput_rps']:<8} p50={r['p50_ms']}ms "
+              f"p95={r['p95_ms']}ms p99={r['p99_ms']}ms q/req={r['queries_per_request']} {r['statuses']}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, datetime.utcnow().strftime('%Y%m%dT%H%M%SZ') + '.json')
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"\nwrote {path}")
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Search query latency versus corpus size.
+
+    python -m bench.search --sizes 1000 10000 100000            # in-process index, no database
+    python -m bench.search --backend mysql --queries 500        # FULLTEXT on the seeded database
+
+The memory run builds a synthetic corpus at each size, with Zipf-distributed
+words so that common terms have long posting lists like real text. It then
+times one-page queries of one to three words. The mysql run queries whatever
+corpus is in the configured database (see bench.seed) and reports its size.
+"""
+import argparse
+import random
+import time
+
+from bench.run import _percentile
+from utils.db_helper import get_db_connection
+from utils.search import KINDS, MemoryIndex, MySQLFulltextBackend
+
+_VOCAB_SIZE = 20000
+
+
+def _vocab(rng):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return [''.join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(_VOCAB_SIZE)]
+
+
+def _zipf_weights(n):
+    """Cumulative 1/rank weights, for random.choices."""
+    weights, total = [], 0.0
+    for rank in range(1, n + 1):
+        total += 1.0 / rank
+        weights.append(total)
+    return weights
+
+
+_CUM_WEIGHTS = _zipf_weights(_VOCAB_SIZE)
+
+
+def _zipf_words(rng, vocab, n):
+    return rng.choices(vocab, cum_weights=_CUM_WEIGHTS, k=n)
+
+
+def _corpus(index, size, rng, vocab):
+    for i in range(size):
+        kind = KINDS[i % len(KINDS)]
+        index.index(kind, i, ' '.join(_zipf_words(rng, vocab, rng.randint(8, 120))))
+
+
+def _time_queries(backend, queries, limit):
+    latencies = []
+    hits = 0
+    for q in queries:
+        started = time.perf_counter()
+        page = backend.search(q, KINDS, limit)
+        latencies.append(time.perf_counter() - started)
+        hits += len(page)
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 3)
+    return {
+        'p50_ms': ms(_percentile(latencies, 50)),
+        'p95_ms': ms(_percentile(latencies, 95)),
+        'p99_ms': ms(_percentile(latencies, 99)),
+        'avg_hits': round(hits / len(queries), 1),
+    }
+
+
+def _queries(rng, vocab, n):
+    # Words across the frequency range, from stopword-like to rare
+    return [' '.join(rng.choice(vocab[:5000]) for _ in range(rng.randint(1, 3))) for _ in range(n)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark search latency against corpus size')
+    parser.add_argument('--backend', choices=('memory', 'mysql'), default='memory')
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--limit', type=int, default=21, help='hits per query (page size + 1)')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    if args.backend == 'mysql':
+        # The seeder writes lorem-ipsum bodies, so query with those words
+        words = 'lorem ipsum dolor sit amet synthetic comment post event bench'.split()
+        queries = [' '.join(rng.sample(words, rng.randint(1, 3))) for _ in range(args.queries)]
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            sizes = {}
+            for table in ('posts', 'comments', 'events'):
+                cursor.execute(f"SELECT COUNT(*) AS n FROM {table}")
+                sizes[table] = cursor.fetchone()['n']
+        finally:
+            cursor.close()
+            conn.close()
+        r = _time_queries(MySQLFulltextBackend(), queries, args.limit)
+        print(f"mysql corpus={sizes} p50={r['p50_ms']}ms p95={r['p95_ms']}ms p99={r['p99_ms']}ms "
+              f"hits/query={r['avg_hits']}")
+        return
+
+    vocab = _vocab(rng)
+    queries = _queries(rng, vocab, args.queries)
+    for size in args.sizes:
+        index = MemoryIndex()
+        index._loaded = True  # synthetic corpus; don't load from the database
+        started = time.perf_counter()
+        _corpus(index, size, rng, vocab)
+        build = time.perf_counter() - started
+        r = _time_queries(index, queries, args.limit)
+        print(f"memory docs={size:<8} build={build:.1f}s p50={r['p50_ms']}ms p95={r['p95_ms']}ms "
+              f"p99={r['p99_ms']}ms hits/query={r['avg_hits']}")
+
+
+if __name__ == '__main__':
+    main()
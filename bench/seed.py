@@ -0,0 +1,145 @@
+"""Seed a synthetic dataset for the endpoint benchmarks.
+
+Run against a throwaway local database, e.g.
+
+    docker run -d --name mindset-bench -p 3307:3306 -e MYSQL_ROOT_PASSWORD=bench \
+        -e MYSQL_DATABASE=mindset_bench mariadb:11
+    export DB_HOST=127.0.0.1 DB_PORT=3307 DB_USER=root DB_PASSWORD=bench DB_NAME=mindset_bench
+    python -m bench.seed --users 2000 --channels 20 --posts-per-channel 2000
+
+Bench users are bench<N>@example.com with password "bench-password"; user 1 is an admin.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from utils import feed, post_activity
+from utils.db_helper import get_db_connection
+from utils.migrate import migrate
+from utils.passwords import hasher
+
+BATCH = 1000
+PASSWORD = 'bench-password'
+TABLES = ['event_rsvps', 'events', 'reports', 'post_feed', 'likes', 'comments', 'posts', 'channels',
+          'subscriptions', 'user_roles', 'users']
+
+
+def _batched(cursor, sql, rows):
+    for i in range(0, len(rows), BATCH):
+        cursor.executemany(sql, rows[i:i + BATCH])
+
+
+def seed(users, channels, posts_per_channel, likes, comments, events, rsvps, rng, out=print):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    started = time.monotonic()
+    now = datetime.utcnow().replace(microsecond=0)
+    try:
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        for table in TABLES:
+            cursor.execute(f"TRUNCATE TABLE {table}")
+
+        password_hash = generate_password_hash(PASSWORD, hasher.method)
+        _batched(cursor, "INSERT INTO users (id, name, email, password_hash) VALUES (%s, %s, %s, %s)",
+                 [(i, f"Bench User {i}", f"bench{i}@example.com", password_hash) for i in range(1, users + 1)])
+        cursor.execute("INSERT INTO user_roles (user_id, role) VALUES (1, 'admin')")
+        out(f"users: {users}")
+
+        _batched(cursor, "INSERT INTO channels (id, name, description, created_by) VALUES (%s, %s, %s, 1)",
+                 [(i, f"Channel {i}", f"Synthetic channel {i}") for i in range(1, channels + 1)])
+
+        post_rows = []
+        post_id = 0
+        for channel_id in range(1, channels + 1):
+            for _ in range(posts_per_channel):
+                post_id += 1
+                created = now - timedelta(seconds=rng.randint(0, 90 * 86400))
+                post_rows.append((post_id, channel_id, rng.randint(1, users), f"Post {post_id}",
+                                  "Lorem ipsum dolor sit amet. " * rng.randint(1, 20), created))
+        _batched(cursor, "INSERT INTO posts (id, channel_id, user_id, title, body, created_at) "
+                         "VALUES (%s, %s, %s, %s, %s, %s)", post_rows)
+        total_posts = post_id
+        out(f"posts: {total_posts}")
+
+        # Skew reactions and comments towards a few hot posts, as real feeds are
+        hot = max(1, total_posts // 100)
+        def pick_post():
+            return rng.randint(1, hot) if rng.random() < 0.5 else rng.randint(1, total_posts)
+
+        pairs = {(pick_post(), rng.randint(1, users)) for _ in range(likes)}
+        _batched(cursor, "INSERT IGNORE INTO likes (post_id, user_id, reaction) VALUES (%s, %s, %s)",
+                 [(p, u, rng.choice((1, 1, 1, -1))) for p, u in pairs])
+        cursor.execute("""
+            UPDATE posts p JOIN (
+              SELECT post_id, SUM(reaction = 1) AS l, SUM(reaction = -1) AS d FROM likes GROUP BY post_id
+            ) c ON c.post_id = p.id SET p.likes = c.l, p.dislikes = c.d
+        """)
+        out(f"likes: {len(pairs)}")
+
+        _batched(cursor, "INSERT INTO comments (post_id, user_id, body, created_at) VALUES (%s, %s, %s, %s)",
+                 [(pick_post(), rng.randint(1, users), "Synthetic comment " * rng.randint(1, 5),
+                   now - timedelta(seconds=rng.randint(0, 30 * 86400))) for _ in range(comments)])
+        out(f"comments: {comments}")
+
+        event_ids = []
+        event_rows = []
+        for i in range(events):
+            eid = str(uuid.UUID(int=rng.getrandbits(128)))
+            starts = now + timedelta(hours=rng.randint(-24 * 60, 24 * 60))
+            status = 'upcoming' if starts > now else 'past'
+            capacity = rng.choice((None, 50, 100, 500))
+            event_ids.append(eid)
+            event_rows.append((eid, f"Event {i}", 'Live Q&A', starts, 'Bench Host', status, capacity))
+        _batched(cursor, "INSERT INTO events (id, title, type, starts_at, host, status, capacity, created_by) "
+                         "VALUES (%s, %s, %s, %s, %s, %s, %s, 1)", event_rows)
+
+        rsvp_pairs = {(rng.choice(event_ids), rng.randint(1, users)) for _ in range(rsvps)} if event_ids else set()
+        _batched(cursor, "INSERT IGNORE INTO event_rsvps (event_id, user_id, status) VALUES (%s, %s, 'going')",
+                 list(rsvp_pairs))
+        cursor.execute("""
+            UPDATE events e SET going_count = (
+              SELECT COUNT(*) FROM event_rsvps r WHERE r.event_id = e.id AND r.status = 'going'
+            )
+        """)
+        out(f"events: {events}, rsvps: {len(rsvp_pairs)}")
+
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+    out(f"feed: {feed.rebuild()}")
+    out(f"comment counts: {len(post_activity.reconcile(fix=True)[1])} posts updated")
+    out(f"seeded in {time.monotonic() - started:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Seed a synthetic benchmark dataset (truncates tables!)')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--channels', type=int, default=10)
+    parser.add_argument('--posts-per-channel', type=int, default=1000)
+    parser.add_argument('--likes', type=int, default=50000)
+    parser.add_argument('--comments', type=int, default=20000)
+    parser.add_argument('--events', type=int, default=500)
+    parser.add_argument('--rsvps', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--allow-any-db', action='store_true',
+                        help='seed even if DB_NAME does not look like a bench database')
+    args = parser.parse_args(argv)
+
+    # .env points at a real database; never truncate it by accident
+    if 'bench' not in os.getenv('DB_NAME', '') and not args.allow_any_db:
+        sys.exit(f"Refusing to truncate DB_NAME={os.getenv('DB_NAME')!r}; use a *bench* database")
+    migrate()
+    seed(args.users, args.channels, args.posts_per_channel, args.likes, args.comments,
+         args.events, args.rsvps, random.Random(args.seed))
+
+
+if __name__ == '__main__':
+    main()
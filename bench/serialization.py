@@ -0,0 +1,98 @@
+"""Compare the old and new response serialization paths without a database.
+
+    python -m bench.serialization --rows 20 --iterations 5000
+
+"dict" is what the routes did before: DictCursor rows enriched in place and
+encoded by Flask's stdlib provider. "tuple" is the current path: tuple rows,
+precompiled encoders from utils.serializers and the orjson provider.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask, jsonify
+
+from utils.json_provider import OrjsonProvider, orjson
+from utils.serializers import AUTHOR, POST_SUMMARY
+
+_POST_COLUMNS = [c.strip() for c in POST_SUMMARY.columns.split(',')]
+_AUTHOR_COLUMNS = [c.strip() for c in AUTHOR.columns.split(',')]
+
+
+def _rows(n, seed):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    posts = [
+        (i, f"post title {i}", "body " * rng.randint(5, 60), rng.randint(1, 50),
+         start + timedelta(minutes=i), rng.randint(0, 500), rng.randint(0, 50),
+         rng.randint(0, 40), start + timedelta(minutes=i + rng.randint(0, 600)))
+        for i in range(n)
+    ]
+    authors = [(i, f"user {i}") for i in range(1, 51)]
+    return posts, authors
+
+
+def dict_path(app, posts, authors):
+    # DictCursor materializes a dict per row before the route touches it
+    post_rows = [dict(zip(_POST_COLUMNS, r)) for r in posts]
+    author_map = {}
+    for r in authors:
+        row = dict(zip(_AUTHOR_COLUMNS, r))
+        author_map[row['id']] = {'id': row['id'], 'name': row['name']}
+    for post in post_rows:
+        post['author'] = author_map.get(post['user_id'])
+        post['user_reaction'] = None
+    with app.app_context():
+        return jsonify({'posts': post_rows, 'nextCursor': None}).get_data()
+
+
+def tuple_path(app, posts, authors):
+    encode_author = AUTHOR.encode
+    author_map = {r[0]: encode_author(r) for r in authors}
+    encode = POST_SUMMARY.encode
+    out = []
+    for row in posts:
+        post = encode(row)
+        post['author'] = author_map.get(row[3])
+        post['user_reaction'] = None
+        out.append(post)
+    with app.app_context():
+        return jsonify({'posts': out, 'nextCursor': None}).get_data()
+
+
+def _time(fn, app, posts, authors, iterations):
+    fn(app, posts, authors)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(app, posts, authors)
+    return (time.perf_counter() - started) / iterations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark response serialization')
+    parser.add_argument('--rows', type=int, default=20)
+    parser.add_argument('--iterations', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    posts, authors = _rows(args.rows, args.seed)
+    stdlib_app = Flask('bench_stdlib')
+    fast_app = Flask('bench_fast')
+    if orjson is not None:
+        fast_app.json = OrjsonProvider(fast_app)
+    else:
+        print('orjson not installed; the tuple path uses the stdlib provider')
+
+    if dict_path(stdlib_app, posts, authors) != tuple_path(fast_app, posts, authors):
+        raise SystemExit('paths produced different bodies')
+
+    old = _time(dict_path, stdlib_app, posts, authors, args.iterations)
+    new = _time(tuple_path, fast_app, posts, authors, args.iterations)
+    print(f"rows={args.rows} iterations={args.iterations}")
+    print(f"dict+stdlib   {old * 1e6:9.1f}us/response")
+    print(f"tuple+orjson  {new * 1e6:9.1f}us/response  ({old / new:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+-- Indexes for the query shapes the routes actually run.
+
+-- list_posts: WHERE channel_id = ? AND is_deleted = 0 ORDER BY created_at DESC, id DESC
+ALTER TABLE posts ADD INDEX idx_posts_channel_created (channel_id, is_deleted, created_at);
+
+-- get_post / list_comments: WHERE post_id = ? AND is_deleted = 0 ORDER BY created_at, id
+ALTER TABLE comments ADD INDEX idx_comments_post_created (post_id, is_deleted, created_at);
+
+-- react_to_post upserts on (post_id, user_id); drop historical duplicates first
+DELETE l1 FROM likes l1
+  JOIN likes l2 ON l1.post_id = l2.post_id AND l1.user_id = l2.user_id AND l1.id < l2.id;
+ALTER TABLE likes ADD UNIQUE KEY uniq_likes_post_user (post_id, user_id);
+
+-- /me/rsvps: WHERE user_id = ? AND id < ? ORDER BY id DESC
+ALTER TABLE event_rsvps ADD INDEX idx_rsvps_user (user_id, id);
+
+-- list_events: WHERE status = ? ORDER BY starts_at DESC, id DESC
+ALTER TABLE events ADD INDEX idx_events_status_starts (status, starts_at, id);
+
+-- identity role lookups: WHERE user_id = ?
+ALTER TABLE user_roles ADD INDEX idx_user_roles_user (user_id);
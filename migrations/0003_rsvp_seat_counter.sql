@@ -0,0 +1,8 @@
+-- Seat accounting for create_rsvp: maintained going count and an ordered waitlist.
+
+ALTER TABLE events ADD COLUMN going_count INT NOT NULL DEFAULT 0 AFTER capacity;
+ALTER TABLE event_rsvps MODIFY status ENUM('going','waitlisted') NOT NULL;
+ALTER TABLE event_rsvps ADD INDEX idx_rsvps_waitlist (event_id, status, id);
+UPDATE events e SET going_count = (
+  SELECT COUNT(*) FROM event_rsvps r WHERE r.event_id = e.id AND r.status = 'going'
+);
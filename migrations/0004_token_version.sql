@@ -0,0 +1,3 @@
+-- Per-user token version carried as the `tv` JWT claim; bumping it revokes issued tokens.
+
+ALTER TABLE users ADD COLUMN token_version INT NOT NULL DEFAULT 0;
@@ -0,0 +1,17 @@
+-- Precomputed hot-score feed (see utils/feed.py; constants here must match it).
+
+CREATE TABLE IF NOT EXISTS post_feed (
+  post_id INT NOT NULL PRIMARY KEY,
+  channel_id INT NOT NULL,
+  votes INT NOT NULL DEFAULT 0,
+  comments INT NOT NULL DEFAULT 0,
+  base DOUBLE NOT NULL,
+  score DOUBLE NOT NULL,
+  KEY idx_feed_score (score, post_id)
+);
+INSERT INTO post_feed (post_id, channel_id, votes, comments, base, score)
+SELECT p.id, p.channel_id, p.likes - p.dislikes,
+  (SELECT COUNT(*) FROM comments c WHERE c.post_id = p.id AND c.is_deleted = 0),
+  (UNIX_TIMESTAMP(p.created_at) - 1704067200) / 45000, 0
+FROM posts p WHERE p.is_deleted = 0;
+UPDATE post_feed SET score = base + SIGN(votes + 0.5 * comments) * LOG10(GREATEST(ABS(votes + 0.5 * comments), 1));
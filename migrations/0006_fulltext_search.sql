@@ -0,0 +1,5 @@
+-- FULLTEXT indexes for utils/search.py's MySQL backend; InnoDB keeps them current on every write.
+
+ALTER TABLE posts ADD FULLTEXT INDEX ft_posts (title, body);
+ALTER TABLE comments ADD FULLTEXT INDEX ft_comments (body);
+ALTER TABLE events ADD FULLTEXT INDEX ft_events (title, type, host);
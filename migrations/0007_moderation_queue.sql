@@ -0,0 +1,4 @@
+-- Moderation queue: open reports grouped by entity, newest report first.
+-- Covers WHERE status = 'open' GROUP BY entity_type, entity_id with COUNT(*) and MAX(id),
+-- and bulk resolves by (entity_type, entity_id).
+ALTER TABLE reports ADD INDEX idx_reports_open_entity (status, entity_type, entity_id, id);
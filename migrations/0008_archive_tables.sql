@@ -0,0 +1,43 @@
+-- Retention for soft-deleted content (see utils/archiver.py).
+-- deleted_at starts the retention clock; rows deleted before this migration start it now.
+
+ALTER TABLE posts ADD COLUMN deleted_at TIMESTAMP NULL DEFAULT NULL, ADD INDEX idx_posts_deleted_at (deleted_at, id);
+ALTER TABLE comments ADD COLUMN deleted_at TIMESTAMP NULL DEFAULT NULL, ADD INDEX idx_comments_deleted_at (deleted_at, id);
+UPDATE posts SET deleted_at = CURRENT_TIMESTAMP WHERE is_deleted = 1;
+UPDATE comments SET deleted_at = CURRENT_TIMESTAMP WHERE is_deleted = 1;
+
+CREATE TABLE IF NOT EXISTS posts_archive (
+  id INT PRIMARY KEY,
+  channel_id INT NOT NULL,
+  user_id INT NOT NULL,
+  title VARCHAR(255) NOT NULL,
+  body TEXT NOT NULL,
+  likes INT NOT NULL,
+  dislikes INT NOT NULL,
+  is_locked TINYINT(1) NOT NULL,
+  created_at TIMESTAMP NULL,
+  deleted_at TIMESTAMP NULL,
+  archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS comments_archive (
+  id INT PRIMARY KEY,
+  post_id INT NOT NULL,
+  user_id INT NOT NULL,
+  body TEXT NOT NULL,
+  is_deleted TINYINT(1) NOT NULL,
+  created_at TIMESTAMP NULL,
+  deleted_at TIMESTAMP NULL,
+  archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  KEY idx_comments_archive_post (post_id)
+);
+
+CREATE TABLE IF NOT EXISTS likes_archive (
+  id INT PRIMARY KEY,
+  post_id INT NOT NULL,
+  user_id INT NOT NULL,
+  reaction TINYINT NOT NULL,
+  created_at TIMESTAMP NULL,
+  archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  KEY idx_likes_archive_post (post_id)
+);
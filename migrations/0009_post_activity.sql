@@ -0,0 +1,13 @@
+-- Denormalized comment_count / last_activity_at (see utils/post_activity.py).
+
+ALTER TABLE posts
+  ADD COLUMN comment_count INT NOT NULL DEFAULT 0,
+  ADD COLUMN last_activity_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+-- list_posts?sort=activity: WHERE channel_id = ? AND is_deleted = 0 ORDER BY last_activity_at DESC, id DESC
+ALTER TABLE posts ADD INDEX idx_posts_channel_activity (channel_id, is_deleted, last_activity_at, id);
+
+UPDATE posts SET
+  comment_count = (SELECT COUNT(*) FROM comments c WHERE c.post_id = posts.id AND c.is_deleted = 0),
+  last_activity_at = GREATEST(posts.created_at, COALESCE(
+    (SELECT MAX(c.created_at) FROM comments c WHERE c.post_id = posts.id AND c.is_deleted = 0), posts.created_at));
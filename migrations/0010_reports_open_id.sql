@@ -0,0 +1,2 @@
+-- Moderation queue scan: WHERE status = 'open' AND id < ? ORDER BY id DESC
+ALTER TABLE reports ADD INDEX idx_reports_open_id (status, id);
@@ -1,21 +1,24 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
 from utils.db_helper import get_db_connection
+from utils.identity import current_role, current_user_id, token_claims
+from utils.affirmations import get_affirmation
+from utils.paypal_client import paypal, PayPalError
+from utils.passwords import HasherBusy, hash_password, hasher, needs_rehash, verify_password
 import pymysql
 import stripe
 from dotenv import load_dotenv
 from datetime import timedelta, datetime
-import requests
 
 import os
 load_dotenv()
-import google.generativeai as genai
 
 auth = Blueprint('auth', __name__)
-PAYPAL_CLIENT_ID = "AU4cjGgjCzRvANikWUNe_4U-km4mK1PodmfLnxzipXh49Rubk4Au89h9TbLirHmeY5NMrQmVqtJ99ioN"
-PAYPAL_SECRET = "EPBa65CjR833nRpu5vJEBLmrvdJT8_uaeCv97q0LxEvo8vI0PIk58i_w1fLvUt7UIDkBe-jaw4fZx9Jk"
-PAYPAL_API = "https://api-m.sandbox.paypal.com"  # Switch to live API for production
+
+def _busy():
+    response = jsonify({'error': 'Server busy, please retry'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
 
 
@@ -77,15 +80,6 @@ def create_paypal_order():
     amount = 10.00 if subscription_type == 'pro' else 18.00
 
     try:
-        # Get OAuth2 token from PayPal
-        auth_response = requests.post(
-            f"{PAYPAL_API}/v1/oauth2/token",
-            headers={'Accept': 'application/json', 'Accept-Language': 'en_US'},
-            auth=(PAYPAL_CLIENT_ID, PAYPAL_SECRET),
-            data={'grant_type': 'client_credentials'}
-        )
-        access_token = auth_response.json().get('access_token')
-
         # Create PayPal order
         order_payload = {
             "intent": "CAPTURE",
@@ -104,17 +98,11 @@ def create_paypal_order():
             }
         }
 
-        order_response = requests.post(
-            f"{PAYPAL_API}/v2/checkout/orders",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {access_token}"
-            },
-            json=order_payload
-        )
-
-        return jsonify(order_response.json()), 200
+        # Token is cached and the connection kept alive by the shared client
+        return jsonify(paypal.create_order(order_payload)), 200
 
+    except PayPalError as e:
+        return jsonify(e.payload or {'error': str(e)}), 502
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -123,7 +111,6 @@ def create_paypal_order():
 @jwt_required()
 def capture_paypal_order():
     """Capture the PayPal order and update subscription."""
-    user_email = get_jwt_identity()
     data = request.json
     order_id = data.get('orderID')
 
@@ -131,24 +118,8 @@ def capture_paypal_order():
         return jsonify({'error': 'Missing orderID'}), 400
 
     try:
-        # Get PayPal access token again
-        auth_response = requests.post(
-            f"{PAYPAL_API}/v1/oauth2/token",
-            headers={'Accept': 'application/json', 'Accept-Language': 'en_US'},
-            auth=(PAYPAL_CLIENT_ID, PAYPAL_SECRET),
-            data={'grant_type': 'client_credentials'}
-        )
-        access_token = auth_response.json().get('access_token')
-
         # Capture order
-        capture_response = requests.post(
-            f"{PAYPAL_API}/v2/checkout/orders/{order_id}/capture",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {access_token}"
-            }
-        )
-        capture_data = capture_response.json()
+        capture_data = paypal.capture_order(order_id)
 
         # Extract amount and description safely
         purchase = capture_data.get("purchase_units", [{}])[0]
@@ -157,14 +128,12 @@ def capture_paypal_order():
         subscription_type = 'pro' if 'Pro' in description else 'premium'
 
         # Find user ID
-        conn = get_db_connection()
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute("SELECT id FROM users WHERE email = %s", (user_email,))
-        user = cursor.fetchone()
-        if not user:
+        user_id = current_user_id()
+        if not user_id:
             return jsonify({'error': 'User not found'}), 404
 
-        user_id = user['id']
+        conn = get_db_connection()
+        cursor = conn.cursor(pymysql.cursors.DictCursor)
 
         # Update or insert subscription
         cursor.execute("SELECT * FROM subscriptions WHERE user_id = %s", (user_id,))
@@ -194,6 +163,8 @@ def capture_paypal_order():
             'expires_at': new_expiry.isoformat()
         }), 200
 
+    except PayPalError as e:
+        return jsonify(e.payload or {'error': str(e)}), 502
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -220,13 +191,15 @@ def register():
         if cursor.fetchone():
             return jsonify({'error': 'Email already registered'}), 409
 
-        hashed_password = generate_password_hash(password)
+        hashed_password = hash_password(password)
         cursor.execute(
             "INSERT INTO users (name, email, password_hash) VALUES (%s, %s, %s)",
             (name, email, hashed_password)
         )
         conn.commit()
         return jsonify({'message': 'Registration successful 🌿'}), 201
+    except HasherBusy:
+        return _busy()
     except Exception:
         conn.rollback()
         return jsonify({'error': 'Registration failed'}), 500
@@ -249,8 +222,12 @@ def login():
     try:
         # Use DictCursor so we can reference fields by name
         cursor = conn.cursor(pymysql.cursors.DictCursor)
+        # The role is read here, not from identity's per-process cache: it goes into a
+        # 7-day token, and another worker may have changed it since this one cached it
         cursor.execute(
-            "SELECT id, name, email, password_hash FROM users WHERE email = %s",
+            "SELECT u.id, u.name, u.email, u.password_hash, u.token_version, "
+            "(SELECT r.role FROM user_roles r WHERE r.user_id = u.id ORDER BY r.id DESC LIMIT 1) AS role "
+            "FROM users u WHERE u.email = %s",
             (email,)
         )
         user = cursor.fetchone()
@@ -259,55 +236,51 @@ def login():
             cursor.close()
         conn.close()
 
-    if not user or not check_password_hash(user['password_hash'], password):
-        return jsonify({'error': 'Invalid email or password'}), 401
+    try:
+        if not user or not verify_password(user['password_hash'], password):
+            return jsonify({'error': 'Invalid email or password'}), 401
+    except HasherBusy:
+        return _busy()
+
+    if needs_rehash(user['password_hash']):
+        _upgrade_hash(user, password)
 
-    token = create_access_token(identity=email, expires_delta=timedelta(days=7))
+    # uid/role/tv claims let protected routes skip the email -> id and role lookups
+    claims = token_claims(user['id'], user['role'] or 'user', user['token_version'])
+    token = create_access_token(identity=email, additional_claims=claims, expires_delta=timedelta(days=7))
     return jsonify({
         'message': 'Login successful 🌱',
         'token': token,
         'user': {'name': user['name'], 'email': user['email']}
     }), 200
 
-@auth.route('/affirmation', methods=['GET'])
-def daily_affirmation():
-    fallback_affirmation = "I am worthy of all the good things life has to offer."
-    api_key = os.getenv('GOOGLE_API_KEY')
-
-    # If no key, return a safe fallback instead of 500
-    if not api_key:
-        return jsonify({'affirmation': fallback_affirmation, 'source': 'fallback'}), 200
-
+def _upgrade_hash(user, password):
+    """Re-hash with the configured method; skipped (and retried next login) if the pool is busy."""
+    try:
+        new_hash = hash_password(password)
+    except HasherBusy:
+        return
+    conn = get_db_connection()
+    cursor = conn.cursor()
     try:
-        genai.configure(api_key=api_key)
-        # Try 2.5 flash; gracefully fallback to 1.5 flash if unavailable
-        try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
-        except Exception:
-            model = genai.GenerativeModel('gemini-1.5-flash')
-
-        prompt = (
-            "Return one short motivational affirmation (max 2 lines). "
-            "Plain text only, no quotes or emojis."
+        # Only replace the hash we verified, in case the password changed meanwhile
+        cursor.execute(
+            "UPDATE users SET password_hash = %s WHERE id = %s AND password_hash = %s",
+            (new_hash, user['id'], user['password_hash'])
         )
-        response = model.generate_content(prompt)
-
-        # Extract text robustly across SDK versions
-        text = (getattr(response, 'text', '') or '').strip()
-        if not text and getattr(response, 'candidates', None):
-            candidate = response.candidates[0]
-            content = getattr(candidate, 'content', None)
-            parts = getattr(content, 'parts', None)
-            if parts and hasattr(parts[0], 'text'):
-                text = parts[0].text.strip()
-
-        lines = [line.strip() for line in text.splitlines() if line.strip()]
-        affirmation = "\n".join(lines[:2]) if lines else fallback_affirmation
-
-        return jsonify({'affirmation': affirmation, 'source': 'gemini'}), 200
+        conn.commit()
+        hasher.count('rehashed', cursor.rowcount)
     except Exception:
-        # Any error returns a friendly fallback instead of 500
-        return jsonify({'affirmation': fallback_affirmation, 'source': 'fallback'}), 200
+        conn.rollback()
+    finally:
+        cursor.close()
+        conn.close()
+
+@auth.route('/affirmation', methods=['GET'])
+def daily_affirmation():
+    # Served from the pre-generated pool; falls back to a safe default instead of 500
+    affirmation, source = get_affirmation()
+    return jsonify({'affirmation': affirmation, 'source': source}), 200
 
 @auth.route('/me', methods=['GET'])
 @jwt_required()
@@ -325,13 +298,8 @@ def me():
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
-        # Fetch role; default to 'user' if none
-        cursor.execute("SELECT role FROM user_roles WHERE user_id = %s", (user['id'],))
-        role_row = cursor.fetchone()
-        if role_row:
-            role = role_row['role'] if isinstance(role_row, dict) else role_row[0]
-        else:
-            role = 'user'
+        # Role comes from the token claims (identity cache for older tokens); defaults to 'user'
+        role = current_role()
 
         return jsonify({
             'id': user['id'],
@@ -1,55 +1,150 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, Response, request, jsonify
+from flask_jwt_extended import jwt_required
+from utils import feed, post_activity, pubsub, search
 from utils.db_helper import get_db_connection
+from utils.identity import current_user_id, role_required
+from utils.reactions import apply_reaction
+from utils.response_cache import cached, invalidate
+from utils.serializers import AUTHOR, AUTHOR_PRIVATE, CHANNEL, COMMENT, POST, POST_SUMMARY, POST_SUMMARY_P
 import pymysql
+from collections import Counter
+from datetime import datetime
+import logging
+
+log = logging.getLogger(__name__)
 
 community = Blueprint('community', __name__)
 
-def _get_user_id(email):
-    conn = get_db_connection()
-    cursor = conn.cursor(pymysql.cursors.DictCursor)
+# Hot statements live in module constants so that utils/explain_check.py EXPLAINs
+# exactly what the routes run. {ids} and {after} are filled in per call.
+AUTHORS_SQL = "SELECT {columns} FROM users WHERE id IN ({ids})"
+CHANNELS_SQL = "SELECT " + CHANNEL.columns + " FROM channels ORDER BY created_at DESC"
+COMMENTS_PAGE_SQL = (
+    "SELECT " + COMMENT.columns + " FROM comments "
+    "WHERE post_id = %s AND is_deleted = 0{after} ORDER BY created_at ASC, id ASC LIMIT %s"
+)
+COMMENTS_AFTER = " AND (created_at > %s OR (created_at = %s AND id > %s))"
+USER_REACTIONS_SQL = "SELECT post_id, reaction FROM likes WHERE user_id = %s AND post_id IN ({ids})"
+# {sort} is created_at or last_activity_at (see _POST_SORTS)
+LIST_POSTS_SQL = (
+    "SELECT " + POST_SUMMARY.columns + " FROM posts "
+    "WHERE channel_id = %s AND is_deleted = 0{after} ORDER BY {sort} DESC, id DESC LIMIT %s"
+)
+LIST_POSTS_AFTER = " AND ({sort} < %s OR ({sort} = %s AND id < %s))"
+FEED_SQL = (
+    "SELECT f.score, f.channel_id, " + POST_SUMMARY_P.columns + " "
+    "FROM post_feed f JOIN posts p ON p.id = f.post_id{after} "
+    "ORDER BY f.score DESC, f.post_id DESC LIMIT %s"
+)
+FEED_AFTER = " WHERE (f.score < %s OR (f.score = %s AND f.post_id < %s))"
+POSTS_BATCH_SQL = "SELECT " + POST_SUMMARY.columns + " FROM posts WHERE id IN ({ids}) AND is_deleted = 0"
+GET_POST_SQL = "SELECT " + POST.columns + " FROM posts WHERE id = %s AND is_deleted = 0"
+COMMENT_TARGET_SQL = "SELECT is_locked FROM posts WHERE id = %s AND is_deleted = 0"
+QUEUE_SCAN_SQL = (
+    "SELECT id, entity_type, entity_id, reporter_id, reason, created_at FROM reports "
+    "WHERE status = 'open'{before} ORDER BY id DESC LIMIT %s"
+)
+QUEUE_STATS_SQL = (
+    "SELECT entity_type, entity_id, COUNT(*) AS report_count, MAX(id) AS latest_id FROM reports "
+    "WHERE status = 'open' AND (entity_type, entity_id) IN ({keys}) GROUP BY entity_type, entity_id"
+)
+RESOLVE_ENTITY_REPORTS_SQL = (
+    "UPDATE reports SET status = 'resolved' WHERE status = 'open' AND entity_type = %s AND entity_id IN ({ids})"
+)
+REACTIONS_BATCH_SQL = (
+    "SELECT p.id, p.likes, p.dislikes, l.reaction FROM posts p "
+    "LEFT JOIN likes l ON l.post_id = p.id AND l.user_id = %s "
+    "WHERE p.id IN ({ids}) AND p.is_deleted = 0"
+)
+POST_REACTIONS_SQL = "SELECT reaction, COUNT(*) AS count FROM likes WHERE post_id = %s GROUP BY reaction"
+USER_REACTION_SQL = "SELECT reaction FROM likes WHERE post_id = %s AND user_id = %s"
+
+def _parse_limit(raw, default):
     try:
-        cursor.execute("SELECT id FROM users WHERE email = %s", (email,))
-        row = cursor.fetchone()
-        return row['id'] if row else None
-    finally:
-        cursor.close()
-        conn.close()
+        return max(1, min(int(raw if raw is not None else default), 100))
+    except Exception:
+        return default
 
-def _get_user_role(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(pymysql.cursors.DictCursor)
+def _parse_cursor(raw):
+    """Decode a '<id>|<createdAtISO>' keyset cursor into (id, datetime), or None."""
+    if not raw or '|' not in raw:
+        return None
+    cid, cdate = raw.split('|', 1)
     try:
-        cursor.execute("SELECT role FROM user_roles WHERE user_id = %s", (user_id,))
-        row = cursor.fetchone()
-        return row['role'] if row else 'user'
-    finally:
-        cursor.close()
-        conn.close()
+        if cdate.endswith('Z'):
+            cdate = cdate[:-1]
+        return int(cid), datetime.fromisoformat(cdate)
+    except ValueError:
+        return None
 
-def _is_mod_or_admin(user_id):
-    role = _get_user_role(user_id)
-    return role in ('moderator', 'admin')
+def _make_cursor(row_id, created_at):
+    return f"{row_id}|{created_at.isoformat()}Z"
+
+def _fetch_authors(cursor, user_ids, model=AUTHOR):
+    """Batch-resolve author summaries for a set of user ids in one query. Expects a tuple cursor.
+
+    The default model is the public {id, name}; moderator views pass AUTHOR_PRIVATE.
+    """
+    authors = {}
+    user_ids = list(user_ids)
+    if user_ids:
+        cursor.execute(
+            AUTHORS_SQL.format(columns=model.columns, ids=_placeholders(user_ids)),
+            tuple(user_ids)
+        )
+        encode = model.encode
+        for row in cursor.fetchall():
+            authors[row[0]] = encode(row)
+    return authors
+
+_COMMENT_ID = COMMENT.index['id']
+_COMMENT_USER_ID = COMMENT.index['user_id']
+_COMMENT_CREATED_AT = COMMENT.index['created_at']
+
+def _fetch_comments_page(cursor, post_id, after, limit, extra_user_ids=()):
+    """Fetch one page of comments, oldest first, with authors batch-resolved. Expects a tuple cursor.
+
+    Returns (comments, next_cursor, authors); `extra_user_ids` are resolved in the
+    same author query so callers can attach e.g. the post author for free.
+    """
+    params = [post_id]
+    where_cursor = ""
+    if after:
+        where_cursor = COMMENTS_AFTER
+        params.extend([after[1], after[1], after[0]])
+    params.append(limit + 1)
+    cursor.execute(COMMENTS_PAGE_SQL.format(after=where_cursor), tuple(params))
+    rows = cursor.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _make_cursor(rows[-1][_COMMENT_ID], rows[-1][_COMMENT_CREATED_AT])
+    authors = _fetch_authors(cursor, {r[_COMMENT_USER_ID] for r in rows} | set(extra_user_ids))
+    encode = COMMENT.encode
+    comments = []
+    for row in rows:
+        comment = encode(row)
+        comment['author'] = authors.get(row[_COMMENT_USER_ID])
+        comments.append(comment)
+    return comments, next_cursor, authors
 
 @community.route('/channels', methods=['GET'])
+@cached('channels', ttl=300)
 def list_channels():
     conn = get_db_connection()
-    cursor = conn.cursor(pymysql.cursors.DictCursor)
+    cursor = conn.cursor(pymysql.cursors.Cursor)
     try:
-        cursor.execute("SELECT id, name, description, created_at FROM channels ORDER BY created_at DESC")
-        channels = cursor.fetchall()
-        return jsonify({'channels': channels}), 200
+        cursor.execute(CHANNELS_SQL)
+        encode = CHANNEL.encode
+        return jsonify({'channels': [encode(r) for r in cursor.fetchall()]}), 200
     finally:
         cursor.close()
         conn.close()
 
 @community.route('/channels', methods=['POST'])
-@jwt_required()
+@role_required('moderator', 'admin')
 def create_channel():
-    identity = get_jwt_identity()
-    user_id = _get_user_id(identity)
-    if not user_id or not _is_mod_or_admin(user_id):
-        return jsonify({'error': 'Forbidden'}), 403
+    user_id = current_user_id()
 
     data = request.json or {}
     name = data.get('name')
@@ -66,6 +161,7 @@ def create_channel():
             (name, description, user_id)
         )
         conn.commit()
+        invalidate('channels')
         return jsonify({'message': 'Channel created'}), 201
     except Exception:
         conn.rollback()
@@ -73,76 +169,165 @@ def create_channel():
     finally:
         cursor.close()
         conn.close()
+
+_SUMMARY_ID = POST_SUMMARY.index['id']
+_SUMMARY_USER_ID = POST_SUMMARY.index['user_id']
+_SUMMARY_CREATED_AT = POST_SUMMARY.index['created_at']
+_SUMMARY_LAST_ACTIVITY = POST_SUMMARY.index['last_activity_at']
+
+MAX_BATCH = 100
+
+def _parse_ids(raw):
+    """Parse a comma-separated (or JSON list) of post ids; de-duplicated, order kept. None if invalid."""
+    if isinstance(raw, str):
+        raw = [part for part in raw.split(',') if part.strip()]
+    if not isinstance(raw, list) or not raw:
+        return None
+    try:
+        return list(dict.fromkeys(int(i) for i in raw))
+    except (TypeError, ValueError):
+        return None
+
+def _encode_posts(cursor, rows, user_id):
+    """Encode POST_SUMMARY rows with author and the caller's reaction, batch-resolved."""
+    # Fetch author information for these posts
+    authors = _fetch_authors(cursor, {r[_SUMMARY_USER_ID] for r in rows})
+
+    # Fetch the user's own reaction to each post (like, dislike, or none)
+    user_reactions = {}
+    post_ids = [r[_SUMMARY_ID] for r in rows]
+    if post_ids:
+        cursor.execute(
+            USER_REACTIONS_SQL.format(ids=_placeholders(post_ids)),
+            [user_id] + post_ids  # Pass user_id first, then post_ids as separate parameters
+        )
+        user_reactions = dict(cursor.fetchall())
+
+    encode = POST_SUMMARY.encode
+    posts = []
+    for row in rows:
+        post = encode(row)
+        post['author'] = authors.get(row[_SUMMARY_USER_ID])
+        post['user_reaction'] = user_reactions.get(row[_SUMMARY_ID])
+        posts.append(post)
+    return posts
+
+# ?sort= -> (ORDER BY column, its position in POST_SUMMARY rows)
+_POST_SORTS = {
+    'new': ('created_at', _SUMMARY_CREATED_AT),
+    'activity': ('last_activity_at', _SUMMARY_LAST_ACTIVITY),
+}
+
 @community.route('/channels/<int:channel_id>/posts', methods=['GET'])
 @jwt_required()
 def list_posts(channel_id):
-    identity = get_jwt_identity()  # Get the email of the logged-in user
-    user_id = _get_user_id(identity)  # Get the user_id from the email
+    user_id = current_user_id()
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
 
+    limit = _parse_limit(request.args.get('limit'), 20)
+    after = _parse_cursor(request.args.get('cursor'))
+    sort = request.args.get('sort', 'new')
+    if sort not in _POST_SORTS:
+        return jsonify({'error': 'Invalid sort'}), 400
+    sort_column, sort_index = _POST_SORTS[sort]
+
     conn = get_db_connection()
-    cursor = conn.cursor(pymysql.cursors.DictCursor)
+    cursor = conn.cursor(pymysql.cursors.Cursor)
     try:
-        # Fetch all posts for the specified channel with likes and dislikes counts
-        cursor.execute(
-            "SELECT id, title, body, user_id, created_at, likes, dislikes FROM posts "
-            "WHERE channel_id = %s AND is_deleted = 0 ORDER BY created_at DESC",
-            (channel_id,)
-        )
-        posts = cursor.fetchall()
+        # One page of posts, walking idx_posts_channel_created or idx_posts_channel_activity
+        params = [channel_id]
+        where_cursor = ""
+        if after:
+            where_cursor = LIST_POSTS_AFTER.format(sort=sort_column)
+            params.extend([after[1], after[1], after[0]])
+        params.append(limit + 1)
+        cursor.execute(LIST_POSTS_SQL.format(after=where_cursor, sort=sort_column), tuple(params))
+        rows = cursor.fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _make_cursor(rows[-1][_SUMMARY_ID], rows[-1][sort_index])
 
-        # Fetch author information for all posts
-        user_ids = list({p['user_id'] for p in posts})
-        authors = {}
-        if user_ids:
-            placeholders = ','.join(['%s'] * len(user_ids))
-            cursor.execute(
-                f"SELECT id, name, email FROM users WHERE id IN ({placeholders})",
-                tuple(user_ids)
-            )
-            for row in cursor.fetchall():
-                authors[row['id']] = {
-                    'id': row['id'],
-                    'name': row['name'],
-                    'email': row['email'],
-                }
-
-        # Fetch the user's own reaction to each post (like, dislike, or none)
-        user_reactions = {}
-        post_ids = list({p['id'] for p in posts})
-        if post_ids:  # Ensure we have posts to check for the user's reactions
-            placeholders = ','.join(['%s'] * len(post_ids))  # Create placeholders for post_ids
-            cursor.execute(
-                f"SELECT post_id, reaction FROM likes WHERE user_id = %s AND post_id IN ({placeholders})",
-                [user_id] + post_ids  # Pass user_id first, then post_ids as separate parameters
-            )
-            for row in cursor.fetchall():
-                user_reactions[row['post_id']] = row['reaction']
+        return jsonify({'posts': _encode_posts(cursor, rows, user_id), 'nextCursor': next_cursor}), 200
 
-        # Enrich the posts with author, reactions, and user's own reaction
-        enriched_posts = []
-        for post in posts:
-            enriched_post = {
-                **post,
-                'author': authors.get(post['user_id'], None),
-                'user_reaction': user_reactions.get(str(post['id']), None)  # user's own reaction (like, dislike, or None)
-            }
-            enriched_posts.append(enriched_post)
+    finally:
+        cursor.close()
+        conn.close()
+
+def _parse_feed_cursor(raw):
+    """Decode a '<score>|<postId>' feed cursor into (score, post_id), or None."""
+    if not raw or '|' not in raw:
+        return None
+    score, post_id = raw.split('|', 1)
+    try:
+        return float(score), int(post_id)
+    except ValueError:
+        return None
+
+@community.route('/feed', methods=['GET'])
+@jwt_required()
+def get_feed():
+    """Posts from every channel, highest hot score first (see utils/feed.py)."""
+    user_id = current_user_id()
+    if not user_id:
+        return jsonify({'error': 'Unauthorized'}), 401
 
-        return jsonify({'posts': enriched_posts}), 200
+    limit = _parse_limit(request.args.get('limit'), 20)
+    after = _parse_feed_cursor(request.args.get('cursor'))
 
+    conn = get_db_connection()
+    cursor = conn.cursor(pymysql.cursors.Cursor)
+    try:
+        # Walks idx_feed_score backwards; posts are joined by primary key
+        params = []
+        where_cursor = ""
+        if after:
+            where_cursor = FEED_AFTER
+            params.extend([after[0], after[0], after[1]])
+        params.append(limit + 1)
+        cursor.execute(FEED_SQL.format(after=where_cursor), tuple(params))
+        rows = cursor.fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1][0]!r}|{rows[-1][2 + _SUMMARY_ID]}"
+        posts = _encode_posts(cursor, [r[2:] for r in rows], user_id)
+        for post, row in zip(posts, rows):
+            post['channel_id'] = row[1]
+        return jsonify({'posts': posts, 'nextCursor': next_cursor}), 200
     finally:
         cursor.close()
         conn.close()
 
+@community.route('/posts', methods=['GET'])
+@jwt_required()
+def get_posts_batch():
+    """Post summaries for `?ids=1,2,3` in request order; deleted or unknown ids are omitted."""
+    user_id = current_user_id()
+    if not user_id:
+        return jsonify({'error': 'Unauthorized'}), 401
+    post_ids = _parse_ids(request.args.get('ids', ''))
+    if post_ids is None:
+        return jsonify({'error': 'Invalid ids'}), 400
+    if len(post_ids) > MAX_BATCH:
+        return jsonify({'error': f'At most {MAX_BATCH} ids'}), 400
 
+    conn = get_db_connection()
+    cursor = conn.cursor(pymysql.cursors.Cursor)
+    try:
+        cursor.execute(POSTS_BATCH_SQL.format(ids=_placeholders(post_ids)), tuple(post_ids))
+        by_id = {row[_SUMMARY_ID]: row for row in cursor.fetchall()}
+        rows = [by_id[i] for i in post_ids if i in by_id]
+        return jsonify({'posts': _encode_posts(cursor, rows, user_id)}), 200
+    finally:
+        cursor.close()
+        conn.close()
 
 @community.route('/channels/<int:channel_id>/posts', methods=['POST'])
 @jwt_required()
 def create_post(channel_id):
-    identity = get_jwt_identity()
-    user_id = _get_user_id(identity)
+    user_id = current_user_id()
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
 
@@ -161,7 +346,12 @@ def create_post(channel_id):
             "INSERT INTO posts (channel_id, user_id, title, body) VALUES (%s, %s, %s, %s)",
             (channel_id, user_id, title, body)
         )
+        post_id = cursor.lastrowid
+        feed.add_post(cursor, post_id)
         conn.commit()
+        search.index_post(post_id, title, body)
+        if pubsub.has_subscribers(f'channel:{channel_id}'):
+            _publish_post(conn, post_id)
         return jsonify({'message': 'Post created'}), 201
     except Exception:
         conn.rollback()
@@ -170,35 +360,42 @@ def create_post(channel_id):
         cursor.close()
         conn.close()
 
+_POST_USER_ID = POST.index['user_id']
+
 @community.route('/posts/<int:post_id>', methods=['GET'])
+@cached('post:{post_id}')
 def get_post(post_id):
+    limit = _parse_limit(request.args.get('limit'), 20)
     conn = get_db_connection()
-    cursor = conn.cursor(pymysql.cursors.DictCursor)
+    cursor = conn.cursor(pymysql.cursors.Cursor)
     try:
-        cursor.execute(
-            "SELECT id, channel_id, user_id, title, body, is_locked, created_at "
-            "FROM posts WHERE id = %s AND is_deleted = 0",
-            (post_id,)
-        )
-        post = cursor.fetchone()
-        if not post:
+        cursor.execute(GET_POST_SQL, (post_id,))
+        row = cursor.fetchone()
+        if not row:
             return jsonify({'error': 'Not found'}), 404
 
-        # Attach author for the post
-        cursor.execute("SELECT id, name, email FROM users WHERE id = %s", (post['user_id'],))
-        author = cursor.fetchone()
-        post['author'] = (
-            {'id': author['id'], 'name': author['name'], 'email': author['email']}
-            if author else None
+        # First page of comments; the post author is resolved in the same batch
+        author_id = row[_POST_USER_ID]
+        comments, next_cursor, authors = _fetch_comments_page(
+            cursor, post_id, None, limit, extra_user_ids=(author_id,)
         )
+        post = POST.encode(row)
+        post['author'] = authors.get(author_id)
+        return jsonify({'post': post, 'comments': comments, 'nextCursor': next_cursor}), 200
+    finally:
+        cursor.close()
+        conn.close()
 
-        cursor.execute(
-            "SELECT id, user_id, body, created_at FROM comments "
-            "WHERE post_id = %s AND is_deleted = 0 ORDER BY created_at ASC",
-            (post_id,)
-        )
-        comments = cursor.fetchall()
-        return jsonify({'post': post, 'comments': comments}), 200
+@community.route('/posts/<int:post_id>/comments', methods=['GET'])
+@cached('post:{post_id}')
+def list_comments(post_id):
+    limit = _parse_limit(request.args.get('limit'), 20)
+    after = _parse_cursor(request.args.get('cursor'))
+    conn = get_db_connection()
+    cursor = conn.cursor(pymysql.cursors.Cursor)
+    try:
+        comments, next_cursor, _ = _fetch_comments_page(cursor, post_id, after, limit)
+        return jsonify({'comments': comments, 'nextCursor': next_cursor}), 200
     finally:
         cursor.close()
         conn.close()
@@ -206,8 +403,7 @@ def get_post(post_id):
 @community.route('/posts/<int:post_id>/comments', methods=['POST'])
 @jwt_required()
 def add_comment(post_id):
-    identity = get_jwt_identity()
-    user_id = _get_user_id(identity)
+    user_id = current_user_id()
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
 
@@ -219,10 +415,7 @@ def add_comment(post_id):
     conn = get_db_connection()
     cursor = conn.cursor(pymysql.cursors.DictCursor)
     try:
-        cursor.execute(
-            "SELECT is_locked FROM posts WHERE id = %s AND is_deleted = 0",
-            (post_id,)
-        )
+        cursor.execute(COMMENT_TARGET_SQL, (post_id,))
         row = cursor.fetchone()
         if not row:
             return jsonify({'error': 'Post not found'}), 404
@@ -234,7 +427,14 @@ def add_comment(post_id):
             "INSERT INTO comments (post_id, user_id, body) VALUES (%s, %s, %s)",
             (post_id, user_id, body)
         )
+        comment_id = cursor.lastrowid
+        post_activity.comment_added(cursor, post_id, comment_id)
+        feed.adjust(cursor, post_id, comments=1)
         conn.commit()
+        search.index_comment(comment_id, post_id, body)
+        invalidate(f'post:{post_id}')
+        if pubsub.has_subscribers(f'post:{post_id}'):
+            _publish_comment(conn, post_id, comment_id)
         return jsonify({'message': 'Comment added'}), 201
     except Exception:
         conn.rollback()
@@ -246,8 +446,7 @@ def add_comment(post_id):
 @community.route('/reports', methods=['POST'])
 @jwt_required()
 def report_content():
-    identity = get_jwt_identity()
-    reporter_id = _get_user_id(identity)
+    reporter_id = current_user_id()
     if not reporter_id:
         return jsonify({'error': 'Unauthorized'}), 401
 
@@ -275,159 +474,531 @@ def report_content():
         cursor.close()
         conn.close()
 
+MOD_MAX_BATCH = 500
+
+def _placeholders(ids):
+    return ','.join(['%s'] * len(ids))
+
+def _delete_posts(cursor, post_ids):
+    """Soft-delete live posts and drop their feed rows. Returns {post_id: channel_id} of those deleted."""
+    cursor.execute(
+        f"SELECT id, channel_id FROM posts WHERE id IN ({_placeholders(post_ids)}) AND is_deleted = 0 FOR UPDATE",
+        tuple(post_ids)
+    )
+    deleted = {row['id']: row['channel_id'] for row in cursor.fetchall()}
+    if deleted:
+        ids = sorted(deleted)
+        cursor.execute(f"UPDATE posts SET is_deleted = 1, deleted_at = CURRENT_TIMESTAMP WHERE id IN ({_placeholders(ids)})", tuple(ids))
+        feed.remove_posts(cursor, ids)
+    return deleted
+
+def _posts_deleted(deleted):
+    """Post-commit side effects of _delete_posts: search index, caches and streams."""
+    for post_id, channel_id in deleted.items():
+        search.remove_post(post_id)
+        pubsub.publish('post_removed', {'post_id': post_id}, f'post:{post_id}', f'channel:{channel_id}')
+    if deleted:
+        invalidate(*(f'post:{post_id}' for post_id in deleted))
+
+def _delete_comments(cursor, comment_ids):
+    """Soft-delete live comments and decrement their posts' feed counts. Returns {comment_id: post_id}."""
+    cursor.execute(
+        f"SELECT id, post_id FROM comments WHERE id IN ({_placeholders(comment_ids)}) AND is_deleted = 0 FOR UPDATE",
+        tuple(comment_ids)
+    )
+    deleted = {row['id']: row['post_id'] for row in cursor.fetchall()}
+    if deleted:
+        ids = sorted(deleted)
+        cursor.execute(f"UPDATE comments SET is_deleted = 1, deleted_at = CURRENT_TIMESTAMP WHERE id IN ({_placeholders(ids)})", tuple(ids))
+        per_post = Counter(deleted.values())
+        post_activity.comments_removed(cursor, per_post)
+        feed.adjust_many(cursor, [(0, -n, post_id) for post_id, n in sorted(per_post.items())])
+    return deleted
+
+def _comments_deleted(deleted):
+    for comment_id, post_id in deleted.items():
+        search.remove('comment', comment_id)
+        pubsub.publish('comment_removed', {'comment_id': comment_id, 'post_id': post_id}, f'post:{post_id}')
+    if deleted:
+        invalidate(*{f'post:{post_id}' for post_id in deleted.values()})
+
+def _lock_posts(cursor, post_ids):
+    """Lock posts against new comments. Returns how many changed."""
+    return cursor.execute(
+        f"UPDATE posts SET is_locked = 1 WHERE id IN ({_placeholders(post_ids)}) AND is_locked = 0",
+        tuple(post_ids)
+    )
+
+def _resolve_reports(cursor, report_ids=(), entity_type=None, entity_ids=()):
+    """Resolve open reports by report id, and/or every open report on the given entities."""
+    resolved = 0
+    if report_ids:
+        resolved += cursor.execute(
+            f"UPDATE reports SET status = 'resolved' WHERE id IN ({_placeholders(report_ids)}) AND status = 'open'",
+            tuple(report_ids)
+        )
+    if entity_ids:
+        resolved += cursor.execute(
+            RESOLVE_ENTITY_REPORTS_SQL.format(ids=_placeholders(entity_ids)),
+            (entity_type, *entity_ids)
+        )
+    return resolved
+
+def _parse_mod_ids():
+    """(ids, resolve_reports, error response) from a bulk moderation body {"ids": [...], "resolve_reports": bool}."""
+    data = request.json or {}
+    ids = _parse_ids(data.get('ids'))
+    if ids is None:
+        return None, False, (jsonify({'error': 'Invalid ids'}), 400)
+    if len(ids) > MOD_MAX_BATCH:
+        return None, False, (jsonify({'error': f'At most {MOD_MAX_BATCH} ids'}), 400)
+    return ids, bool(data.get('resolve_reports')), None
+
+# Open reports scanned per round, and per request, while building one queue page
+_QUEUE_SCAN = 500
+_QUEUE_MAX_SCAN = 5000
+
+def _open_report_stats(cursor, keys):
+    """{(entity_type, entity_id): (open report count, newest open report id)} for the given entities."""
+    cursor.execute(
+        QUEUE_STATS_SQL.format(keys=','.join(['(%s, %s)'] * len(keys))),
+        tuple(v for key in keys for v in key)
+    )
+    return {(row['entity_type'], row['entity_id']): (row['report_count'], row['latest_id'])
+            for row in cursor.fetchall()}
+
+@community.route('/mod/reports', methods=['GET'])
+@role_required('moderator', 'admin')
+def mod_list_reports():
+    """Open reports grouped per reported post/comment, most recently reported first.
+
+    Walks open reports newest first on (status, id) and collects distinct entities
+    until the page is full, then counts open reports for just those entities. An
+    entity whose newest report is above the cursor was listed on an earlier page
+    and is skipped. The cursor is a report id: the last entity's newest report,
+    or where the scan stopped if _QUEUE_MAX_SCAN reports gave a short page.
+    """
+    limit = _parse_limit(request.args.get('limit'), 20)
+    try:
+        before = int(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        groups = []
+        latest = {}
+        seen = set()
+        scanned = 0
+        exhausted = False
+        while len(groups) <= limit and scanned < _QUEUE_MAX_SCAN:
+            cursor.execute(
+                QUEUE_SCAN_SQL.format(before=" AND id < %s" if before else ""),
+                (before, _QUEUE_SCAN) if before else (_QUEUE_SCAN,)
+            )
+            rows = cursor.fetchall()
+            scanned += len(rows)
+            if rows:
+                before = rows[-1]['id']
+            candidates = []
+            for row in rows:
+                key = (row['entity_type'], row['entity_id'])
+                if key not in seen:
+                    seen.add(key)
+                    candidates.append(row)
+            stats = _open_report_stats(cursor, [(r['entity_type'], r['entity_id']) for r in candidates]) \
+                if candidates else {}
+            for row in candidates:
+                count, newest = stats.get((row['entity_type'], row['entity_id']), (0, None))
+                if newest != row['id']:
+                    continue  # listed on an earlier page (or resolved meanwhile)
+                groups.append({'entity_type': row['entity_type'], 'entity_id': row['entity_id'],
+                               'report_count': count, 'latest_id': row['id']})
+                latest[row['id']] = row
+                if len(groups) > limit:
+                    break
+            if len(rows) < _QUEUE_SCAN:
+                exhausted = True
+                break
+
+        next_cursor = None
+        if len(groups) > limit:
+            groups = groups[:limit]
+            next_cursor = str(groups[-1]['latest_id'])
+        elif not exhausted and before is not None:
+            next_cursor = str(before)
+        if not groups:
+            return jsonify({'reports': [], 'nextCursor': next_cursor}), 200
+
+        entities = {'post': {}, 'comment': {}}
+        post_ids = [g['entity_id'] for g in groups if g['entity_type'] == 'post']
+        comment_ids = [g['entity_id'] for g in groups if g['entity_type'] == 'comment']
+        if post_ids:
+            cursor.execute(
+                "SELECT id, channel_id, user_id, title, body, is_locked, is_deleted, created_at "
+                f"FROM posts WHERE id IN ({_placeholders(post_ids)})",
+                tuple(post_ids)
+            )
+            entities['post'] = {row['id']: row for row in cursor.fetchall()}
+        if comment_ids:
+            cursor.execute(
+                "SELECT id, post_id, user_id, body, is_deleted, created_at "
+                f"FROM comments WHERE id IN ({_placeholders(comment_ids)})",
+                tuple(comment_ids)
+            )
+            entities['comment'] = {row['id']: row for row in cursor.fetchall()}
+        author_cursor = conn.cursor(pymysql.cursors.Cursor)
+        try:
+            authors = _fetch_authors(
+                author_cursor,
+                {row['user_id'] for rows in entities.values() for row in rows.values()},
+                AUTHOR_PRIVATE
+            )
+        finally:
+            author_cursor.close()
+        for rows in entities.values():
+            for row in rows.values():
+                row['author'] = authors.get(row['user_id'])
+
+        reports = []
+        for g in groups:
+            report = latest.get(g['latest_id'], {})
+            reports.append({
+                'entity_type': g['entity_type'],
+                'entity_id': g['entity_id'],
+                'report_count': g['report_count'],
+                'latest_report_id': g['latest_id'],
+                'latest_reason': report.get('reason'),
+                'latest_reporter_id': report.get('reporter_id'),
+                'latest_reported_at': report.get('created_at'),
+                'entity': entities[g['entity_type']].get(g['entity_id']),
+            })
+        return jsonify({'reports': reports, 'nextCursor': next_cursor}), 200
+    finally:
+        cursor.close()
+        conn.close()
+
 @community.route('/mod/posts/<int:post_id>/delete', methods=['POST'])
-@jwt_required()
+@role_required('moderator', 'admin')
 def mod_delete_post(post_id):
-    identity = get_jwt_identity()
-    user_id = _get_user_id(identity)
-    if not user_id or not _is_mod_or_admin(user_id):
-        return jsonify({'error': 'Forbidden'}), 403
-
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("UPDATE posts SET is_deleted = 1 WHERE id = %s", (post_id,))
+        deleted = _delete_posts(cursor, [post_id])
         conn.commit()
+        _posts_deleted(deleted)
         return jsonify({'message': 'Post deleted'}), 200
     finally:
         cursor.close()
         conn.close()
 
 @community.route('/mod/comments/<int:comment_id>/delete', methods=['POST'])
-@jwt_required()
+@role_required('moderator', 'admin')
 def mod_delete_comment(comment_id):
-    identity = get_jwt_identity()
-    user_id = _get_user_id(identity)
-    if not user_id or not _is_mod_or_admin(user_id):
-        return jsonify({'error': 'Forbidden'}), 403
-
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("UPDATE comments SET is_deleted = 1 WHERE id = %s", (comment_id,))
+        deleted = _delete_comments(cursor, [comment_id])
         conn.commit()
+        _comments_deleted(deleted)
         return jsonify({'message': 'Comment deleted'}), 200
     finally:
         cursor.close()
         conn.close()
 
 @community.route('/mod/posts/<int:post_id>/lock', methods=['POST'])
-@jwt_required()
+@role_required('moderator', 'admin')
 def mod_lock_post(post_id):
-    identity = get_jwt_identity()
-    user_id = _get_user_id(identity)
-    if not user_id or not _is_mod_or_admin(user_id):
-        return jsonify({'error': 'Forbidden'}), 403
-
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("UPDATE posts SET is_locked = 1 WHERE id = %s", (post_id,))
+        _lock_posts(cursor, [post_id])
         conn.commit()
+        invalidate(f'post:{post_id}')
         return jsonify({'message': 'Post locked'}), 200
     finally:
         cursor.close()
         conn.close()
 
 @community.route('/mod/reports/<int:report_id>/resolve', methods=['POST'])
-@jwt_required()
+@role_required('moderator', 'admin')
 def mod_resolve_report(report_id):
-    identity = get_jwt_identity()
-    user_id = _get_user_id(identity)
-    if not user_id or not _is_mod_or_admin(user_id):
-        return jsonify({'error': 'Forbidden'}), 403
-
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("UPDATE reports SET status = 'resolved' WHERE id = %s", (report_id,))
+        _resolve_reports(cursor, report_ids=[report_id])
         conn.commit()
         return jsonify({'message': 'Report resolved'}), 200
     finally:
         cursor.close()
         conn.close()
 
+# Bulk forms: one transaction and a few set-based statements for up to MOD_MAX_BATCH ids.
+# With "resolve_reports": true, open reports on the affected posts/comments are resolved too.
+
+@community.route('/mod/posts:delete', methods=['POST'])
+@role_required('moderator', 'admin')
+def mod_delete_posts():
+    ids, resolve, error = _parse_mod_ids()
+    if error:
+        return error
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        deleted = _delete_posts(cursor, ids)
+        resolved = _resolve_reports(cursor, entity_type='post', entity_ids=ids) if resolve else 0
+        conn.commit()
+        _posts_deleted(deleted)
+        return jsonify({'deleted': sorted(deleted), 'reports_resolved': resolved}), 200
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+@community.route('/mod/comments:delete', methods=['POST'])
+@role_required('moderator', 'admin')
+def mod_delete_comments():
+    ids, resolve, error = _parse_mod_ids()
+    if error:
+        return error
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        deleted = _delete_comments(cursor, ids)
+        resolved = _resolve_reports(cursor, entity_type='comment', entity_ids=ids) if resolve else 0
+        conn.commit()
+        _comments_deleted(deleted)
+        return jsonify({'deleted': sorted(deleted), 'reports_resolved': resolved}), 200
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+@community.route('/mod/posts:lock', methods=['POST'])
+@role_required('moderator', 'admin')
+def mod_lock_posts():
+    ids, resolve, error = _parse_mod_ids()
+    if error:
+        return error
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        locked = _lock_posts(cursor, ids)
+        resolved = _resolve_reports(cursor, entity_type='post', entity_ids=ids) if resolve else 0
+        conn.commit()
+        invalidate(*(f'post:{post_id}' for post_id in ids))
+        return jsonify({'locked': locked, 'reports_resolved': resolved}), 200
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+@community.route('/mod/reports:resolve', methods=['POST'])
+@role_required('moderator', 'admin')
+def mod_resolve_reports():
+    """Resolve reports by id ({"ids": [...]}) or every open report on entities
+    ({"entity_type": "post" | "comment", "entity_ids": [...]}), or both."""
+    data = request.json or {}
+    report_ids = _parse_ids(data['ids']) if data.get('ids') else []
+    entity_type = data.get('entity_type')
+    entity_ids = _parse_ids(data['entity_ids']) if data.get('entity_ids') else []
+    if report_ids is None or entity_ids is None or not (report_ids or entity_ids):
+        return jsonify({'error': 'ids or entity_ids required'}), 400
+    if entity_ids and entity_type not in ('post', 'comment'):
+        return jsonify({'error': 'Invalid entity_type'}), 400
+    if len(report_ids) + len(entity_ids) > MOD_MAX_BATCH:
+        return jsonify({'error': f'At most {MOD_MAX_BATCH} ids'}), 400
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        resolved = _resolve_reports(cursor, report_ids, entity_type, entity_ids)
+        conn.commit()
+        return jsonify({'reports_resolved': resolved}), 200
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+def _publish_post(conn, post_id):
+    """Push a just-committed post, shaped like list_posts entries, to its channel's stream.
+
+    The post is already committed, so a failure here is logged and never fails the request.
+    """
+    cursor = conn.cursor(pymysql.cursors.Cursor)
+    try:
+        cursor.execute("SELECT " + POST_SUMMARY.columns + ", channel_id FROM posts WHERE id = %s", (post_id,))
+        row = cursor.fetchone()
+        if row:
+            post = POST_SUMMARY.encode(row)
+            post['author'] = _fetch_authors(cursor, [row[_SUMMARY_USER_ID]]).get(row[_SUMMARY_USER_ID])
+            post['user_reaction'] = None
+            post['channel_id'] = row[-1]
+            pubsub.publish('post', post, f'channel:{row[-1]}')
+    except Exception:
+        log.exception('Could not publish post %s', post_id)
+    finally:
+        cursor.close()
+
+def _publish_comment(conn, post_id, comment_id):
+    """Push a just-committed comment, shaped like list_comments entries, to its post's stream.
+
+    Like _publish_post, a failure is logged and never fails the request.
+    """
+    cursor = conn.cursor(pymysql.cursors.Cursor)
+    try:
+        cursor.execute("SELECT " + COMMENT.columns + " FROM comments WHERE id = %s", (comment_id,))
+        row = cursor.fetchone()
+        if row:
+            comment = COMMENT.encode(row)
+            comment['author'] = _fetch_authors(cursor, [row[_COMMENT_USER_ID]]).get(row[_COMMENT_USER_ID])
+            comment['post_id'] = post_id
+            pubsub.publish('comment', comment, f'post:{post_id}')
+    except Exception:
+        log.exception('Could not publish comment %s', comment_id)
+    finally:
+        cursor.close()
+
+# EventSource can't set an Authorization header, so streams also accept ?jwt=<token>
+_STREAM_TOKEN_LOCATIONS = ('headers', 'query_string')
+
+def _stream(topic, owner):
+    """Server-Sent Events response that relays the hub's frames for one topic.
+
+    `owner` is who the stream counts against for PUBSUB_MAX_PER_USER.
+    """
+    try:
+        sub = pubsub.hub.subscribe(topic, owner)
+    except pubsub.TooManyStreamsForUser:
+        response = jsonify({'error': 'Too many open streams for this user'})
+        response.headers['Retry-After'] = '30'
+        return response, 429
+    except pubsub.TooManySubscribers:
+        response = jsonify({'error': 'Too many open streams, poll instead'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    # A reconnecting client may have missed events; there is no replay, so ask it to refetch
+    resync = request.headers.get('Last-Event-ID') is not None
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n" + ("event: resync\ndata: {}\n\n" if resync else "")
+            while True:
+                yield sub.get(pubsub.HEARTBEAT) or ": keepalive\n\n"
+        finally:
+            pubsub.hub.unsubscribe(sub)
+
+    # Not wrapped in stream_with_context: the request's pooled connection is
+    # released as soon as this returns, not held for the life of the stream
+    response = Response(generate(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Also unsubscribe if the client goes away before the generator ever runs
+    response.call_on_close(lambda: pubsub.hub.unsubscribe(sub))
+    return response
+
+@community.route('/channels/<int:channel_id>/stream', methods=['GET'])
+@jwt_required(locations=_STREAM_TOKEN_LOCATIONS)
+def stream_channel(channel_id):
+    """Push new posts, post removals and reaction deltas for one channel; same auth as list_posts."""
+    user_id = current_user_id()
+    if not user_id:
+        return jsonify({'error': 'Unauthorized'}), 401
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT id FROM channels WHERE id = %s", (channel_id,))
+        if not cursor.fetchone():
+            return jsonify({'error': 'Not found'}), 404
+    finally:
+        cursor.close()
+        conn.close()
+    return _stream(f'channel:{channel_id}', ('user', user_id))
+
+@community.route('/posts/<int:post_id>/stream', methods=['GET'])
+@jwt_required(optional=True, locations=_STREAM_TOKEN_LOCATIONS)
+def stream_post(post_id):
+    """Push new comments, comment removals, reaction deltas and the post's own removal.
+
+    Public like get_post; anonymous streams are counted per client address.
+    """
+    user_id = current_user_id()
+    owner = ('user', user_id) if user_id else ('addr', request.remote_addr)
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT id FROM posts WHERE id = %s AND is_deleted = 0", (post_id,))
+        if not cursor.fetchone():
+            return jsonify({'error': 'Not found'}), 404
+    finally:
+        cursor.close()
+        conn.close()
+    return _stream(f'post:{post_id}', owner)
+
 
 @community.route('/posts/<int:post_id>/react', methods=['POST'])
 @jwt_required()
 def react_to_post(post_id):
-    identity = get_jwt_identity()
-    user_id = _get_user_id(identity)
+    user_id = current_user_id()
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
 
     data = request.json or {}
-    reaction = data.get('reaction')  # 1 for like, -1 for dislike
+    reaction = data.get('reaction')  # 1 for like, -1 for dislike, 0 to remove
 
-    if reaction not in [1, -1]:
+    if reaction not in [1, -1, 0]:
         return jsonify({'error': 'Invalid reaction'}), 400
 
     conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        # Check if the user has already reacted to the post
-        cursor.execute(
-            "SELECT id, reaction FROM likes WHERE post_id = %s AND user_id = %s",
-            (post_id, user_id)
-        )
-        existing_reaction = cursor.fetchone()
-
-        if existing_reaction:
-            # If a reaction exists, update it
-            old_reaction = existing_reaction['reaction']
-            if old_reaction == 1 and reaction == -1:
-                # If the user was previously liking and now dislikes
-                cursor.execute(
-                    "UPDATE posts SET likes = likes - 1, dislikes = dislikes + 1 WHERE id = %s",
-                    (post_id,)
-                )
-            elif old_reaction == -1 and reaction == 1:
-                # If the user was previously disliking and now likes
-                cursor.execute(
-                    "UPDATE posts SET likes = likes + 1, dislikes = dislikes - 1 WHERE id = %s",
-                    (post_id,)
-                )
-            
-            cursor.execute(
-                "UPDATE likes SET reaction = %s WHERE id = %s",
-                (reaction, existing_reaction['id'])
-            )
-
-        else:
-            # If no reaction exists, insert a new record
-            cursor.execute(
-                "INSERT INTO likes (post_id, user_id, reaction) VALUES (%s, %s, %s)",
-                (post_id, user_id, reaction)
-            )
-            if reaction == 1:
-                cursor.execute(
-                    "UPDATE posts SET likes = likes + 1 WHERE id = %s",
-                    (post_id,)
-                )
-            elif reaction == -1:
-                cursor.execute(
-                    "UPDATE posts SET dislikes = dislikes + 1 WHERE id = %s",
-                    (post_id,)
-                )
-
-        conn.commit()
-        return jsonify({'message': 'Reaction updated'}), 200
+        apply_reaction(conn, post_id, user_id, reaction)
+        invalidate(f'post:{post_id}')
+        return jsonify({'message': 'Reaction updated', 'reaction': reaction or None}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({'error': 'Could not update reaction', "error string": str(e)}), 500
+    finally:
+        conn.close()
+
+@community.route('/posts/reactions:batch', methods=['POST'])
+@jwt_required()
+def get_reactions_batch():
+    """Counts and the caller's own reaction for up to MAX_BATCH posts, in one query."""
+    user_id = current_user_id()
+    if not user_id:
+        return jsonify({'error': 'Unauthorized'}), 401
+    post_ids = _parse_ids((request.json or {}).get('post_ids'))
+    if post_ids is None:
+        return jsonify({'error': 'Invalid post_ids'}), 400
+    if len(post_ids) > MAX_BATCH:
+        return jsonify({'error': f'At most {MAX_BATCH} post_ids'}), 400
+
+    conn = get_db_connection()
+    cursor = conn.cursor(pymysql.cursors.Cursor)
+    try:
+        cursor.execute(REACTIONS_BATCH_SQL.format(ids=_placeholders(post_ids)), [user_id] + post_ids)
+        by_id = {
+            row[0]: {'post_id': row[0], 'likes': row[1], 'dislikes': row[2], 'user_reaction': row[3]}
+            for row in cursor.fetchall()
+        }
+        return jsonify({'reactions': [by_id[i] for i in post_ids if i in by_id]}), 200
     finally:
         cursor.close()
         conn.close()
 
 @community.route('/posts/<int:post_id>/reactions', methods=['GET'])
+@cached('post:{post_id}')
 def get_post_reactions(post_id):
     conn = get_db_connection()
     cursor = conn.cursor(pymysql.cursors.DictCursor)
     try:
-        cursor.execute(
-            "SELECT reaction, COUNT(*) AS count FROM likes WHERE post_id = %s GROUP BY reaction",
-            (post_id,)
-        )
+        cursor.execute(POST_REACTIONS_SQL, (post_id,))
         reactions = cursor.fetchall()
 
         # Prepare response for likes and dislikes count
@@ -449,18 +1020,14 @@ def get_post_reactions(post_id):
 @community.route('/posts/<int:post_id>/my_reaction', methods=['GET'])
 @jwt_required()
 def get_user_reaction(post_id):
-    identity = get_jwt_identity()
-    user_id = _get_user_id(identity)
+    user_id = current_user_id()
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
 
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute(
-            "SELECT reaction FROM likes WHERE post_id = %s AND user_id = %s",
-            (post_id, user_id)
-        )
+        cursor.execute(USER_REACTION_SQL, (post_id, user_id))
         user_reaction = cursor.fetchone()
 
         if not user_reaction:
@@ -1,37 +1,16 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
+from utils import archiver, scheduler, search
 from utils.db_helper import get_db_connection
+from utils.identity import current_user_id, role_required
+from utils.response_cache import cached, invalidate
+from utils.serializers import EVENT, iso
 import pymysql
 import uuid
 from datetime import datetime, timezone
 
 events = Blueprint('events', __name__)
 
-def _get_user_id(email):
-    conn = get_db_connection()
-    cursor = conn.cursor(pymysql.cursors.DictCursor)
-    try:
-        cursor.execute("SELECT id FROM users WHERE email = %s", (email,))
-        row = cursor.fetchone()
-        return row['id'] if row else None
-    finally:
-        cursor.close()
-        conn.close()
-
-def _get_user_role(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(pymysql.cursors.DictCursor)
-    try:
-        cursor.execute("SELECT role FROM user_roles WHERE user_id = %s", (user_id,))
-        row = cursor.fetchone()
-        return row['role'] if row else 'user'
-    finally:
-        cursor.close()
-        conn.close()
-
-def _is_admin(user_id):
-    return _get_user_role(user_id) == 'admin'
-
 def _parse_iso(s):
     if s is None:
         return None
@@ -44,65 +23,85 @@ def _parse_iso(s):
         dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
     return dt
 
-def _to_iso(dt):
-    if dt is None:
-        return None
-    return dt.replace(microsecond=0).isoformat() + 'Z'
+# Oldest waitlisted RSVPs first; {limit} is " LIMIT %s" when the event has a capacity
+WAITLIST_SQL = "SELECT id FROM event_rsvps WHERE event_id = %s AND status = 'waitlisted' ORDER BY id{limit} FOR UPDATE"
+
+def _promote_waitlist(cur, event_id):
+    """Move waitlisted RSVPs into any free seats, oldest first. Caller commits.
 
-def _ensure_tables():
+    Expects a plain (tuple) cursor.
+
+    Locks the event row first so seat accounting is serialised with create_rsvp.
+    """
+    cur.execute(
+        "SELECT capacity, going_count FROM events WHERE id = %s FOR UPDATE",
+        (event_id,)
+    )
+    ev = cur.fetchone()
+    if not ev:
+        return 0
+    capacity, going_count = ev
+    if capacity is None:
+        cur.execute(WAITLIST_SQL.format(limit=''), (event_id,))
+    else:
+        free = capacity - going_count
+        if free <= 0:
+            return 0
+        cur.execute(WAITLIST_SQL.format(limit=' LIMIT %s'), (event_id, free))
+    ids = [r[0] for r in cur.fetchall()]
+    if ids:
+        placeholders = ','.join(['%s'] * len(ids))
+        cur.execute(f"UPDATE event_rsvps SET status = 'going' WHERE id IN ({placeholders})", tuple(ids))
+        cur.execute("UPDATE events SET going_count = going_count + %s WHERE id = %s", (len(ids), event_id))
+    return len(ids)
+
+_ID = EVENT.index['id']
+_STARTS_AT = EVENT.index['starts_at']
+_TITLE = EVENT.index['title']
+_TYPE = EVENT.index['type']
+_HOST = EVENT.index['host']
+
+MAX_BATCH = 100
+RSVP_DELETE_CHUNK = 1000
+
+# Hot statements; utils/explain_check.py EXPLAINs these same strings
+GET_EVENT_SQL = "SELECT " + EVENT.columns + " FROM events WHERE id = %s"
+EVENTS_BATCH_SQL = "SELECT " + EVENT.columns + " FROM events WHERE id IN ({ids})"
+LIST_EVENTS_SQL = (
+    "SELECT " + EVENT.columns + " FROM events WHERE status = %s{after} "
+    "ORDER BY starts_at DESC, id DESC LIMIT %s"
+)
+LIST_EVENTS_AFTER = " AND (starts_at < %s OR (starts_at = %s AND id < %s))"
+# Claim a seat with one conditional increment; no COUNT(*) over event_rsvps
+CLAIM_SEAT_SQL = (
+    "UPDATE events SET going_count = going_count + 1 "
+    "WHERE id = %s AND status = 'upcoming' AND (capacity IS NULL OR going_count < capacity)"
+)
+
+def _get_events_batch(raw_ids):
+    """Serve `GET /events?ids=a,b,c`: the requested events in request order, unknown ids omitted."""
+    ids = list(dict.fromkeys(i for i in raw_ids.split(',') if i))
+    if not ids:
+        return jsonify({'error': 'Invalid ids'}), 400
+    if len(ids) > MAX_BATCH:
+        return jsonify({'error': f'At most {MAX_BATCH} ids'}), 400
     conn = get_db_connection()
-    cursor = conn.cursor()
+    cur = conn.cursor(pymysql.cursors.Cursor)
     try:
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS events (
-              id VARCHAR(64) PRIMARY KEY,
-              title VARCHAR(255) NOT NULL,
-              type VARCHAR(100) NOT NULL,
-              starts_at DATETIME NOT NULL,
-              host VARCHAR(255) NOT NULL,
-              status ENUM('upcoming','past') NOT NULL,
-              capacity INT DEFAULT NULL,
-              created_by INT NOT NULL,
-              created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-              updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-            )
-        """)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS event_rsvps (
-              id INT AUTO_INCREMENT PRIMARY KEY,
-              event_id VARCHAR(64) NOT NULL,
-              user_id INT NOT NULL,
-              status ENUM('going') NOT NULL,
-              created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-              UNIQUE KEY unique_rsvp (event_id, user_id)
-            )
-        """)
-        conn.commit()
+        cur.execute(EVENTS_BATCH_SQL.format(ids=','.join(['%s'] * len(ids))), tuple(ids))
+        encode = EVENT.encode
+        by_id = {row[_ID]: encode(row) for row in cur.fetchall()}
+        return jsonify({'items': [by_id[i] for i in ids if i in by_id], 'nextCursor': None}), 200
     finally:
-        cursor.close()
+        cur.close()
         conn.close()
 
-try:
-    _ensure_tables()
-except Exception:
-    pass
-
-def _event_row_to_json(row):
-    return {
-        'id': row['id'],
-        'title': row['title'],
-        'type': row['type'],
-        'startsAt': _to_iso(row['starts_at']),
-        'host': row['host'],
-        'status': row['status'],
-        'capacity': row['capacity'],
-        'createdBy': row['created_by'],
-        'createdAt': _to_iso(row['created_at']),
-        'updatedAt': _to_iso(row['updated_at']),
-    }
-
 @events.route('/', methods=['GET'])
+@cached('events')
 def list_events():
+    raw_ids = request.args.get('ids')
+    if raw_ids is not None:
+        return _get_events_batch(raw_ids)
     status = request.args.get('status', 'upcoming')
     if status not in ['upcoming', 'past']:
         return jsonify({'error': 'Invalid status'}), 400
@@ -113,7 +112,7 @@ def list_events():
         limit = 20
     cursor_param = request.args.get('cursor')
     conn = get_db_connection()
-    cur = conn.cursor(pymysql.cursors.DictCursor)
+    cur = conn.cursor(pymysql.cursors.Cursor)
     try:
         params = [status]
         where_cursor = ""
@@ -125,53 +124,43 @@ def list_events():
                 cid = cursor_param
                 cur.execute("SELECT starts_at FROM events WHERE id = %s", (cid,))
                 r = cur.fetchone()
-                cdt = r['starts_at'] if r else None
+                cdt = r[0] if r else None
             if cdt:
-                where_cursor = " AND (starts_at < %s OR (starts_at = %s AND id < %s))"
+                where_cursor = LIST_EVENTS_AFTER
                 params.extend([cdt, cdt, cid])
-        q = (
-            "SELECT id, title, type, starts_at, host, status, capacity, created_by, created_at, updated_at "
-            "FROM events WHERE status = %s" + where_cursor +
-            " ORDER BY starts_at DESC, id DESC LIMIT %s"
-        )
         params.append(limit)
-        cur.execute(q, tuple(params))
+        cur.execute(LIST_EVENTS_SQL.format(after=where_cursor), tuple(params))
         rows = cur.fetchall()
-        items = [_event_row_to_json(r) for r in rows]
+        encode = EVENT.encode
+        items = [encode(r) for r in rows]
         next_cursor = None
         if len(rows) == limit:
             last = rows[-1]
-            next_cursor = f"{last['id']}|{_to_iso(last['starts_at'])}"
+            next_cursor = f"{last[_ID]}|{iso(last[_STARTS_AT])}"
         return jsonify({'items': items, 'nextCursor': next_cursor}), 200
     finally:
         cur.close()
         conn.close()
 
 @events.route('/<string:event_id>', methods=['GET'])
+@cached('event:{event_id}')
 def get_event(event_id):
     conn = get_db_connection()
-    cur = conn.cursor(pymysql.cursors.DictCursor)
+    cur = conn.cursor(pymysql.cursors.Cursor)
     try:
-        cur.execute(
-            "SELECT id, title, type, starts_at, host, status, capacity, created_by, created_at, updated_at "
-            "FROM events WHERE id = %s",
-            (event_id,)
-        )
+        cur.execute(GET_EVENT_SQL, (event_id,))
         row = cur.fetchone()
         if not row:
             return jsonify({'error': 'Not found'}), 404
-        return jsonify(_event_row_to_json(row)), 200
+        return jsonify(EVENT.encode(row)), 200
     finally:
         cur.close()
         conn.close()
 
 @events.route('/', methods=['POST'])
-@jwt_required()
+@role_required('admin')
 def create_event():
-    identity = get_jwt_identity()
-    user_id = _get_user_id(identity)
-    if not user_id or not _is_admin(user_id):
-        return jsonify({'error': 'Forbidden'}), 403
+    user_id = current_user_id()
     data = request.json or {}
     title = data.get('title')
     etype = data.get('type')
@@ -193,7 +182,7 @@ def create_event():
     status = 'upcoming' if starts_at > datetime.utcnow() else 'past'
     eid = str(uuid.uuid4())
     conn = get_db_connection()
-    cur = conn.cursor(pymysql.cursors.DictCursor)
+    cur = conn.cursor(pymysql.cursors.Cursor)
     try:
         cur.execute(
             "INSERT INTO events (id, title, type, starts_at, host, status, capacity, created_by) "
@@ -201,13 +190,12 @@ def create_event():
             (eid, title, etype, starts_at, host, status, capacity, user_id)
         )
         conn.commit()
-        cur.execute(
-            "SELECT id, title, type, starts_at, host, status, capacity, created_by, created_at, updated_at "
-            "FROM events WHERE id = %s",
-            (eid,)
-        )
+        invalidate('events')
+        scheduler.notify()
+        search.index_event(eid, title, etype, host)
+        cur.execute(GET_EVENT_SQL, (eid,))
         row = cur.fetchone()
-        return jsonify(_event_row_to_json(row)), 201
+        return jsonify(EVENT.encode(row)), 201
     except Exception:
         conn.rollback()
         return jsonify({'error': 'Server error'}), 500
@@ -216,12 +204,8 @@ def create_event():
         conn.close()
 
 @events.route('/<string:event_id>', methods=['PATCH'])
-@jwt_required()
+@role_required('admin')
 def update_event(event_id):
-    identity = get_jwt_identity()
-    user_id = _get_user_id(identity)
-    if not user_id or not _is_admin(user_id):
-        return jsonify({'error': 'Forbidden'}), 403
     data = request.json or {}
     fields = []
     values = []
@@ -261,38 +245,40 @@ def update_event(event_id):
     if not fields:
         return jsonify({'error': 'Invalid payload'}), 400
     conn = get_db_connection()
-    cur = conn.cursor(pymysql.cursors.DictCursor)
+    cur = conn.cursor(pymysql.cursors.Cursor)
     try:
         q = "UPDATE events SET " + ", ".join(fields) + " WHERE id = %s"
         values.append(event_id)
         cur.execute(q, tuple(values))
+        if 'capacity' in data:
+            _promote_waitlist(cur, event_id)
         conn.commit()
-        cur.execute(
-            "SELECT id, title, type, starts_at, host, status, capacity, created_by, created_at, updated_at "
-            "FROM events WHERE id = %s",
-            (event_id,)
-        )
+        invalidate('events', f'event:{event_id}')
+        if 'startsAt' in data or 'status' in data:
+            scheduler.notify()
+        cur.execute(GET_EVENT_SQL, (event_id,))
         row = cur.fetchone()
         if not row:
             return jsonify({'error': 'Not found'}), 404
-        return jsonify(_event_row_to_json(row)), 200
+        search.index_event(event_id, row[_TITLE], row[_TYPE], row[_HOST])
+        return jsonify(EVENT.encode(row)), 200
     finally:
         cur.close()
         conn.close()
 
 @events.route('/<string:event_id>', methods=['DELETE'])
-@jwt_required()
+@role_required('admin')
 def delete_event(event_id):
-    identity = get_jwt_identity()
-    user_id = _get_user_id(identity)
-    if not user_id or not _is_admin(user_id):
-        return jsonify({'error': 'Forbidden'}), 403
     conn = get_db_connection()
     cur = conn.cursor()
     try:
-        cur.execute("DELETE FROM event_rsvps WHERE event_id = %s", (event_id,))
+        # The event goes first so no new RSVPs can land, then its RSVPs in short
+        # transactions instead of one DELETE that locks every row at once
         cur.execute("DELETE FROM events WHERE id = %s", (event_id,))
         conn.commit()
+        archiver.delete_in_chunks(conn, 'event_rsvps', "event_id = %s", (event_id,), chunk=RSVP_DELETE_CHUNK)
+        invalidate('events', f'event:{event_id}')
+        search.remove('event', event_id)
         return '', 204
     finally:
         cur.close()
@@ -301,8 +287,7 @@ def delete_event(event_id):
 @events.route('/<string:event_id>/rsvp', methods=['POST'])
 @jwt_required()
 def create_rsvp(event_id):
-    identity = get_jwt_identity()
-    user_id = _get_user_id(identity)
+    user_id = current_user_id()
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
     data = request.json or {}
@@ -312,28 +297,40 @@ def create_rsvp(event_id):
     conn = get_db_connection()
     cur = conn.cursor(pymysql.cursors.DictCursor)
     try:
-        cur.execute("SELECT id, capacity, status FROM events WHERE id = %s", (event_id,))
-        ev = cur.fetchone()
-        if not ev:
-            return jsonify({'error': 'Not found'}), 404
-        if ev['status'] == 'past':
-            return jsonify({'error': 'Invalid payload'}), 400
-        cur.execute("SELECT id FROM event_rsvps WHERE event_id = %s AND user_id = %s", (event_id, user_id))
-        existing = cur.fetchone()
-        if existing:
+        claimed = cur.execute(CLAIM_SEAT_SQL, (event_id,))
+        if claimed:
+            rsvp_status = 'going'
+        else:
+            # Either missing, past, or full; re-check under the row lock before waitlisting
+            cur.execute(
+                "SELECT status, capacity, going_count FROM events WHERE id = %s FOR UPDATE",
+                (event_id,)
+            )
+            ev = cur.fetchone()
+            if not ev:
+                conn.rollback()
+                return jsonify({'error': 'Not found'}), 404
+            if ev['status'] == 'past':
+                conn.rollback()
+                return jsonify({'error': 'Invalid payload'}), 400
+            if ev['capacity'] is None or ev['going_count'] < ev['capacity']:
+                # A seat was freed between the two statements
+                cur.execute("UPDATE events SET going_count = going_count + 1 WHERE id = %s", (event_id,))
+                rsvp_status = 'going'
+            else:
+                rsvp_status = 'waitlisted'
+        try:
+            cur.execute(
+                "INSERT INTO event_rsvps (event_id, user_id, status) VALUES (%s, %s, %s)",
+                (event_id, user_id, rsvp_status)
+            )
+        except pymysql.err.IntegrityError:
+            # Already RSVPed; rolling back also returns the seat we claimed
+            conn.rollback()
             return jsonify({'error': 'Conflict'}), 409
-        if ev['capacity'] is not None:
-            cur.execute("SELECT COUNT(*) AS c FROM event_rsvps WHERE event_id = %s", (event_id,))
-            cnt = cur.fetchone()['c']
-            if cnt >= ev['capacity']:
-                return jsonify({'error': 'Conflict'}), 409
-        cur2 = conn.cursor()
-        cur2.execute(
-            "INSERT INTO event_rsvps (event_id, user_id, status) VALUES (%s, %s, %s)",
-            (event_id, user_id, 'going')
-        )
         conn.commit()
-        return jsonify({'eventId': event_id, 'userId': user_id, 'status': 'going'}), 201
+        invalidate('events', f'event:{event_id}')
+        return jsonify({'eventId': event_id, 'userId': user_id, 'status': rsvp_status}), 201
     except Exception:
         conn.rollback()
         return jsonify({'error': 'Server error'}), 500
@@ -344,16 +341,36 @@ def create_rsvp(event_id):
 @events.route('/<string:event_id>/rsvp', methods=['DELETE'])
 @jwt_required()
 def delete_rsvp(event_id):
-    identity = get_jwt_identity()
-    user_id = _get_user_id(identity)
+    user_id = current_user_id()
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
     conn = get_db_connection()
-    cur = conn.cursor()
+    cur = conn.cursor(pymysql.cursors.Cursor)
     try:
-        cur.execute("DELETE FROM event_rsvps WHERE event_id = %s AND user_id = %s", (event_id, user_id))
+        # Lock the event before the RSVP, the same order as create_rsvp, so a
+        # cancel and a join on one event can't deadlock
+        cur.execute("SELECT id FROM events WHERE id = %s FOR UPDATE", (event_id,))
+        cur.execute(
+            "SELECT id, status FROM event_rsvps WHERE event_id = %s AND user_id = %s FOR UPDATE",
+            (event_id, user_id)
+        )
+        rsvp = cur.fetchone()
+        if rsvp:
+            rsvp_id, rsvp_status = rsvp
+            cur.execute("DELETE FROM event_rsvps WHERE id = %s", (rsvp_id,))
+            if rsvp_status == 'going':
+                # Free the seat, then hand it to the head of the waitlist
+                cur.execute(
+                    "UPDATE events SET going_count = going_count - 1 WHERE id = %s AND going_count > 0",
+                    (event_id,)
+                )
+                _promote_waitlist(cur, event_id)
         conn.commit()
+        invalidate('events', f'event:{event_id}')
         return '', 204
+    except Exception:
+        conn.rollback()
+        return jsonify({'error': 'Server error'}), 500
     finally:
         cur.close()
         conn.close()
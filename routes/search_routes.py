@@ -0,0 +1,84 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from utils.db_helper import get_db_connection
+from utils import search as search_index
+from utils.serializers import COMMENT_C, EVENT, POST_SUMMARY
+import pymysql
+
+search = Blueprint('search', __name__)
+
+def _hydrate(cursor, hits):
+    """Load the live rows behind a page of hits, one IN query per kind.
+
+    Deleted rows drop out, as do comments whose post was deleted.
+    """
+    ids = {'post': [], 'comment': [], 'event': []}
+    for kind, doc_id, _ in hits:
+        ids[kind].append(doc_id)
+    docs = {}
+    if ids['post']:
+        placeholders = ','.join(['%s'] * len(ids['post']))
+        cursor.execute(
+            f"SELECT {POST_SUMMARY.columns}, channel_id FROM posts WHERE id IN ({placeholders}) AND is_deleted = 0",
+            tuple(ids['post'])
+        )
+        for row in cursor.fetchall():
+            doc = POST_SUMMARY.encode(row)
+            doc['channel_id'] = row[-1]
+            docs[('post', str(doc['id']))] = doc
+    if ids['comment']:
+        placeholders = ','.join(['%s'] * len(ids['comment']))
+        cursor.execute(
+            f"SELECT {COMMENT_C.columns}, c.post_id FROM comments c "
+            "JOIN posts p ON p.id = c.post_id AND p.is_deleted = 0 "
+            f"WHERE c.id IN ({placeholders}) AND c.is_deleted = 0",
+            tuple(ids['comment'])
+        )
+        for row in cursor.fetchall():
+            doc = COMMENT_C.encode(row)
+            doc['post_id'] = row[-1]
+            docs[('comment', str(doc['id']))] = doc
+    if ids['event']:
+        placeholders = ','.join(['%s'] * len(ids['event']))
+        cursor.execute(f"SELECT {EVENT.columns} FROM events WHERE id IN ({placeholders})", tuple(ids['event']))
+        for row in cursor.fetchall():
+            doc = EVENT.encode(row)
+            docs[('event', doc['id'])] = doc
+    return docs
+
+@search.route('/', methods=['GET'])
+@jwt_required()
+def search_all():
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    # De-duplicated so ?type=post,post doesn't UNION the same source twice
+    raw_kinds = (request.args.get('type') or ','.join(search_index.KINDS)).split(',')
+    kinds = tuple(dict.fromkeys(k.strip() for k in raw_kinds if k.strip()))
+    if not kinds or any(k not in search_index.KINDS for k in kinds):
+        return jsonify({'error': 'Invalid type'}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 50))
+    except Exception:
+        limit = 20
+    after = search_index.parse_cursor(request.args.get('cursor'))
+
+    hits = search_index.search(query, kinds, limit + 1, after)
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = search_index.make_cursor(hits[-1])
+
+    conn = get_db_connection()
+    cursor = conn.cursor(pymysql.cursors.Cursor)
+    try:
+        docs = _hydrate(cursor, hits)
+    finally:
+        cursor.close()
+        conn.close()
+    results = []
+    for kind, doc_id, score in hits:
+        doc = docs.get((kind, doc_id))
+        if doc is not None:
+            results.append({'type': kind, 'score': round(score, 4), kind: doc})
+    return jsonify({'results': results, 'nextCursor': next_cursor}), 200
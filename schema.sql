@@ -1,7 +0,0 @@
-CREATE TABLE users (
-  id INT AUTO_INCREMENT PRIMARY KEY,
-  name VARCHAR(100),
-  email VARCHAR(100) UNIQUE,
-  password_hash TEXT,
-  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
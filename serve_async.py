@@ -0,0 +1,36 @@
+"""Async serving mode: run the unchanged Flask app on gevent.
+
+Each request runs in a greenlet. Monkey-patching turns every blocking socket
+call into a cooperative yield: pymysql to MySQL, requests to Stripe/PayPal,
+and grpc to Gemini. Handlers stay plain synchronous functions, and one process
+holds thousands of in-flight requests while they wait on I/O.
+
+    python serve_async.py
+    # or, under gunicorn: gunicorn -k gevent --worker-connections 2000 serve_async:app
+"""
+from gevent import monkey
+
+# Must run before anything imports socket, ssl, threading or pymysql
+monkey.patch_all()
+
+try:
+    # The Gemini SDK talks gRPC, which needs its own gevent integration
+    import grpc.experimental.gevent as grpc_gevent
+    grpc_gevent.init_gevent()
+except ImportError:
+    pass
+
+import os
+
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIServer
+
+from app import app
+
+if __name__ == '__main__':
+    port = int(os.getenv('PORT', 1345))
+    # Bound in-flight requests; DB work still queues on the connection pool (DB_POOL_*)
+    concurrency = int(os.getenv('ASYNC_MAX_CONCURRENCY', 2000))
+    server = WSGIServer(('0.0.0.0', port), app, spawn=Pool(concurrency))
+    print(f"Serving on 0.0.0.0:{port} (gevent, up to {concurrency} concurrent requests)")
+    server.serve_forever()
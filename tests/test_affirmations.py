@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+from utils import affirmations
+from utils.affirmations import FALLBACK_AFFIRMATION, AffirmationService
+
+
+class BlockingGenerator:
+    """Generator stub that holds every call until released, tracking concurrency."""
+
+    source = 'stub'
+
+    def __init__(self, text='You are enough.'):
+        self.text = text
+        self.release = threading.Event()
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            self.release.wait(2)
+            return self.text
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError('condition not met in time')
+        time.sleep(0.005)
+
+
+@pytest.fixture(autouse=True)
+def no_installed_service():
+    yield
+    affirmations.configure(None)
+
+
+def test_concurrent_requests_share_one_refill():
+    generator = BlockingGenerator()
+    service = AffirmationService(generator, pool_size=3, low_water=1, timeout=0.05)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.get())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(1)
+
+    assert results == [(FALLBACK_AFFIRMATION, 'fallback')] * 8
+    assert generator.calls == 1
+    generator.release.set()
+    wait_until(lambda: not service._refilling)
+    assert generator.max_active == 1
+    assert service.get() == ('You are enough.', 'stub')
+
+
+def test_empty_pool_falls_back_after_timeout():
+    generator = BlockingGenerator()
+    service = AffirmationService(generator, pool_size=2, timeout=0.05)
+
+    started = time.monotonic()
+    assert service.get() == (FALLBACK_AFFIRMATION, 'fallback')
+    assert time.monotonic() - started < 1.0
+    assert service.stats['served_fallback'] == 1
+    generator.release.set()
+
+
+def test_request_waits_for_a_refill_that_finishes_within_timeout():
+    generator = BlockingGenerator()
+    service = AffirmationService(generator, pool_size=1, timeout=2.0)
+    threading.Timer(0.05, generator.release.set).start()
+
+    assert service.get() == ('You are enough.', 'stub')
+    assert service.stats['served_pool'] == 1
+
+
+def test_expired_entries_are_served_while_refilling():
+    generator = BlockingGenerator()
+    generator.release.set()
+    service = AffirmationService(generator, pool_size=1, max_age=0.05, timeout=0.05)
+    service.warm()
+    wait_until(lambda: service.stats['generated'] == 1 and not service._refilling)
+
+    generator.release.clear()
+    time.sleep(0.06)
+    assert service.get() == ('You are enough.', 'stub')
+    assert service.stats['served_stale'] == 1
+    generator.release.set()
+
+
+def test_failing_generator_backs_off_instead_of_retrying_per_request():
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise RuntimeError('upstream down')
+
+    service = AffirmationService(failing, pool_size=2, timeout=0.05)
+    assert service.get() == (FALLBACK_AFFIRMATION, 'fallback')
+    wait_until(lambda: not service._refilling)
+    assert service.get() == (FALLBACK_AFFIRMATION, 'fallback')
+    assert len(calls) == 1
+    assert service.stats['generator_errors'] == 1
+
+
+def test_configure_installs_a_local_generator():
+    affirmations.configure(lambda: 'Breathe.', pool_size=1, timeout=1.0)
+    assert affirmations.get_affirmation() == ('Breathe.', 'generator')
+    assert affirmations.stats()['served_pool'] == 1
@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pytest
+
+from utils.db_helper import ConnectionPool, PoolExhausted
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.rollbacks = 0
+        self.ping_error = None
+        self.rollback_error = None
+
+    def ping(self, reconnect=False):
+        if self.ping_error:
+            raise self.ping_error
+
+    def rollback(self):
+        if self.rollback_error:
+            raise self.rollback_error
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**kwargs):
+    opened = []
+
+    def connect():
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    kwargs.setdefault('timeout', 0.05)
+    return ConnectionPool(connect=connect, **kwargs), opened
+
+
+def test_returned_connection_is_reused_after_rollback():
+    pool, opened = make_pool(size=2)
+    conn = pool.connection()
+    raw = conn._raw
+    conn.close()
+    assert raw.rollbacks == 1
+
+    again = pool.connection()
+    assert again._raw is raw
+    assert len(opened) == 1
+    stats = pool.stats()
+    assert stats['checkouts'] == 2
+    assert stats['connects'] == 1
+    assert stats['checked_out'] == 1
+
+
+def test_close_twice_returns_the_connection_once():
+    pool, _ = make_pool(size=2)
+    conn = pool.connection()
+    conn.close()
+    conn.close()
+    assert pool.stats()['checked_out'] == 0
+    assert pool.stats()['idle'] == 1
+
+
+def test_overflow_connections_are_closed_on_return():
+    pool, opened = make_pool(size=1, max_overflow=1)
+    first, second = pool.connection(), pool.connection()
+    first.close()
+    second.close()
+    assert [c.closed for c in opened] == [False, True]
+    assert pool.stats()['idle'] == 1
+
+
+def test_checkout_times_out_when_pool_and_overflow_are_in_use():
+    pool, _ = make_pool(size=1, max_overflow=1)
+    held = [pool.connection(), pool.connection()]
+    with pytest.raises(PoolExhausted):
+        pool.connection()
+    assert pool.stats()['exhausted'] == 1
+    for conn in held:
+        conn.close()
+
+
+def test_waiting_checkout_gets_the_next_returned_connection():
+    pool, opened = make_pool(size=1, max_overflow=0, timeout=2)
+    held = pool.connection()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.connection()))
+    waiter.start()
+    time.sleep(0.05)
+    held.close()
+    waiter.join(1)
+    assert got and got[0]._raw is opened[0]
+    assert pool.stats()['wait_time_max'] > 0
+
+
+def test_connections_older_than_recycle_are_replaced():
+    pool, opened = make_pool(size=1, recycle=0.01)
+    pool.connection().close()
+    time.sleep(0.02)
+    conn = pool.connection()
+    assert conn._raw is opened[1]
+    assert opened[0].closed
+    assert pool.stats()['recycled'] == 1
+
+
+def test_idle_connection_failing_ping_is_replaced():
+    pool, opened = make_pool(size=1, pre_ping_idle=0)
+    pool.connection().close()
+    opened[0].ping_error = ConnectionError('gone away')
+    time.sleep(0.01)
+    conn = pool.connection()
+    assert conn._raw is opened[1]
+    assert opened[0].closed
+    assert pool.stats()['ping_failures'] == 1
+
+
+def test_connection_whose_rollback_fails_is_discarded():
+    pool, opened = make_pool(size=1)
+    conn = pool.connection()
+    opened[0].rollback_error = ConnectionError('lost')
+    conn.close()
+    assert opened[0].closed
+    assert pool.stats()['idle'] == 0
+    assert pool.stats()['checked_out'] == 0
+
+
+def test_failed_connect_frees_the_slot():
+    def connect():
+        raise ConnectionError('refused')
+
+    pool = ConnectionPool(connect=connect, size=1, max_overflow=0, timeout=0.05)
+    with pytest.raises(ConnectionError):
+        pool.connection()
+    assert pool.stats()['checked_out'] == 0
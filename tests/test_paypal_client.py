@@ -0,0 +1,128 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.paypal_client import PayPalClient, PayPalError
+
+
+class FakePayPal(ThreadingHTTPServer):
+    """Local stand-in for the PayPal REST API: mints numbered tokens and accepts orders."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), Handler)
+        self.expires_in = 3600
+        self.tokens_issued = 0
+        self.revoked = set()
+        self.order_status = 201
+        self.orders = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.path == '/v1/oauth2/token':
+            server.tokens_issued += 1
+            return self._send(200, {'access_token': f'token-{server.tokens_issued}',
+                                    'expires_in': server.expires_in})
+        token = self.headers.get('Authorization', '').removeprefix('Bearer ')
+        if token in server.revoked:
+            return self._send(401, {'error': 'invalid_token'})
+        server.orders.append(token)
+        self._send(server.order_status, {'id': f'order-{len(server.orders)}'})
+
+
+@pytest.fixture
+def paypal():
+    server = FakePayPal()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(server, refresh_margin=300):
+    return PayPalClient('id', 'secret', server.url, connect_timeout=1, read_timeout=2,
+                        refresh_margin=refresh_margin)
+
+
+def test_token_is_cached_across_calls(paypal):
+    client = make_client(paypal)
+    assert client.create_order({})['id'] == 'order-1'
+    assert client.capture_order('order-1')['id'] == 'order-2'
+    assert paypal.tokens_issued == 1
+    assert paypal.orders == ['token-1', 'token-1']
+
+
+def test_token_is_refreshed_once_it_expires(paypal):
+    paypal.expires_in = 300
+    client = make_client(paypal, refresh_margin=299.9)
+    client.create_order({})
+    client.create_order({})
+    assert paypal.tokens_issued == 1
+
+    time.sleep(0.15)
+    client.create_order({})
+    assert paypal.tokens_issued == 2
+    assert paypal.orders == ['token-1', 'token-1', 'token-2']
+
+
+def test_token_inside_refresh_margin_is_never_reused(paypal):
+    paypal.expires_in = 60
+    client = make_client(paypal, refresh_margin=300)
+    client.create_order({})
+    client.create_order({})
+    assert paypal.tokens_issued == 2
+
+
+def test_concurrent_callers_mint_one_token(paypal):
+    client = make_client(paypal)
+    threads = [threading.Thread(target=client.access_token) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(2)
+    assert paypal.tokens_issued == 1
+
+
+def test_revoked_token_is_replaced_and_the_call_retried(paypal):
+    client = make_client(paypal)
+    client.create_order({})
+    paypal.revoked.add('token-1')
+    assert client.create_order({})['id'] == 'order-2'
+    assert paypal.tokens_issued == 2
+    assert paypal.orders == ['token-1', 'token-2']
+
+
+def test_http_errors_raise_and_are_counted(paypal):
+    client = make_client(paypal)
+    paypal.order_status = 422
+    with pytest.raises(PayPalError) as excinfo:
+        client.create_order({})
+    assert excinfo.value.status == 422
+    assert excinfo.value.payload == {'id': 'order-1'}
+    stats = client.stats()
+    assert stats['create_order']['count'] == 1
+    assert stats['create_order']['errors'] == 1
+    assert (stats['oauth_token']['count'], stats['oauth_token']['errors']) == (1, 0)
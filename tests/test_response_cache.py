@@ -0,0 +1,92 @@
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+from utils import response_cache
+from utils.response_cache import cached, invalidate
+
+
+@pytest.fixture
+def app():
+    response_cache._responses.clear()
+    response_cache._generations.clear()
+    app = Flask(__name__)
+    app.renders = []
+
+    @app.route('/posts/<int:post_id>')
+    @cached('post:{post_id}')
+    def get_post(post_id):
+        app.renders.append(('post', post_id))
+        if post_id == 404:
+            return jsonify({'error': 'Not found'}), 404
+        return jsonify({'id': post_id, 'render': len(app.renders)})
+
+    @app.route('/channels')
+    @cached('channels', ttl=0.05)
+    def list_channels():
+        app.renders.append(('channels',))
+        return jsonify({'render': len(app.renders)})
+
+    return app
+
+
+def test_repeat_get_is_served_from_cache_with_etag(app):
+    client = app.test_client()
+    first = client.get('/posts/1')
+    second = client.get('/posts/1')
+    assert first.get_json() == second.get_json()
+    assert app.renders == [('post', 1)]
+    assert first.headers['ETag'] == second.headers['ETag']
+    assert second.headers['Cache-Control'] == 'no-cache'
+
+
+def test_if_none_match_gets_304(app):
+    client = app.test_client()
+    etag = client.get('/posts/1').headers['ETag']
+    response = client.get('/posts/1', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+
+def test_invalidate_drops_only_the_tagged_entries(app):
+    client = app.test_client()
+    client.get('/posts/1')
+    client.get('/posts/2')
+    invalidate('post:1')
+    client.get('/posts/1')
+    client.get('/posts/2')
+    assert app.renders == [('post', 1), ('post', 2), ('post', 1)]
+
+
+def test_invalidated_entry_gets_a_new_etag(app):
+    client = app.test_client()
+    before = client.get('/posts/1')
+    invalidate('post:1')
+    after = client.get('/posts/1', headers={'If-None-Match': before.headers['ETag']})
+    assert after.status_code == 200
+    assert after.headers['ETag'] != before.headers['ETag']
+
+
+def test_query_string_is_part_of_the_key(app):
+    client = app.test_client()
+    client.get('/posts/1?limit=5')
+    client.get('/posts/1?limit=10')
+    client.get('/posts/1?limit=5')
+    assert app.renders == [('post', 1), ('post', 1)]
+
+
+def test_errors_are_not_cached(app):
+    client = app.test_client()
+    assert client.get('/posts/404').status_code == 404
+    assert client.get('/posts/404').status_code == 404
+    assert app.renders == [('post', 404), ('post', 404)]
+
+
+def test_entries_expire_after_their_ttl(app):
+    client = app.test_client()
+    client.get('/channels')
+    client.get('/channels')
+    time.sleep(0.06)
+    client.get('/channels')
+    assert app.renders == [('channels',), ('channels',)]
@@ -0,0 +1,200 @@
+import logging
+import os
+import random
+import threading
+import time
+
+from utils import metrics
+
+log = logging.getLogger(__name__)
+
+FALLBACK_AFFIRMATION = "I am worthy of all the good things life has to offer."
+PROMPT = (
+    "Return one short motivational affirmation (max 2 lines). "
+    "Plain text only, no quotes or emojis."
+)
+
+
+def _extract_text(response):
+    """Extract text robustly across Gemini SDK versions."""
+    text = (getattr(response, 'text', '') or '').strip()
+    if not text and getattr(response, 'candidates', None):
+        candidate = response.candidates[0]
+        content = getattr(candidate, 'content', None)
+        parts = getattr(content, 'parts', None)
+        if parts and hasattr(parts[0], 'text'):
+            text = parts[0].text.strip()
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return "\n".join(lines[:2])
+
+
+def gemini_generator(api_key):
+    """Build a generator that asks Gemini for one affirmation per call.
+
+    The SDK is configured and the model constructed once, not per request.
+    """
+    import google.generativeai as genai
+
+    genai.configure(api_key=api_key)
+    # Try 2.5 flash; gracefully fallback to 1.5 flash if unavailable
+    try:
+        model = genai.GenerativeModel('gemini-2.5-flash')
+    except Exception:
+        model = genai.GenerativeModel('gemini-1.5-flash')
+
+    def generate():
+        return _extract_text(model.generate_content(PROMPT))
+
+    generate.source = 'gemini'
+    return generate
+
+
+class AffirmationService:
+    """Serves affirmations from an in-memory pool that is refilled in the background.
+
+    Only one refill runs at a time (single-flight). A request that finds no fresh
+    entry waits up to `timeout` seconds for the refill, then falls back to a stale
+    entry or FALLBACK_AFFIRMATION, so a slow upstream never blocks for long.
+    """
+
+    def __init__(self, generator, pool_size=24, low_water=8, max_age=86400, timeout=1.5):
+        self.generator = generator
+        self.source = getattr(generator, 'source', 'generator')
+        self.pool_size = pool_size
+        self.low_water = min(low_water, pool_size)
+        self.max_age = max_age
+        self.timeout = timeout
+        self._pool = []  # [(text, created_at)], oldest first
+        self._cond = threading.Condition()
+        self._refilling = False
+        self._retry_at = 0.0
+        self.stats = {'served_pool': 0, 'served_stale': 0, 'served_fallback': 0,
+                      'generated': 0, 'generator_errors': 0}
+
+    def _fresh(self):
+        cutoff = time.monotonic() - self.max_age
+        return [text for text, created_at in self._pool if created_at >= cutoff]
+
+    def _start_refill(self):
+        # Caller holds self._cond
+        if self._refilling or time.monotonic() < self._retry_at:
+            return
+        self._refilling = True
+        threading.Thread(target=self._refill, name='affirmation-refill', daemon=True).start()
+
+    def _refill(self):
+        try:
+            # Bounded so an upstream that keeps returning nothing can't spin forever
+            for _ in range(self.pool_size * 2):
+                with self._cond:
+                    if len(self._fresh()) >= self.pool_size:
+                        return
+                text = self.generator()
+                if not text:
+                    continue
+                with self._cond:
+                    self._pool.append((text, time.monotonic()))
+                    # Keep at most pool_size entries, dropping the oldest (stale first)
+                    del self._pool[:-self.pool_size]
+                    self.stats['generated'] += 1
+                    self._cond.notify_all()
+        except Exception:
+            log.exception('Affirmation refill failed')
+            with self._cond:
+                self.stats['generator_errors'] += 1
+                # Back off so a failing upstream isn't retried on every request
+                self._retry_at = time.monotonic() + 30
+        finally:
+            with self._cond:
+                self._refilling = False
+                self._cond.notify_all()
+
+    def warm(self):
+        """Start filling the pool without waiting for it."""
+        with self._cond:
+            self._start_refill()
+
+    def get(self):
+        """Return (affirmation, source)."""
+        with self._cond:
+            fresh = self._fresh()
+            if len(fresh) < self.low_water:
+                self._start_refill()
+            if not fresh:
+                self._cond.wait_for(lambda: self._fresh() or not self._refilling, timeout=self.timeout)
+                fresh = self._fresh()
+            if fresh:
+                self.stats['served_pool'] += 1
+                return random.choice(fresh), self.source
+            if self._pool:
+                self.stats['served_stale'] += 1
+                return random.choice(self._pool)[0], self.source
+            self.stats['served_fallback'] += 1
+        return FALLBACK_AFFIRMATION, 'fallback'
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def configure(generator, **kwargs):
+    """Install the generator used by get_affirmation(); tests can pass a local stub."""
+    global _service
+    with _service_lock:
+        _service = AffirmationService(generator, **kwargs) if generator else None
+    return _service
+
+
+def get_service():
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                api_key = os.getenv('GOOGLE_API_KEY')
+                if not api_key:
+                    return None
+                _service = AffirmationService(
+                    gemini_generator(api_key),
+                    pool_size=int(os.getenv('AFFIRMATION_POOL_SIZE', 24)),
+                    max_age=int(os.getenv('AFFIRMATION_MAX_AGE', 86400)),
+                    timeout=float(os.getenv('AFFIRMATION_TIMEOUT', 1.5)),
+                )
+    return _service
+
+
+def get_affirmation():
+    """Return (affirmation, source); never raises."""
+    try:
+        service = get_service()
+    except Exception:
+        log.exception('Could not initialise affirmation generator')
+        service = None
+    if service is None:
+        return FALLBACK_AFFIRMATION, 'fallback'
+    return service.get()
+
+
+def stats():
+    """The current service's counters plus its pool sizes; {} until a service exists."""
+    service = _service
+    if service is None:
+        return {}
+    with service._cond:
+        return dict(service.stats, pool_fresh=len(service._fresh()), pool_total=len(service._pool))
+
+
+def _served():
+    current = stats()
+    if not current:
+        return {}
+    return {(source,): current[f'served_{source}'] for source in ('pool', 'stale', 'fallback')}
+
+
+metrics.register(metrics.Gauge(
+    'affirmations_served_total', 'Affirmations served, by where they came from', _served, ('source',)))
+metrics.register(metrics.Gauge(
+    'affirmations_generated_total', 'Affirmations generated into the pool', lambda: stats().get('generated', 0)))
+metrics.register(metrics.Gauge(
+    'affirmations_generator_errors_total', 'Pool refills that failed', lambda: stats().get('generator_errors', 0)))
+metrics.register(metrics.Gauge(
+    'affirmations_pool_fresh', 'Fresh affirmations in the pool', lambda: stats().get('pool_fresh', 0)))
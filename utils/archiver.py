@@ -0,0 +1,201 @@
+"""Move soft-deleted posts and comments out of the hot tables once retention passes.
+
+    python -m utils.archiver                        # archive content deleted over ARCHIVE_RETENTION_DAYS ago
+    python -m utils.archiver --purge --days 90      # delete it without keeping a copy
+    python -m utils.archiver --dry-run              # count what would be moved
+
+A deleted post goes with its comments and likes. Comments deleted from a live
+post go on their own. Archived rows are copied into posts_archive,
+comments_archive and likes_archive (migration 0008) before they are deleted.
+
+Work is done in small transactions: the job locks at most `chunk` rows by
+primary key, copies and deletes them, commits, and then sleeps for `sleep`
+seconds so that replication and foreground writes keep up. Top-level rows are
+walked in (deleted_at, id) keyset order. A viral post's likes are drained in
+chunks too, rather than in one DELETE. The job can be stopped and rerun at any
+point.
+"""
+import argparse
+import os
+import time
+
+from utils.db_helper import get_db_connection
+
+CHUNK = int(os.getenv('ARCHIVE_CHUNK', 500))
+SLEEP = float(os.getenv('ARCHIVE_SLEEP', 0.05))
+RETENTION_DAYS = int(os.getenv('ARCHIVE_RETENTION_DAYS', 30))
+
+# table -> (archive table, columns copied)
+_ARCHIVES = {
+    'posts': ('posts_archive', "id, channel_id, user_id, title, body, likes, dislikes, is_locked, created_at, deleted_at"),
+    'comments': ('comments_archive', "id, post_id, user_id, body, is_deleted, created_at, deleted_at"),
+    'likes': ('likes_archive', "id, post_id, user_id, reaction, created_at"),
+}
+
+# One chunk of rows to remove, and one page of soft-deleted rows in (deleted_at, id)
+# order. utils/explain_check.py EXPLAINs these same templates.
+CHUNK_SQL = "SELECT id FROM {table} WHERE {where} LIMIT %s FOR UPDATE"
+DELETED_BEFORE_SQL = "SELECT id, deleted_at FROM {table} WHERE deleted_at < %s{after} ORDER BY deleted_at, id LIMIT %s"
+DELETED_AFTER = " AND (deleted_at > %s OR (deleted_at = %s AND id > %s))"
+
+
+def _placeholders(ids):
+    return ','.join(['%s'] * len(ids))
+
+
+def remove_ids(cursor, table, ids, archive=False):
+    """Copy (if archiving) then delete rows by primary key, inside the caller's transaction."""
+    if not ids:
+        return 0
+    if archive:
+        archive_table, columns = _ARCHIVES[table]
+        cursor.execute(
+            f"INSERT INTO {archive_table} ({columns}) SELECT {columns} FROM {table} "
+            f"WHERE id IN ({_placeholders(ids)})",
+            tuple(ids)
+        )
+    return cursor.execute(f"DELETE FROM {table} WHERE id IN ({_placeholders(ids)})", tuple(ids))
+
+
+def delete_in_chunks(conn, table, where, params, chunk=CHUNK, sleep=0.0, archive=False):
+    """Remove every row of `table` matching `where`, at most `chunk` rows per transaction.
+
+    Each round locks the next `chunk` matching ids and deletes them by primary key,
+    so the rows a round has removed never need to be scanned again. Returns the
+    number of rows removed.
+    """
+    removed = 0
+    cursor = conn.cursor()
+    try:
+        while True:
+            cursor.execute(CHUNK_SQL.format(table=table, where=where), (*params, chunk))
+            ids = [row['id'] for row in cursor.fetchall()]
+            removed += remove_ids(cursor, table, ids, archive)
+            conn.commit()
+            if len(ids) < chunk:
+                return removed
+            if sleep:
+                time.sleep(sleep)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+class Archiver:
+    def __init__(self, conn, chunk=CHUNK, sleep=SLEEP, purge=False):
+        self.conn = conn
+        self.chunk = chunk
+        self.sleep = sleep
+        self.archive = not purge
+        self.counts = {'posts': 0, 'comments': 0, 'likes': 0}
+
+    def _deleted_before(self, table, cutoff):
+        """Yield chunks of ids soft-deleted before `cutoff`, in (deleted_at, id) keyset order."""
+        cursor = self.conn.cursor()
+        after = None
+        try:
+            while True:
+                if after is None:
+                    cursor.execute(DELETED_BEFORE_SQL.format(table=table, after=''), (cutoff, self.chunk))
+                else:
+                    cursor.execute(
+                        DELETED_BEFORE_SQL.format(table=table, after=DELETED_AFTER),
+                        (cutoff, after[0], after[0], after[1], self.chunk)
+                    )
+                rows = cursor.fetchall()
+                # End the read before the caller starts its own transactions
+                self.conn.commit()
+                if not rows:
+                    return
+                after = (rows[-1]['deleted_at'], rows[-1]['id'])
+                yield [row['id'] for row in rows]
+                if len(rows) < self.chunk:
+                    return
+        finally:
+            cursor.close()
+
+    def _remove(self, table, ids):
+        cursor = self.conn.cursor()
+        try:
+            self.counts[table] += remove_ids(cursor, table, ids, self.archive)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        if self.sleep:
+            time.sleep(self.sleep)
+
+    def posts(self, cutoff):
+        for post_ids in self._deleted_before('posts', cutoff):
+            # Children first, so an interrupted run never leaves orphaned comments or likes
+            for post_id in post_ids:
+                for table in ('likes', 'comments'):
+                    self.counts[table] += delete_in_chunks(
+                        self.conn, table, "post_id = %s", (post_id,), self.chunk, self.sleep, self.archive
+                    )
+            self._remove('posts', post_ids)
+
+    def comments(self, cutoff):
+        for comment_ids in self._deleted_before('comments', cutoff):
+            self._remove('comments', comment_ids)
+
+    def run(self, cutoff):
+        self.posts(cutoff)
+        self.comments(cutoff)
+        return self.counts
+
+
+def cutoff_for(conn, days):
+    """The retention cutoff in the database's own clock, which stamped deleted_at."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT NOW() - INTERVAL %s DAY AS cutoff", (days,))
+        return cursor.fetchone()['cutoff']
+    finally:
+        cursor.close()
+
+
+def pending(conn, cutoff):
+    """How many posts and comments are past retention (for --dry-run)."""
+    cursor = conn.cursor()
+    try:
+        counts = {}
+        for table in ('posts', 'comments'):
+            cursor.execute(f"SELECT COUNT(*) AS n FROM {table} WHERE deleted_at < %s", (cutoff,))
+            counts[table] = cursor.fetchone()['n']
+        return counts
+    finally:
+        cursor.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Archive or purge soft-deleted posts and comments')
+    parser.add_argument('--days', type=int, default=RETENTION_DAYS, help='retention window after deletion')
+    parser.add_argument('--purge', action='store_true', help='delete without copying into the archive tables')
+    parser.add_argument('--chunk', type=int, default=CHUNK, help='rows per transaction')
+    parser.add_argument('--sleep', type=float, default=SLEEP, help='seconds to pause between transactions')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args(argv)
+
+    conn = get_db_connection()
+    try:
+        cutoff = cutoff_for(conn, args.days)
+        if args.dry_run:
+            counts = pending(conn, cutoff)
+            print(f"deleted before {cutoff:%Y-%m-%d %H:%M}: {counts['posts']} posts, {counts['comments']} comments")
+            return
+        started = time.monotonic()
+        counts = Archiver(conn, args.chunk, args.sleep, args.purge).run(cutoff)
+        verb = 'purged' if args.purge else 'archived'
+        print(f"{verb} {counts['posts']} posts, {counts['comments']} comments, {counts['likes']} likes "
+              f"in {time.monotonic() - started:.1f}s")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,18 @@
 import os
+import threading
+import time
+from collections import deque
+
 import pymysql
 from dotenv import load_dotenv
+from flask import g, has_app_context
 
 # Load environment variables from .env
 load_dotenv()
 
-def get_db_connection():
-    """Create and return a new MySQL connection using environment variables."""
+
+def _connect():
+    """Open a raw MySQL connection using environment variables."""
     return pymysql.connect(
         host=os.getenv('DB_HOST', 'localhost'),
         user=os.getenv('DB_USER', ''),
@@ -15,3 +21,234 @@ def get_db_connection():
         port=int(os.getenv('DB_PORT', 3306)),
         cursorclass=pymysql.cursors.DictCursor  # Optional: returns dict results
     )
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+# Instrumentation hooks. Query hooks are called as hook(sql, args, seconds, rowcount, cursor)
+# after every execute/executemany; checkout hooks as hook(opened_new_connection).
+_query_hooks = []
+_checkout_hooks = []
+
+
+def add_query_hook(hook):
+    _query_hooks.append(hook)
+
+
+def add_checkout_hook(hook):
+    _checkout_hooks.append(hook)
+
+
+class InstrumentedCursor:
+    """Cursor proxy that times statements and reports them to the query hooks."""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._raw.close()
+
+    def _timed(self, method, query, args):
+        started = time.perf_counter()
+        try:
+            return method(query, args)
+        finally:
+            elapsed = time.perf_counter() - started
+            for hook in _query_hooks:
+                hook(query, args, elapsed, self._raw.rowcount, self._raw)
+
+    def execute(self, query, args=None):
+        return self._timed(self._raw.execute, query, args)
+
+    def executemany(self, query, args):
+        return self._timed(self._raw.executemany, query, args)
+
+
+class PooledConnection:
+    """Thin proxy around a pymysql connection that returns it to the pool on close()."""
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._request_scoped = False
+        self.created_at = created_at
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, cursor=None):
+        raw = self._raw.cursor(cursor) if cursor else self._raw.cursor()
+        return InstrumentedCursor(raw) if _query_hooks else raw
+
+    def close(self):
+        # Request-scoped connections are released by the teardown handler so that
+        # helpers sharing the request connection can keep calling close() safely.
+        if self._request_scoped:
+            return
+        self.release()
+
+    def release(self):
+        if self._raw is None:
+            return
+        raw, self._raw = self._raw, None
+        self._pool._return(raw, self.created_at)
+
+
+class ConnectionPool:
+    """Bounded pool of MySQL connections with overflow, idle recycling and liveness checks."""
+
+    def __init__(self, connect=_connect, size=10, max_overflow=10, timeout=5.0,
+                 recycle=1800, pre_ping_idle=30):
+        self._connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping_idle = pre_ping_idle
+        self._idle = deque()  # (raw, created_at, returned_at)
+        self._checked_out = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'connects': 0,
+            'recycled': 0,
+            'ping_failures': 0,
+            'exhausted': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        }
+
+    def connection(self):
+        """Check out a connection, waiting up to `timeout` seconds when the pool is full."""
+        started = time.monotonic()
+        with self._cond:
+            while not self._idle and self._checked_out >= self.size + self.max_overflow:
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._stats['exhausted'] += 1
+                    raise PoolExhausted('Database connection pool exhausted')
+                self._cond.wait(remaining)
+            entry = self._idle.pop() if self._idle else None
+            self._checked_out += 1
+            waited = time.monotonic() - started
+            self._stats['checkouts'] += 1
+            self._stats['wait_time_total'] += waited
+            self._stats['wait_time_max'] = max(self._stats['wait_time_max'], waited)
+
+        try:
+            raw, created_at = self._validate(entry) if entry else (None, None)
+            opened = raw is None
+            if opened:
+                raw, created_at = self._connect(), time.monotonic()
+                self._count('connects')
+        except Exception:
+            with self._cond:
+                self._checked_out -= 1
+                self._cond.notify()
+            raise
+        for hook in _checkout_hooks:
+            hook(opened)
+        return PooledConnection(self, raw, created_at)
+
+    def _validate(self, entry):
+        raw, created_at, returned_at = entry
+        now = time.monotonic()
+        if self.recycle and now - created_at > self.recycle:
+            self._count('recycled')
+            self._discard(raw)
+            return None, None
+        if now - returned_at > self.pre_ping_idle:
+            try:
+                raw.ping(reconnect=False)
+            except Exception:
+                self._count('ping_failures')
+                self._discard(raw)
+                return None, None
+        return raw, created_at
+
+    def _return(self, raw, created_at):
+        try:
+            # Drop any open transaction (and its snapshot) before reuse
+            raw.rollback()
+        except Exception:
+            self._discard(raw)
+            raw = None
+        with self._cond:
+            self._checked_out -= 1
+            if raw is not None:
+                if len(self._idle) < self.size:
+                    self._idle.append((raw, created_at, time.monotonic()))
+                else:
+                    self._discard(raw)
+            self._cond.notify()
+
+    def _count(self, key):
+        with self._cond:
+            self._stats[key] += 1
+
+    @staticmethod
+    def _discard(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def dispose(self):
+        with self._cond:
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+            stats['checked_out'] = self._checked_out
+            stats['size'] = self.size
+            stats['max_overflow'] = self.max_overflow
+        return stats
+
+
+pool = ConnectionPool(
+    size=int(os.getenv('DB_POOL_SIZE', 10)),
+    max_overflow=int(os.getenv('DB_POOL_MAX_OVERFLOW', 10)),
+    timeout=float(os.getenv('DB_POOL_TIMEOUT', 5)),
+    recycle=int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    pre_ping_idle=int(os.getenv('DB_POOL_PRE_PING_IDLE', 30)),
+)
+
+
+def get_db_connection():
+    """Return a pooled MySQL connection.
+
+    Inside a Flask request the same connection is reused for the whole request and
+    released on teardown; elsewhere the caller owns it until close().
+    """
+    if not has_app_context():
+        return pool.connection()
+    conn = g.get('_db_conn')
+    if conn is None or conn._raw is None:
+        conn = pool.connection()
+        conn._request_scoped = True
+        g._db_conn = conn
+    return conn
+
+
+def release_db_connection(exc=None):
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        conn.release()
+
+
+def init_app(app):
+    app.teardown_appcontext(release_db_connection)
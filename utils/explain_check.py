@@ -0,0 +1,113 @@
+"""EXPLAIN every hot route query and fail when one has no usable index.
+
+    python -m utils.explain_check
+
+Each entry below EXPLAINs a statement the code runs, taken from the SQL
+constants the routes themselves execute, with representative parameters. A new
+hot query gets a module constant and an entry here. A plan row fails the check
+whenever MySQL would read the whole table or index (`type` ALL/index), unless
+the entry sets allow_full_scan. Run it against a database with realistic row
+counts: on near-empty tables the optimizer may prefer a scan over a usable
+index, and that is reported too rather than guessed at.
+"""
+import sys
+from datetime import datetime
+
+from routes import community_routes as community, events_routes as events, me_routes as me
+from utils import archiver, identity, post_activity, reactions, scheduler
+from utils.db_helper import get_db_connection
+from utils.search import MySQLFulltextBackend
+from utils.serializers import AUTHOR
+
+_TS = datetime(2025, 1, 1)
+
+
+def _ids(n):
+    return ', '.join(['%s'] * n)
+
+
+# (route, sql, params, allow_full_scan); allow_full_scan is the explicit allow-list.
+# The SQL is the routes' own module constants, filled in the way the routes fill them.
+QUERIES = [
+    ('identity.get_user_id', identity.USER_ID_SQL, ('a@example.com',), False),
+    ('identity.get_user_role', identity.USER_ROLE_SQL, (1,), False),
+    ('identity.get_token_version', identity.TOKEN_VERSION_SQL, (1,), False),
+    # Channels are few and listed in full by design
+    ('community.list_channels', community.CHANNELS_SQL, (), True),
+    ('community.list_posts',
+     community.LIST_POSTS_SQL.format(sort='created_at', after=community.LIST_POSTS_AFTER.format(sort='created_at')),
+     (1, _TS, _TS, 1, 21), False),
+    ('community.list_posts',
+     community.LIST_POSTS_SQL.format(sort='last_activity_at',
+                                     after=community.LIST_POSTS_AFTER.format(sort='last_activity_at')),
+     (1, _TS, _TS, 1000, 21), False),
+    ('community.list_posts', community.USER_REACTIONS_SQL.format(ids=_ids(2)), (1, 1, 2), False),
+    ('community.list_posts', community.AUTHORS_SQL.format(columns=AUTHOR.columns, ids=_ids(2)), (1, 2), False),
+    ('community.get_feed', community.FEED_SQL.format(after=community.FEED_AFTER), (10.0, 10.0, 1, 21), False),
+    ('community.get_posts_batch', community.POSTS_BATCH_SQL.format(ids=_ids(3)), (1, 2, 3), False),
+    ('community.get_reactions_batch', community.REACTIONS_BATCH_SQL.format(ids=_ids(3)), (1, 1, 2, 3), False),
+    ('community.get_post', community.GET_POST_SQL, (1,), False),
+    ('community.list_comments',
+     community.COMMENTS_PAGE_SQL.format(after=community.COMMENTS_AFTER), (1, _TS, _TS, 1, 21), False),
+    ('community.add_comment', community.COMMENT_TARGET_SQL, (1,), False),
+    ('post_activity.comment_added', post_activity.COMMENT_ADDED_SQL, (1, 1), False),
+    ('post_activity.comments_removed', post_activity.COMMENTS_REMOVED_SQL, (1, 1), False),
+    ('community.mod_list_reports', community.QUEUE_SCAN_SQL.format(before=" AND id < %s"), (1000, 500), False),
+    ('community.mod_list_reports',
+     community.QUEUE_STATS_SQL.format(keys='(%s, %s), (%s, %s)'), ('post', 1, 'comment', 2), False),
+    ('community.mod_resolve_reports',
+     community.RESOLVE_ENTITY_REPORTS_SQL.format(ids=_ids(2)), ('post', 1, 2), False),
+    ('community.react_to_post', reactions.REACTION_FOR_UPDATE_SQL, (1, 1), False),
+    ('community.react_to_post', reactions.COUNTERS_SQL, (1, 0, 1), False),
+    ('community.get_post_reactions', community.POST_REACTIONS_SQL, (1,), False),
+    ('community.get_user_reaction', community.USER_REACTION_SQL, (1, 1), False),
+    ('search.search_all',
+     MySQLFulltextBackend.statement(('post', 'comment', 'event'), after=True),
+     ('meditation',) * 6 + (1.0, 1.0, 'post', 'post', '1', 21), False),
+    ('events.list_events',
+     events.LIST_EVENTS_SQL.format(after=events.LIST_EVENTS_AFTER), ('upcoming', _TS, _TS, 'x', 20), False),
+    ('events.list_events', events.EVENTS_BATCH_SQL.format(ids=_ids(2)), ('x', 'y'), False),
+    ('events.get_event', events.GET_EVENT_SQL, ('x',), False),
+    ('events.create_rsvp', events.CLAIM_SEAT_SQL, ('x',), False),
+    ('events.delete_rsvp', events.WAITLIST_SQL.format(limit=' LIMIT %s'), ('x', 1), False),
+    ('scheduler.sweep', scheduler.DUE_SQL, (_TS, 500), False),
+    ('scheduler.next_due', scheduler.NEXT_DUE_SQL, (), False),
+    ('archiver.posts',
+     archiver.DELETED_BEFORE_SQL.format(table='posts', after=archiver.DELETED_AFTER), (_TS, _TS, _TS, 1, 500), False),
+    ('archiver.delete_in_chunks', archiver.CHUNK_SQL.format(table='likes', where="post_id = %s"), (1, 500), False),
+    ('events.delete_event',
+     archiver.CHUNK_SQL.format(table='event_rsvps', where="event_id = %s"), ('x', 1000), False),
+    ('me.list_my_rsvps', me.MY_RSVPS_SQL.format(after=" AND r.id < %s"), (1, 1000, 50), False),
+]
+
+def check(out=sys.stdout):
+    """Run EXPLAIN on every registered query; returns a list of (route, table, type) failures."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    failures = []
+    try:
+        for route, sql, params, allow_full_scan in QUERIES:
+            cursor.execute("EXPLAIN " + sql, params)
+            for row in cursor.fetchall():
+                bad = row.get('type') in ('ALL', 'index') and not allow_full_scan
+                flag = 'FAIL' if bad else 'ok  '
+                print(f"{flag} {route:<28} table={row.get('table')} type={row.get('type')} "
+                      f"key={row.get('key')} rows={row.get('rows')}", file=out)
+                if bad:
+                    failures.append((route, row.get('table'), row.get('type')))
+    finally:
+        cursor.close()
+        conn.close()
+    return failures
+
+
+def main():
+    failures = check()
+    if failures:
+        print(f"{len(failures)} query plan(s) fall back to a full scan", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Ranked cross-channel feed backed by the post_feed table.
+
+    python -m utils.feed --rebuild
+
+Each live post has one row, scored "hot"-style:
+
+    score = base + sign(v) * log10(max(|v|, 1))
+    v     = (likes - dislikes) + COMMENT_WEIGHT * comments
+    base  = (created_at - EPOCH) / DECAY_SECONDS
+
+Newer posts get a higher base, so older posts decay relative to them without
+any rescoring, and a post only needs an update when its votes or comments
+change. Routes call add_post/adjust/remove_posts in the same transaction as the
+write they mirror. --rebuild recomputes every row, which is needed after
+changing the constants below (also used by migration 0005).
+"""
+import argparse
+
+from utils.db_helper import get_db_connection
+
+EPOCH = 1704067200  # 2024-01-01T00:00:00Z
+DECAY_SECONDS = 45000  # ~12.5h of age is worth 10x the net votes
+COMMENT_WEIGHT = 0.5
+
+_V = f"(votes + {COMMENT_WEIGHT} * comments)"
+SCORE_SQL = f"base + SIGN({_V}) * LOG10(GREATEST(ABS({_V}), 1))"
+_BASE_SQL = f"(UNIX_TIMESTAMP(created_at) - {EPOCH}) / {DECAY_SECONDS}"
+
+# MySQL applies single-table UPDATE assignments left to right, so score sees the new counts
+ADJUST_SQL = (
+    "UPDATE post_feed SET votes = votes + %s, comments = comments + %s, "
+    f"score = {SCORE_SQL} WHERE post_id = %s"
+)
+
+
+def add_post(cursor, post_id):
+    """Insert a freshly created post (no votes or comments yet)."""
+    cursor.execute(
+        "INSERT INTO post_feed (post_id, channel_id, votes, comments, base, score) "
+        f"SELECT id, channel_id, 0, 0, {_BASE_SQL}, {_BASE_SQL} FROM posts WHERE id = %s",
+        (post_id,)
+    )
+
+
+def adjust(cursor, post_id, votes=0, comments=0):
+    """Apply a net-vote and/or comment-count delta and rescore that one row."""
+    if votes or comments:
+        cursor.execute(ADJUST_SQL, (votes, comments, post_id))
+
+
+def adjust_many(cursor, rows):
+    """Batch form of adjust() for [(votes, comments, post_id), ...]; sort by post id to keep lock order."""
+    if rows:
+        cursor.executemany(ADJUST_SQL, rows)
+
+
+def remove_posts(cursor, post_ids):
+    if post_ids:
+        placeholders = ','.join(['%s'] * len(post_ids))
+        cursor.execute(f"DELETE FROM post_feed WHERE post_id IN ({placeholders})", tuple(post_ids))
+
+
+def rebuild():
+    """Recompute the whole feed from posts and comments. Returns the number of rows written."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM post_feed")
+        cursor.execute(
+            "INSERT INTO post_feed (post_id, channel_id, votes, comments, base, score) "
+            "SELECT p.id, p.channel_id, p.likes - p.dislikes, "
+            "(SELECT COUNT(*) FROM comments c WHERE c.post_id = p.id AND c.is_deleted = 0), "
+            f"(UNIX_TIMESTAMP(p.created_at) - {EPOCH}) / {DECAY_SECONDS}, 0 "
+            "FROM posts p WHERE p.is_deleted = 0"
+        )
+        written = cursor.rowcount
+        cursor.execute(f"UPDATE post_feed SET score = {SCORE_SQL}")
+        conn.commit()
+        return written
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Maintain the ranked feed table')
+    parser.add_argument('--rebuild', action='store_true', help='recompute every row from posts/comments')
+    args = parser.parse_args(argv)
+    if not args.rebuild:
+        parser.print_help()
+        return
+    print(f"rebuilt post_feed: {rebuild()} posts")
+
+
+if __name__ == '__main__':
+    main()
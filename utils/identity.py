@@ -0,0 +1,240 @@
+import argparse
+import os
+from functools import wraps
+
+import pymysql
+from flask import jsonify
+from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
+
+from utils import metrics
+from utils.cache import TTLCache
+from utils.db_helper import get_db_connection
+
+# Reject tokens whose `tv` claim is behind users.token_version (checked against a short-TTL cache).
+# Moderator and admin tokens are always checked; this extends the check to every token.
+REVOCATION_CHECK = os.getenv('TOKEN_REVOCATION_CHECK', '0') == '1'
+PRIVILEGED_ROLES = ('moderator', 'admin')
+
+_user_ids = TTLCache(
+    maxsize=int(os.getenv('IDENTITY_CACHE_SIZE', 10000)),
+    ttl=int(os.getenv('IDENTITY_CACHE_TTL', 300)),
+)
+_roles = TTLCache(
+    maxsize=int(os.getenv('IDENTITY_CACHE_SIZE', 10000)),
+    ttl=int(os.getenv('ROLE_CACHE_TTL', 60)),
+)
+_token_versions = TTLCache(
+    maxsize=int(os.getenv('IDENTITY_CACHE_SIZE', 10000)),
+    ttl=int(os.getenv('TOKEN_VERSION_TTL', 30)),
+)
+
+# Cache-miss lookups; utils/explain_check.py EXPLAINs these same statements
+USER_ID_SQL = "SELECT id FROM users WHERE email = %s"
+USER_ROLE_SQL = "SELECT role FROM user_roles WHERE user_id = %s"
+TOKEN_VERSION_SQL = "SELECT token_version FROM users WHERE id = %s"
+_BUMP_TOKEN_VERSION_SQL = "UPDATE users SET token_version = token_version + 1 WHERE id = %s"
+
+
+def get_user_id(email):
+    """Resolve an email (the JWT identity) to a user id, or None if unknown."""
+    if not email:
+        return None
+    user_id = _user_ids.get(email)
+    if user_id is not None:
+        return user_id
+    conn = get_db_connection()
+    cursor = conn.cursor(pymysql.cursors.DictCursor)
+    try:
+        cursor.execute(USER_ID_SQL, (email,))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+    # Unknown emails are not cached so a fresh registration is seen immediately
+    if not row:
+        return None
+    _user_ids.set(email, row['id'])
+    return row['id']
+
+
+def get_user_role(user_id):
+    """Return 'admin', 'moderator' or 'user' for the given user id."""
+    role = _roles.get(user_id)
+    if role is not None:
+        return role
+    conn = get_db_connection()
+    cursor = conn.cursor(pymysql.cursors.DictCursor)
+    try:
+        cursor.execute(USER_ROLE_SQL, (user_id,))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+    role = row['role'] if row else 'user'
+    _roles.set(user_id, role)
+    return role
+
+
+def is_admin(user_id):
+    return get_user_role(user_id) == 'admin'
+
+
+def is_mod_or_admin(user_id):
+    return get_user_role(user_id) in ('moderator', 'admin')
+
+
+def token_claims(user_id, role, token_version):
+    """Extra JWT claims issued at login so requests can authorize without a lookup."""
+    return {'uid': user_id, 'role': role, 'tv': token_version}
+
+
+def current_user_id():
+    """The caller's user id: the token's `uid` claim, or resolved from the email for older tokens."""
+    user_id = get_jwt().get('uid')
+    if user_id is not None:
+        return user_id
+    return get_user_id(get_jwt_identity())
+
+
+def current_role():
+    role = get_jwt().get('role')
+    if role is not None:
+        return role
+    user_id = current_user_id()
+    return get_user_role(user_id) if user_id else None
+
+
+def role_required(*roles):
+    """jwt_required() plus a role check from the token claims; 403 otherwise."""
+    def decorator(fn):
+        @wraps(fn)
+        @jwt_required()
+        def wrapper(*args, **kwargs):
+            if current_role() not in roles:
+                return jsonify({'error': 'Forbidden'}), 403
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_token_version(user_id):
+    """Current users.token_version, or None if the user no longer exists."""
+    version = _token_versions.get(user_id)
+    if version is not None:
+        return version
+    conn = get_db_connection()
+    cursor = conn.cursor(pymysql.cursors.DictCursor)
+    try:
+        cursor.execute(TOKEN_VERSION_SQL, (user_id,))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+    if not row:
+        return None
+    _token_versions.set(user_id, row['token_version'])
+    return row['token_version']
+
+
+def bump_token_version(user_id):
+    """Invalidate every token issued to this user so far; call after a role change or password reset.
+
+    Moderator and admin tokens stop working within TOKEN_VERSION_TTL seconds on
+    every worker. Other tokens do too when TOKEN_REVOCATION_CHECK=1; otherwise
+    they keep working until they expire.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(_BUMP_TOKEN_VERSION_SQL, (user_id,))
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+    _token_versions.pop(user_id)
+    _roles.pop(user_id)
+
+
+def set_role(user_id, role):
+    """Replace a user's role and revoke their tokens, in one transaction."""
+    if role not in PRIVILEGED_ROLES + ('user',):
+        raise ValueError(f"Unknown role: {role}")
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM user_roles WHERE user_id = %s", (user_id,))
+        if role != 'user':
+            cursor.execute("INSERT INTO user_roles (user_id, role) VALUES (%s, %s)", (user_id, role))
+        cursor.execute(_BUMP_TOKEN_VERSION_SQL, (user_id,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    _token_versions.pop(user_id)
+    _roles.pop(user_id)
+
+
+def _is_token_revoked(jwt_header, jwt_payload):
+    version = jwt_payload.get('tv')
+    if version is None:
+        return False
+    if not REVOCATION_CHECK and jwt_payload.get('role') not in PRIVILEGED_ROLES:
+        return False
+    current = get_token_version(jwt_payload['uid'])
+    return current is None or current != version
+
+
+def init_jwt(jwt):
+    jwt.token_in_blocklist_loader(_is_token_revoked)
+
+
+def invalidate_user(email):
+    """Forget a cached email -> id mapping (e.g. after an email change or account deletion)."""
+    _user_ids.pop(email)
+
+
+def invalidate_role(user_id):
+    """Forget a cached role; call whenever user_roles changes for this user.
+
+    Tokens carry the role as a claim, so also bump_token_version() to revoke them
+    (set_role() does both).
+    """
+    _roles.pop(user_id)
+
+
+def stats():
+    return {'user_ids': _user_ids.stats(), 'roles': _roles.stats(), 'token_versions': _token_versions.stats()}
+
+
+def _cache_stat(field):
+    return lambda: {(cache,): values[field] for cache, values in stats().items()}
+
+
+metrics.register(metrics.Gauge(
+    'identity_cache_hits_total', 'Identity lookups served from cache', _cache_stat('hits'), ('cache',)))
+metrics.register(metrics.Gauge(
+    'identity_cache_misses_total', 'Identity lookups that went to MySQL', _cache_stat('misses'), ('cache',)))
+metrics.register(metrics.Gauge(
+    'identity_cache_size', 'Entries held in each identity cache', _cache_stat('size'), ('cache',)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Change a user's role or revoke their tokens")
+    parser.add_argument('user_id', type=int)
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--set-role', choices=PRIVILEGED_ROLES + ('user',), help='replace the role and revoke tokens')
+    group.add_argument('--revoke', action='store_true', help='revoke every token issued so far')
+    args = parser.parse_args(argv)
+    if args.set_role:
+        set_role(args.user_id, args.set_role)
+        print(f"user {args.user_id} is now {args.set_role}; existing tokens revoked")
+    else:
+        bump_token_version(args.user_id)
+        print(f"revoked tokens of user {args.user_id}")
+
+
+if __name__ == '__main__':
+    main()
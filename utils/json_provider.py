@@ -0,0 +1,50 @@
+"""orjson-backed JSON provider for Flask.
+
+Output matches Flask's default provider (datetimes as HTTP dates, Decimal as
+str, sorted keys), but encodes straight to bytes. If orjson isn't installed,
+or an object can't be encoded with it (e.g. ints wider than 64 bits), the stdlib
+provider is used instead.
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    def _options(self, pretty=False):
+        # Route datetimes through default() so they stay RFC 1123 like the stdlib provider
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def _dumpb(self, obj, pretty=False):
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._options(pretty))
+        except TypeError:
+            return None
+
+    def dumps(self, obj, **kwargs):
+        if not kwargs:
+            data = self._dumpb(obj)
+            if data is not None:
+                return data.decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        data = self._dumpb(obj, pretty)
+        if data is None:
+            return super().response(obj)
+        return self._app.response_class(data + b'\n', mimetype=self.mimetype)
+
+
+def init_app(app):
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
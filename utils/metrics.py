@@ -0,0 +1,207 @@
+"""Per-request DB/latency instrumentation, exposed in Prometheus text format at /metrics.
+
+Every request records its query count, DB time, connection checkouts and rows
+returned, and gets a Server-Timing header breaking total time into db and app.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, has_request_context, request
+
+from utils import db_helper
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join('%s="%s"' % (n, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                     for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help, self.label_names = name, help_text, labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose value is read from a callback at scrape time.
+
+    With `labels`, the callback returns {label values: value} instead of one number.
+    """
+
+    def __init__(self, name, help_text, fn, labels=()):
+        self.name, self.help, self.fn, self.label_names = name, help_text, fn, labels
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        if not self.label_names:
+            lines.append(f"{self.name} {self.fn()}")
+            return lines
+        for labels, value in sorted(self.fn().items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help_text, labels
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if idx < len(self.buckets):
+                series[idx] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ('le',)
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, series):
+                    cumulative += n
+                    lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_labels(names, labels + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {series[-1]}")
+        return lines
+
+
+_registry = []
+
+
+def register(metric):
+    _registry.append(metric)
+    return metric
+
+
+request_latency = register(Histogram(
+    'http_request_duration_seconds', 'Request latency by route', ('endpoint', 'method', 'status')))
+request_db_time = register(Histogram(
+    'http_request_db_seconds', 'Time spent in MySQL per request', ('endpoint',)))
+request_queries = register(Histogram(
+    'http_request_db_queries', 'Statements executed per request', ('endpoint',), buckets=QUERY_BUCKETS))
+db_queries_total = register(Counter('db_queries_total', 'Statements executed', ('endpoint',)))
+db_rows_total = register(Counter('db_rows_total', 'Rows returned or affected', ('endpoint',)))
+db_checkouts_total = register(Counter(
+    'db_connection_checkouts_total', 'Pool checkouts (opened=1 when a new connection was made)',
+    ('endpoint', 'opened')))
+
+register(Gauge('db_pool_checked_out', 'Connections currently checked out',
+               lambda: db_helper.pool.stats()['checked_out']))
+register(Gauge('db_pool_idle', 'Idle pooled connections', lambda: db_helper.pool.stats()['idle']))
+register(Gauge('db_pool_exhausted_total', 'Checkouts that timed out waiting for a connection',
+               lambda: db_helper.pool.stats()['exhausted']))
+register(Gauge('db_pool_wait_seconds_total', 'Total time spent waiting for a pooled connection',
+               lambda: db_helper.pool.stats()['wait_time_total']))
+
+
+def _endpoint():
+    if has_request_context():
+        return request.endpoint or 'unknown'
+    return 'background'
+
+
+def _on_query(sql, args, seconds, rowcount, cursor):
+    endpoint = _endpoint()
+    rows = max(rowcount or 0, 0)
+    db_queries_total.inc((endpoint,))
+    db_rows_total.inc((endpoint,), rows)
+    stats = g.get('_db_stats') if has_request_context() else None
+    if stats is not None:
+        stats['queries'] += 1
+        stats['db_time'] += seconds
+        stats['rows'] += rows
+
+
+def _on_checkout(opened):
+    db_checkouts_total.inc((_endpoint(), '1' if opened else '0'))
+    stats = g.get('_db_stats') if has_request_context() else None
+    if stats is not None:
+        stats['checkouts'] += 1
+
+
+def _before_request():
+    g._request_started = time.perf_counter()
+    g._db_stats = {'queries': 0, 'db_time': 0.0, 'rows': 0, 'checkouts': 0}
+
+
+def _after_request(response):
+    started = g.get('_request_started')
+    stats = g.get('_db_stats')
+    if started is None or stats is None:
+        return response
+    total = time.perf_counter() - started
+    endpoint = request.endpoint or 'unknown'
+    request_latency.observe(total, (endpoint, request.method, str(response.status_code)))
+    request_db_time.observe(stats['db_time'], (endpoint,))
+    request_queries.observe(stats['queries'], (endpoint,))
+    response.headers['Server-Timing'] = (
+        f'db;dur={stats["db_time"] * 1000:.2f};desc="{stats["queries"]} queries", '
+        f'app;dur={max(total - stats["db_time"], 0) * 1000:.2f}, '
+        f'total;dur={total * 1000:.2f}'
+    )
+    return response
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def check_token():
+    """Gate for the operational endpoints: None if allowed, else the HTTP status to return.
+
+    They are off unless METRICS_TOKEN is set (404, as if absent), and then need
+    `Authorization: Bearer <token>` (403 otherwise).
+    """
+    token = os.getenv('METRICS_TOKEN')
+    if not token:
+        return 404
+    if request.headers.get('Authorization') != f"Bearer {token}":
+        return 403
+    return None
+
+
+def metrics_view():
+    denied = check_token()
+    if denied:
+        return Response('Not Found\n' if denied == 404 else 'Forbidden\n', status=denied, mimetype='text/plain')
+    return Response(render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    db_helper.add_query_hook(_on_query)
+    db_helper.add_checkout_hook(_on_checkout)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,137 @@
+"""Ordered, recorded schema migrations.
+
+Migrations are the numbered `*.sql` files in `migrations/`. Each one is applied
+once, in filename order, and recorded in `schema_migrations`.
+
+    python -m utils.migrate                 # apply pending migrations
+    python -m utils.migrate --status        # list applied / pending
+    python -m utils.migrate --mark-applied 0002_hot_query_indexes
+"""
+import argparse
+import os
+import sys
+
+from utils.db_helper import get_db_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+LOCK_NAME = 'mindset_schema_migrations'
+
+
+def _split_statements(sql):
+    """Split a migration file into statements on `;` line endings, dropping `--` comments."""
+    statements, current = [], []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('--'):
+            continue
+        current.append(line)
+        if stripped.endswith(';'):
+            statements.append('\n'.join(current).rstrip().rstrip(';'))
+            current = []
+    if current:
+        statements.append('\n'.join(current))
+    return statements
+
+
+def available_migrations():
+    """Return [(version, path)] sorted by version."""
+    files = sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith('.sql'))
+    return [(f[:-4], os.path.join(MIGRATIONS_DIR, f)) for f in files]
+
+
+def _ensure_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+          version VARCHAR(255) PRIMARY KEY,
+          applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(cursor):
+    _ensure_table(cursor)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row['version'] for row in cursor.fetchall()}
+
+
+def migrate(out=sys.stdout):
+    """Apply pending migrations in order; returns the list of versions applied.
+
+    MySQL commits DDL implicitly, so a migration that fails midway is not
+    recorded and must be fixed up by hand before re-running.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    applied = []
+    try:
+        # Serialise concurrent deploys running the migrator at the same time
+        cursor.execute("SELECT GET_LOCK(%s, 60) AS locked", (LOCK_NAME,))
+        if not cursor.fetchone()['locked']:
+            raise RuntimeError('Could not acquire migration lock')
+        try:
+            done = applied_versions(cursor)
+            for version, path in available_migrations():
+                if version in done:
+                    continue
+                with open(path) as f:
+                    statements = _split_statements(f.read())
+                print(f"Applying {version} ({len(statements)} statements)", file=out)
+                for statement in statements:
+                    cursor.execute(statement)
+                cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+                conn.commit()
+                applied.append(version)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    return applied
+
+
+def mark_applied(version):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        _ensure_table(cursor)
+        cursor.execute("INSERT IGNORE INTO schema_migrations (version) VALUES (%s)", (version,))
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def status():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        done = applied_versions(cursor)
+    finally:
+        cursor.close()
+        conn.close()
+    return [(version, version in done) for version, _ in available_migrations()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Apply database migrations')
+    parser.add_argument('--status', action='store_true', help='show applied and pending migrations')
+    parser.add_argument('--mark-applied', metavar='VERSION', help='record a migration as applied without running it')
+    args = parser.parse_args(argv)
+
+    if args.status:
+        for version, is_applied in status():
+            print(f"{'applied' if is_applied else 'pending'}  {version}")
+        return 0
+    if args.mark_applied:
+        mark_applied(args.mark_applied)
+        return 0
+    applied = migrate()
+    print(f"{len(applied)} migration(s) applied")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
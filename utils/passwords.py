@@ -0,0 +1,149 @@
+"""Password hashing on a bounded process pool.
+
+Key derivation is deliberately slow and CPU-bound; run inline it holds the GIL
+and stalls every other request on the worker. Hashes and checks are sent to a
+small process pool instead. At most PASSWORD_HASH_MAX_PENDING of them may be in
+flight; past that, callers wait up to PASSWORD_HASH_QUEUE_TIMEOUT seconds and
+then get HasherBusy, which routes turn into a 503. A hash that outlives
+PASSWORD_HASH_TIMEOUT also raises HasherBusy; it keeps its slot until the
+worker actually finishes.
+
+PASSWORD_HASH_METHOD is any werkzeug method string (e.g. "scrypt:32768:8:1" or
+"pbkdf2:sha256:600000"). Stored hashes made with another method or cost are
+upgraded on the next successful login (see needs_rehash).
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from utils import metrics
+
+
+class HasherBusy(Exception):
+    """Too many hashes are already queued; the caller should retry later."""
+
+
+class PasswordHasher:
+    def __init__(self, method='scrypt', workers=2, max_pending=8, queue_timeout=2.0, timeout=10.0):
+        self.method = method
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._method_prefix = None
+        self._stats = {'hashed': 0, 'verified': 0, 'rejected_busy': 0, 'timed_out': 0, 'rehashed': 0}
+        self._stats_lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._stats_lock:
+            self._stats[name] += n
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the parent has DB sockets and background threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def _reset_executor(self, broken):
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False)
+
+    def _submit(self, fn, *args):
+        """Take a slot and submit; the slot is freed when the worker finishes, not when the caller gives up."""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.count('rejected_busy')
+            raise HasherBusy()
+        try:
+            executor = self._get_executor()
+            future = executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return executor, future
+
+    def _result(self, future):
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # The hash keeps its slot until the worker is done, so backpressure still holds
+            self.count('timed_out')
+            raise HasherBusy()
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        executor, future = self._submit(fn, *args)
+        try:
+            return self._result(future)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool and retry once
+            self._reset_executor(executor)
+            return self._result(self._submit(fn, *args)[1])
+
+    def hash(self, password):
+        hashed = self._run(generate_password_hash, password, self.method)
+        self.count('hashed')
+        return hashed
+
+    def verify(self, stored_hash, password):
+        if not stored_hash:
+            return False
+        ok = self._run(check_password_hash, stored_hash, password)
+        self.count('verified')
+        return ok
+
+    def needs_rehash(self, stored_hash):
+        """True when a stored hash was made with a different method or cost than configured."""
+        if self._method_prefix is None:
+            # werkzeug fills in default parameters, so compare against a real hash's prefix
+            self._method_prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return stored_hash.split('$', 1)[0] != self._method_prefix
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_workers = int(os.getenv('PASSWORD_HASH_WORKERS', min(os.cpu_count() or 1, 4)))
+
+hasher = PasswordHasher(
+    method=os.getenv('PASSWORD_HASH_METHOD', 'scrypt'),
+    workers=_workers,
+    max_pending=int(os.getenv('PASSWORD_HASH_MAX_PENDING', max(_workers, 1) * 4)),
+    queue_timeout=float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', 2)),
+    timeout=float(os.getenv('PASSWORD_HASH_TIMEOUT', 10)),
+)
+
+metrics.register(metrics.Gauge(
+    'password_hash_events_total', 'Password hasher outcomes (hashed, verified, rejected_busy, timed_out, rehashed)',
+    lambda: {(name,): n for name, n in hasher.stats().items()}, ('event',)))
+
+
+def hash_password(password):
+    return hasher.hash(password)
+
+
+def verify_password(stored_hash, password):
+    return hasher.verify(stored_hash, password)
+
+
+def needs_rehash(stored_hash):
+    return hasher.needs_rehash(stored_hash)
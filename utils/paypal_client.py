@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils import metrics
+
+
+class PayPalError(Exception):
+    def __init__(self, message, status=None, payload=None):
+        super().__init__(message)
+        self.status = status
+        self.payload = payload
+
+
+class PayPalClient:
+    """PayPal REST client with a keep-alive connection pool and a cached OAuth token.
+
+    The token is reused until `refresh_margin` seconds before PayPal's
+    `expires_in`, and only one thread mints a new one at a time. Every call uses
+    explicit (connect, read) timeouts. Point `base_url` at a local HTTP server to
+    test without the sandbox.
+    """
+
+    def __init__(self, client_id, secret, base_url, connect_timeout=3.05, read_timeout=15,
+                 pool_maxsize=20, refresh_margin=300):
+        self.client_id = client_id
+        self.secret = secret
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.refresh_margin = refresh_margin
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._token = None
+        self._token_expires_at = 0.0
+        self._token_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self.metrics = {}
+
+    def _record(self, op, started, ok):
+        elapsed = time.monotonic() - started
+        with self._metrics_lock:
+            m = self.metrics.setdefault(op, {'count': 0, 'errors': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            m['count'] += 1
+            m['errors'] += 0 if ok else 1
+            m['total_seconds'] += elapsed
+            m['max_seconds'] = max(m['max_seconds'], elapsed)
+
+    def _request(self, op, method, path, **kwargs):
+        started = time.monotonic()
+        ok = False
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = {}
+            if response.status_code >= 400:
+                raise PayPalError(f"PayPal {op} failed with HTTP {response.status_code}",
+                                  response.status_code, payload)
+            ok = True
+            return response, payload
+        finally:
+            self._record(op, started, ok)
+
+    def access_token(self):
+        if self._token and time.monotonic() < self._token_expires_at:
+            return self._token
+        with self._token_lock:
+            # Another thread may have refreshed while we waited for the lock
+            if self._token and time.monotonic() < self._token_expires_at:
+                return self._token
+            _, payload = self._request(
+                'oauth_token', 'POST', '/v1/oauth2/token',
+                headers={'Accept': 'application/json', 'Accept-Language': 'en_US'},
+                auth=(self.client_id, self.secret),
+                data={'grant_type': 'client_credentials'}
+            )
+            token = payload.get('access_token')
+            if not token:
+                raise PayPalError('PayPal returned no access token', payload=payload)
+            expires_in = int(payload.get('expires_in', 0))
+            self._token = token
+            self._token_expires_at = time.monotonic() + max(0, expires_in - self.refresh_margin)
+            return token
+
+    def _authorized(self, op, method, path, **kwargs):
+        headers = {"Content-Type": "application/json", "Authorization": f"Bearer {self.access_token()}"}
+        try:
+            return self._request(op, method, path, headers=headers, **kwargs)
+        except PayPalError as e:
+            if e.status != 401:
+                raise
+        # Token revoked early: drop it and retry once with a fresh one
+        self._token = None
+        headers['Authorization'] = f"Bearer {self.access_token()}"
+        return self._request(op, method, path, headers=headers, **kwargs)
+
+    def create_order(self, payload):
+        return self._authorized('create_order', 'POST', '/v2/checkout/orders', json=payload)[1]
+
+    def capture_order(self, order_id):
+        return self._authorized('capture_order', 'POST', f'/v2/checkout/orders/{order_id}/capture')[1]
+
+    def stats(self):
+        with self._metrics_lock:
+            return {op: dict(m) for op, m in self.metrics.items()}
+
+
+paypal = PayPalClient(
+    client_id=os.getenv('PAYPAL_CLIENT_ID', "AU4cjGgjCzRvANikWUNe_4U-km4mK1PodmfLnxzipXh49Rubk4Au89h9TbLirHmeY5NMrQmVqtJ99ioN"),
+    secret=os.getenv('PAYPAL_SECRET', "EPBa65CjR833nRpu5vJEBLmrvdJT8_uaeCv97q0LxEvo8vI0PIk58i_w1fLvUt7UIDkBe-jaw4fZx9Jk"),
+    base_url=os.getenv('PAYPAL_API', "https://api-m.sandbox.paypal.com"),  # Switch to live API for production
+    connect_timeout=float(os.getenv('PAYPAL_CONNECT_TIMEOUT', 3.05)),
+    read_timeout=float(os.getenv('PAYPAL_READ_TIMEOUT', 15)),
+    pool_maxsize=int(os.getenv('PAYPAL_POOL_SIZE', 20)),
+)
+
+
+def _op_stat(field):
+    return lambda: {(op,): m[field] for op, m in paypal.stats().items()}
+
+
+metrics.register(metrics.Gauge('paypal_requests_total', 'PayPal API calls', _op_stat('count'), ('op',)))
+metrics.register(metrics.Gauge('paypal_errors_total', 'PayPal API calls that failed', _op_stat('errors'), ('op',)))
+metrics.register(metrics.Gauge(
+    'paypal_request_seconds_total', 'Time spent in PayPal API calls', _op_stat('total_seconds'), ('op',)))
+metrics.register(metrics.Gauge(
+    'paypal_request_seconds_max', 'Slowest PayPal API call', _op_stat('max_seconds'), ('op',)))
@@ -0,0 +1,115 @@
+"""Denormalized comment_count and last_activity_at on posts.
+
+    python -m utils.post_activity --reconcile          # report drifted posts
+    python -m utils.post_activity --reconcile --fix    # ...and rewrite them
+
+comment_count is the number of live comments. last_activity_at is the newest of
+the post's own created_at and its live comments' created_at. Routes call
+comment_added/comments_removed in the same transaction as the comment write, so
+listings read both columns instead of counting comments per post.
+
+--reconcile recomputes both columns from comments, in batches of post ids, and
+reports any post whose stored values differ. With --fix, only those posts are
+rewritten, each batch in its own short transaction. The rewrite recomputes the
+values in the UPDATE itself, so it can't undo a comment that was committed
+after the check.
+"""
+import argparse
+import time
+
+from utils.db_helper import get_db_connection
+
+BATCH = 1000
+
+_LIVE_COUNT_SQL = "(SELECT COUNT(*) FROM comments c WHERE c.post_id = posts.id AND c.is_deleted = 0)"
+_LAST_ACTIVITY_SQL = (
+    "GREATEST(posts.created_at, COALESCE("
+    "(SELECT MAX(c.created_at) FROM comments c WHERE c.post_id = posts.id AND c.is_deleted = 0), "
+    "posts.created_at))"
+)
+
+# Run inside the comment write's transaction; utils/explain_check.py EXPLAINs these too
+COMMENT_ADDED_SQL = (
+    "UPDATE posts SET comment_count = comment_count + 1, "
+    "last_activity_at = GREATEST(last_activity_at, (SELECT created_at FROM comments WHERE id = %s)) "
+    "WHERE id = %s"
+)
+COMMENTS_REMOVED_SQL = (
+    f"UPDATE posts SET comment_count = comment_count - %s, last_activity_at = {_LAST_ACTIVITY_SQL} "
+    "WHERE id = %s"
+)
+
+
+def comment_added(cursor, post_id, comment_id):
+    cursor.execute(COMMENT_ADDED_SQL, (comment_id, post_id))
+
+
+def comments_removed(cursor, removed):
+    """Apply {post_id: comments removed}; last_activity_at falls back to the newest remaining comment."""
+    if removed:
+        cursor.executemany(COMMENTS_REMOVED_SQL, [(n, post_id) for post_id, n in sorted(removed.items())])
+
+
+def reconcile(fix=False, batch=BATCH, sleep=0.0):
+    """Compare stored values with recomputed ones for every post. Returns (checked, drifted ids)."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    checked, drifted = 0, []
+    last_id = 0
+    try:
+        while True:
+            cursor.execute(
+                f"SELECT id, comment_count, last_activity_at, {_LIVE_COUNT_SQL} AS actual_count, "
+                f"{_LAST_ACTIVITY_SQL} AS actual_activity "
+                "FROM posts WHERE id > %s ORDER BY id LIMIT %s",
+                (last_id, batch)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            checked += len(rows)
+            ids = [row['id'] for row in rows
+                   if row['comment_count'] != row['actual_count']
+                   or row['last_activity_at'] != row['actual_activity']]
+            drifted.extend(ids)
+            if fix and ids:
+                placeholders = ','.join(['%s'] * len(ids))
+                cursor.execute(
+                    f"UPDATE posts SET comment_count = {_LIVE_COUNT_SQL}, last_activity_at = {_LAST_ACTIVITY_SQL} "
+                    f"WHERE id IN ({placeholders})",
+                    tuple(ids)
+                )
+            conn.commit()
+            if len(rows) < batch:
+                break
+            if sleep:
+                time.sleep(sleep)
+        return checked, drifted
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check posts.comment_count and last_activity_at against comments')
+    parser.add_argument('--reconcile', action='store_true')
+    parser.add_argument('--fix', action='store_true', help='rewrite drifted posts')
+    parser.add_argument('--batch', type=int, default=BATCH, help='posts per batch')
+    parser.add_argument('--sleep', type=float, default=0.0, help='seconds to pause between batches')
+    args = parser.parse_args(argv)
+    if not args.reconcile:
+        parser.print_help()
+        return
+    checked, drifted = reconcile(args.fix, args.batch, args.sleep)
+    print(f"checked {checked} posts, {len(drifted)} drifted" + (" (fixed)" if args.fix and drifted else ""))
+    if drifted and not args.fix:
+        print("first drifted ids: " + ', '.join(str(i) for i in drifted[:20]))
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
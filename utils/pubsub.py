@@ -0,0 +1,230 @@
+"""In-process pub/sub hub behind the community push streams.
+
+Routes publish after their transaction commits; each open stream is a
+Subscriber on one topic ('channel:<id>' or 'post:<id>'). A message is encoded
+to its Server-Sent Events frame once, however many subscribers receive it.
+The module-level publish() and add_reaction() log a failure instead of raising
+it into a write that has already committed.
+
+Every subscriber has a bounded queue (PUBSUB_QUEUE_SIZE frames). A subscriber
+that falls behind loses its oldest frames and is sent a 'resync' event, telling
+the client to refetch once over the normal GET endpoints instead of holding
+memory for it. Reaction counts are not pushed per click: deltas are summed per
+post and published every PUBSUB_REACTION_INTERVAL seconds.
+
+The hub only sees writes made by its own process, so streams need the
+single-process (gevent) deployment, or sticky routing of writers and readers.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from utils import metrics
+from utils.db_helper import get_db_connection
+
+log = logging.getLogger(__name__)
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class TooManyStreamsForUser(TooManySubscribers):
+    """The caller already has max_per_user streams open in this process."""
+
+
+def _frame(seq, event, data):
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'), sort_keys=True)}\n\n"
+
+
+class Subscriber:
+    def __init__(self, topic, max_queue):
+        self.topic = topic
+        self._frames = deque(maxlen=max_queue)
+        self._cond = threading.Condition()
+        self.overflowed = False
+        self.owner = None
+
+    def put(self, frame):
+        """Queue a frame; True if the oldest queued frame was dropped to make room."""
+        with self._cond:
+            full = len(self._frames) == self._frames.maxlen
+            if full:
+                self.overflowed = True
+            self._frames.append(frame)
+            self._cond.notify()
+        return full
+
+    def get(self, timeout):
+        """Wait up to `timeout` seconds and return the queued frames as one string ('' on timeout)."""
+        with self._cond:
+            if not self._frames:
+                self._cond.wait(timeout)
+            frames = list(self._frames)
+            self._frames.clear()
+            overflowed, self.overflowed = self.overflowed, False
+        if overflowed:
+            frames.insert(0, "event: resync\ndata: {}\n\n")
+        return ''.join(frames)
+
+
+class Hub:
+    def __init__(self, max_queue=100, max_subscribers=5000, reaction_interval=1.0, max_per_user=4):
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self.max_per_user = max_per_user
+        self.reaction_interval = reaction_interval
+        self._topics = {}  # topic -> set of Subscribers
+        self._count = 0
+        self._per_user = {}  # owner -> open streams
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._reactions = {}  # post_id -> [likes delta, dislikes delta]
+        self._thread = None
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, topic, owner=None):
+        """Open a stream on `topic`; `owner` (a user id or address) is held to max_per_user streams."""
+        sub = Subscriber(topic, self.max_queue)
+        sub.owner = owner
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise TooManySubscribers()
+            if owner is not None:
+                if self._per_user.get(owner, 0) >= self.max_per_user:
+                    raise TooManyStreamsForUser()
+                self._per_user[owner] = self._per_user.get(owner, 0) + 1
+            self._topics.setdefault(topic, set()).add(sub)
+            self._count += 1
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._topics.get(sub.topic)
+            if subs is not None and sub in subs:
+                subs.discard(sub)
+                self._count -= 1
+                if not subs:
+                    del self._topics[sub.topic]
+                if sub.owner is not None:
+                    remaining = self._per_user[sub.owner] - 1
+                    if remaining:
+                        self._per_user[sub.owner] = remaining
+                    else:
+                        del self._per_user[sub.owner]
+
+    def has_subscribers(self, topic):
+        return topic in self._topics
+
+    def publish(self, event, data, *topics):
+        """Send one event to every subscriber of the given topics."""
+        with self._lock:
+            subs = [sub for topic in topics for sub in self._topics.get(topic, ())]
+            if not subs:
+                return
+            self._seq += 1
+            seq = self._seq
+        frame = _frame(seq, event, data)
+        for sub in subs:
+            if sub.put(frame):
+                self.dropped += 1
+        self.published += 1
+
+    def add_reaction(self, post_id, likes, dislikes):
+        """Queue a like/dislike delta; published, summed per post, on the next tick."""
+        if not self._topics or not (likes or dislikes):
+            return
+        with self._lock:
+            pending = self._reactions.setdefault(post_id, [0, 0])
+            pending[0] += likes
+            pending[1] += dislikes
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='pubsub-reactions', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.reaction_interval)
+            try:
+                self.flush_reactions()
+            except Exception:
+                log.exception('Reaction delta publish failed')
+
+    def flush_reactions(self):
+        with self._lock:
+            pending, self._reactions = self._reactions, {}
+            watch_channels = any(topic.startswith('channel:') for topic in self._topics)
+        pending = {post_id: d for post_id, d in pending.items() if d[0] or d[1]}
+        if not pending:
+            return
+        channels = _channels_of(pending) if watch_channels else {}
+        for post_id, (likes, dislikes) in sorted(pending.items()):
+            topics = [f'post:{post_id}']
+            if post_id in channels:
+                topics.append(f'channel:{channels[post_id]}')
+            self.publish('reactions', {'post_id': post_id, 'likes': likes, 'dislikes': dislikes}, *topics)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'topics': len(self._topics),
+                'subscribers': self._count,
+                'published': self.published,
+                'dropped': self.dropped,
+            }
+
+
+def _channels_of(post_ids):
+    """post id -> channel id for the posts in one flush, in a single query."""
+    ids = list(post_ids)
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        placeholders = ','.join(['%s'] * len(ids))
+        cursor.execute(f"SELECT id, channel_id FROM posts WHERE id IN ({placeholders})", tuple(ids))
+        return {row['id']: row['channel_id'] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+        conn.close()
+
+
+HEARTBEAT = float(os.getenv('PUBSUB_HEARTBEAT', 15))
+
+hub = Hub(
+    max_queue=int(os.getenv('PUBSUB_QUEUE_SIZE', 100)),
+    max_subscribers=int(os.getenv('PUBSUB_MAX_SUBSCRIBERS', 5000)),
+    reaction_interval=float(os.getenv('PUBSUB_REACTION_INTERVAL', 1.0)),
+    max_per_user=int(os.getenv('PUBSUB_MAX_PER_USER', 4)),
+)
+
+metrics.register(metrics.Gauge(
+    'pubsub_subscribers', 'Open community push streams in this process', lambda: hub._count))
+metrics.register(metrics.Gauge(
+    'pubsub_dropped_total', 'Frames dropped from slow stream subscribers', lambda: hub.dropped))
+
+
+def publish(event, data, *topics):
+    try:
+        hub.publish(event, data, *topics)
+    except Exception:
+        log.exception('Could not publish %s to %s', event, ', '.join(topics))
+
+
+def has_subscribers(topic):
+    return hub.has_subscribers(topic)
+
+
+def add_reaction(post_id, likes, dislikes):
+    try:
+        hub.add_reaction(post_id, likes, dislikes)
+    except Exception:
+        log.exception('Could not queue reaction delta for post %s', post_id)
@@ -0,0 +1,175 @@
+import atexit
+import logging
+import os
+import threading
+import time
+
+from utils import feed, metrics, pubsub
+from utils.db_helper import get_db_connection
+
+log = logging.getLogger(__name__)
+
+LIKE = 1
+DISLIKE = -1
+NONE = 0
+
+# Shared with utils/explain_check.py, which EXPLAINs these same statements
+REACTION_FOR_UPDATE_SQL = "SELECT reaction FROM likes WHERE post_id = %s AND user_id = %s FOR UPDATE"
+COUNTERS_SQL = "UPDATE posts SET likes = likes + %s, dislikes = dislikes + %s WHERE id = %s"
+
+
+def _counter_delta(old, new):
+    """(likes_delta, dislikes_delta) for moving a user's reaction from old to new."""
+    likes = (new == LIKE) - (old == LIKE)
+    dislikes = (new == DISLIKE) - (old == DISLIKE)
+    return likes, dislikes
+
+
+class CounterBuffer:
+    """Write-behind buffer that coalesces like/dislike deltas for hot posts.
+
+    The first `hot_threshold` reactions a post receives in a flush interval are
+    applied inline; beyond that the post is considered hot and its deltas are
+    summed in memory and written in one batch every `interval` seconds.
+    """
+
+    def __init__(self, interval=0.5, hot_threshold=5):
+        self.interval = interval
+        self.hot_threshold = hot_threshold
+        self._pending = {}
+        self._seen = {}
+        self._window_started = time.monotonic()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.flushes = 0
+        self.coalesced = 0
+
+    def is_hot(self, post_id):
+        """Count a reaction against the post; True once it exceeds the hot threshold this interval."""
+        with self._lock:
+            # Counts start over every `interval`, whether or not the flusher is running yet
+            now = time.monotonic()
+            if now - self._window_started >= self.interval:
+                self._seen = {}
+                self._window_started = now
+            seen = self._seen.get(post_id, 0) + 1
+            self._seen[post_id] = seen
+            return seen > self.hot_threshold
+
+    def add(self, post_id, likes, dislikes):
+        with self._lock:
+            pending = self._pending.setdefault(post_id, [0, 0])
+            pending[0] += likes
+            pending[1] += dislikes
+            self.coalesced += 1
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='reaction-flusher', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                log.exception('Reaction counter flush failed')
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        rows = [(d[0], d[1], post_id) for post_id, d in sorted(pending.items()) if d[0] or d[1]]
+        if not rows:
+            return
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            # Sorted by post id so concurrent flushers take row locks in the same order
+            cursor.executemany(COUNTERS_SQL, rows)
+            feed.adjust_many(cursor, [(likes - dislikes, 0, post_id) for likes, dislikes, post_id in rows
+                                      if likes != dislikes])
+            conn.commit()
+            with self._lock:
+                self.flushes += 1
+        except Exception:
+            conn.rollback()
+            with self._lock:
+                for likes, dislikes, post_id in rows:
+                    d = self._pending.setdefault(post_id, [0, 0])
+                    d[0] += likes
+                    d[1] += dislikes
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending_posts': len(self._pending),
+                'coalesced': self.coalesced,
+                'flushes': self.flushes,
+            }
+
+
+write_behind = None
+if os.getenv('REACTIONS_WRITE_BEHIND', '0') == '1':
+    write_behind = CounterBuffer(
+        interval=float(os.getenv('REACTIONS_FLUSH_INTERVAL', 0.5)),
+        hot_threshold=int(os.getenv('REACTIONS_HOT_THRESHOLD', 5)),
+    )
+    atexit.register(write_behind.flush)
+    metrics.register(metrics.Gauge(
+        'reactions_pending_posts', 'Posts with counter deltas waiting for the next write-behind flush',
+        lambda: write_behind.stats()['pending_posts']))
+    metrics.register(metrics.Gauge(
+        'reactions_coalesced_total', 'Reactions whose counter delta was buffered instead of written inline',
+        lambda: write_behind.stats()['coalesced']))
+    metrics.register(metrics.Gauge(
+        'reactions_flushes_total', 'Write-behind counter flushes', lambda: write_behind.stats()['flushes']))
+
+
+def apply_reaction(conn, post_id, user_id, reaction):
+    """Set a user's reaction on a post (1 like, -1 dislike, 0 remove) in one transaction.
+
+    Likes/dislikes use a single upsert on likes(post_id, user_id) whose affected-row
+    count tells us the previous value (1 inserted, 2 flipped, 0 unchanged), followed
+    by at most one counter UPDATE on posts (and its post_feed row). Returns
+    (old_reaction, new_reaction).
+    """
+    cursor = conn.cursor()
+    try:
+        if reaction == NONE:
+            cursor.execute(REACTION_FOR_UPDATE_SQL, (post_id, user_id))
+            row = cursor.fetchone()
+            old = row['reaction'] if row else NONE
+            if row:
+                cursor.execute("DELETE FROM likes WHERE post_id = %s AND user_id = %s", (post_id, user_id))
+        else:
+            affected = cursor.execute(
+                "INSERT INTO likes (post_id, user_id, reaction) VALUES (%s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE reaction = VALUES(reaction)",
+                (post_id, user_id, reaction)
+            )
+            old = {1: NONE, 2: -reaction}.get(affected, reaction)
+
+        likes, dislikes = _counter_delta(old, reaction)
+        buffered = bool(likes or dislikes) and write_behind is not None and write_behind.is_hot(post_id)
+        if (likes or dislikes) and not buffered:
+            cursor.execute(COUNTERS_SQL, (likes, dislikes, post_id))
+            feed.adjust(cursor, post_id, votes=likes - dislikes)
+        conn.commit()
+        # Only hand the delta to the write-behind buffer once the likes row is durable
+        if buffered:
+            write_behind.add(post_id, likes, dislikes)
+        pubsub.add_reaction(post_id, likes, dislikes)
+        return old, reaction
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
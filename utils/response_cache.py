@@ -0,0 +1,80 @@
+import hashlib
+import os
+import threading
+from functools import wraps
+
+from flask import request, make_response
+
+from utils import metrics
+from utils.cache import TTLCache
+
+_responses = TTLCache(
+    maxsize=int(os.getenv('RESPONSE_CACHE_SIZE', 5000)),
+    ttl=int(os.getenv('RESPONSE_CACHE_TTL', 30)),
+)
+_generations = {}
+_generations_lock = threading.Lock()
+
+
+def _generation(tag):
+    return _generations.get(tag, 0)
+
+
+def invalidate(*tags):
+    """Drop every cached response tagged with any of `tags`.
+
+    Called by mutating endpoints after they commit. Bumping a tag's generation
+    changes the cache key of everything that depends on it, so stale entries are
+    never served again and simply age out of the LRU.
+    """
+    with _generations_lock:
+        for tag in tags:
+            _generations[tag] = _generations.get(tag, 0) + 1
+
+
+def cached(*tags, ttl=None):
+    """Cache a public GET view's 200 responses with a strong ETag.
+
+    Tags may reference view arguments, e.g. cached('post:{post_id}'), and tie the
+    entry to the matching invalidate() calls. Clients sending If-None-Match get a
+    304 whether the body came from the cache or was just rendered.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            resolved = [tag.format(**kwargs) for tag in tags]
+            key = (
+                request.endpoint,
+                tuple(sorted(kwargs.items())),
+                request.query_string,
+                tuple(_generation(tag) for tag in resolved),
+            )
+            entry = _responses.get(key)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+                body = response.get_data()
+                entry = (body, response.mimetype, hashlib.sha256(body).hexdigest()[:32])
+                _responses.set(key, entry, ttl)
+            body, mimetype, etag = entry
+            response = make_response(body, 200)
+            response.mimetype = mimetype
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+
+def stats():
+    return _responses.stats()
+
+
+metrics.register(metrics.Gauge(
+    'response_cache_hits_total', 'Public GETs served from the response cache', lambda: stats()['hits']))
+metrics.register(metrics.Gauge(
+    'response_cache_misses_total', 'Public GETs rendered because nothing was cached', lambda: stats()['misses']))
+metrics.register(metrics.Gauge('response_cache_size', 'Cached responses held', lambda: stats()['size']))
+metrics.register(metrics.Gauge(
+    'response_cache_tags', 'Tags that have been invalidated at least once', lambda: len(_generations)))
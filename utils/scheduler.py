@@ -0,0 +1,164 @@
+"""Background scheduler that flips events to 'past' once they start.
+
+One daemon thread per process sleeps until the earliest upcoming starts_at,
+wakes early when create_event/update_event call notify(), and then flips due
+events in batches of EVENT_SCHEDULER_BATCH. Each batch is a range scan on
+idx_events_status_starts (status, starts_at), never a full-table update.
+Sleeps are capped at EVENT_SCHEDULER_MAX_SLEEP seconds so that events created
+through another worker process are still picked up. Set EVENT_SCHEDULER=0 to
+disable it, e.g. when a single dedicated process should own the sweep.
+Running it in several workers is safe: each batch locks its rows and
+re-checks the status.
+"""
+import logging
+import os
+import threading
+from datetime import datetime
+
+from utils import metrics
+from utils.db_helper import get_db_connection
+from utils.response_cache import invalidate
+
+log = logging.getLogger(__name__)
+
+# Both walk idx_events_status_starts; utils/explain_check.py EXPLAINs the same statements
+NEXT_DUE_SQL = "SELECT MIN(starts_at) AS next_due FROM events WHERE status = 'upcoming'"
+DUE_SQL = (
+    "SELECT id, starts_at FROM events WHERE status = 'upcoming' AND starts_at <= %s "
+    "ORDER BY starts_at LIMIT %s FOR UPDATE"
+)
+
+
+class EventStatusScheduler:
+    def __init__(self, batch=500, max_sleep=300.0):
+        self.batch = batch
+        self.max_sleep = max_sleep
+        self._cond = threading.Condition()
+        self._thread = None
+        self._woken = False
+        self.next_due = None
+        self.lag_seconds = 0.0
+        self.flipped_total = 0
+        self.sweeps = 0
+
+    def start(self):
+        if self._thread is None:
+            with self._cond:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='event-scheduler', daemon=True)
+                    self._thread.start()
+
+    def notify(self):
+        """Re-read the next due time now (call after an event's starts_at or status changes)."""
+        with self._cond:
+            self._woken = True
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            try:
+                self.sweep()
+                delay = self._seconds_until_next_due()
+            except Exception:
+                log.exception('Event status sweep failed')
+                delay = min(self.max_sleep, 30.0)
+            with self._cond:
+                if not self._woken:
+                    self._cond.wait(timeout=delay)
+                self._woken = False
+
+    def _seconds_until_next_due(self):
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(NEXT_DUE_SQL)
+            self.next_due = cursor.fetchone()['next_due']
+        finally:
+            cursor.close()
+            conn.close()
+        if self.next_due is None:
+            return self.max_sleep
+        seconds = (self.next_due - datetime.utcnow()).total_seconds()
+        return min(max(seconds, 0.0), self.max_sleep)
+
+    def sweep(self):
+        """Flip every due event to 'past', a batch per transaction. Returns how many flipped."""
+        flipped = 0
+        lag = 0.0
+        while True:
+            now = datetime.utcnow()
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            try:
+                cursor.execute(DUE_SQL, (now, self.batch))
+                rows = cursor.fetchall()
+                if rows:
+                    lag = max(lag, (now - rows[0]['starts_at']).total_seconds())
+                    ids = [row['id'] for row in rows]
+                    placeholders = ','.join(['%s'] * len(ids))
+                    cursor.execute(
+                        f"UPDATE events SET status = 'past' WHERE id IN ({placeholders}) AND status = 'upcoming'",
+                        tuple(ids)
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+                conn.close()
+            if rows:
+                flipped += len(rows)
+                invalidate('events', *(f'event:{event_id}' for event_id in ids))
+            if len(rows) < self.batch:
+                break
+        self.sweeps += 1
+        self.flipped_total += flipped
+        # How late the oldest event flipped in this sweep was; 0 when nothing was due
+        self.lag_seconds = lag
+        return flipped
+
+    def current_lag(self):
+        """Seconds the scheduler is behind: the last sweep's lag, or how overdue the next event is."""
+        overdue = 0.0
+        if self.next_due is not None:
+            overdue = max((datetime.utcnow() - self.next_due).total_seconds(), 0.0)
+        return max(self.lag_seconds, overdue)
+
+    def stats(self):
+        return {
+            'next_due': self.next_due.isoformat() + 'Z' if self.next_due else None,
+            'lag_seconds': self.current_lag(),
+            'flipped_total': self.flipped_total,
+            'sweeps': self.sweeps,
+            'running': self._thread is not None,
+        }
+
+
+scheduler = EventStatusScheduler(
+    batch=int(os.getenv('EVENT_SCHEDULER_BATCH', 500)),
+    max_sleep=float(os.getenv('EVENT_SCHEDULER_MAX_SLEEP', 300)),
+)
+
+metrics.register(metrics.Gauge(
+    'event_scheduler_lag_seconds', 'How far behind starts_at the scheduler is flipping events to past',
+    scheduler.current_lag))
+metrics.register(metrics.Gauge(
+    'event_scheduler_flipped_total', 'Events flipped to past by the scheduler', lambda: scheduler.flipped_total))
+
+
+def notify():
+    scheduler.notify()
+
+
+def init_app(app):
+    if os.getenv('EVENT_SCHEDULER', '1') != '1':
+        return
+
+    # Started on the first request rather than at import, so pre-forking servers
+    # run it in each worker instead of only in the master
+    def _ensure_started():
+        if scheduler._thread is None:
+            scheduler.start()
+
+    app.before_request(_ensure_started)
@@ -0,0 +1,354 @@
+"""Full-text search over posts, comments and events.
+
+    python -m utils.search --rebuild      # memory backend: rebuild and write the snapshot
+
+Two backends share one interface, selected with SEARCH_BACKEND:
+
+- "mysql" (default): InnoDB FULLTEXT indexes from migration 0006. MySQL keeps
+  them current on every write, so the index_* hooks are no-ops and every worker
+  process sees the same results.
+- "memory": an in-process BM25 inverted index. Routes feed it through the
+  index_*/remove* hooks after each commit; deleting a post also drops its
+  comments, which only stay searchable while their post is live. With SEARCH_INDEX_PATH set it loads
+  a snapshot at startup and catches up on rows written since, rather than
+  rebuilding from scratch. Each process holds its own copy, so it suits
+  single-process deployments, the gevent server and the benchmark.
+
+Results are (kind, id, score) hits ordered by score desc, then kind and id.
+Cursors have the form '<score>|<kind>|<id>'.
+"""
+import abc
+import argparse
+import atexit
+import heapq
+import math
+import os
+import pickle
+import re
+import threading
+from collections import Counter
+
+from utils.db_helper import get_db_connection
+
+KINDS = ('comment', 'event', 'post')
+_TOKEN = re.compile(r'\w+')
+_STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have i in is it its of on or our so that the '
+    'their there this to was we were will with you your'.split()
+)
+_LOAD_BATCH = 5000
+
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall((text or '').lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+def parse_cursor(raw):
+    """Decode '<score>|<kind>|<id>' into (score, kind, id), or None."""
+    parts = (raw or '').split('|', 2)
+    if len(parts) != 3 or parts[1] not in KINDS:
+        return None
+    try:
+        return float(parts[0]), parts[1], parts[2]
+    except ValueError:
+        return None
+
+
+def make_cursor(hit):
+    kind, doc_id, score = hit
+    return f"{score!r}|{kind}|{doc_id}"
+
+
+class SearchBackend(abc.ABC):
+    """Interface shared by the search backends. Document ids are strings throughout."""
+
+    def index(self, kind, doc_id, text, post_id=None):
+        """Add or replace a document (called after the row is committed); comments pass their post_id."""
+
+    def remove(self, kind, doc_id):
+        """Drop a document, e.g. after a soft delete."""
+
+    def remove_post(self, post_id):
+        """Drop a deleted post together with its comments."""
+        self.remove('post', post_id)
+
+    @abc.abstractmethod
+    def search(self, query, kinds=KINDS, limit=20, after=None):
+        """Return one page of (kind, id, score) hits, best first, starting after cursor `after`."""
+
+
+class MySQLFulltextBackend(SearchBackend):
+    # kind -> (FROM clause, MATCH columns, id column, liveness filter)
+    _SOURCES = {
+        'post': ("posts", "title, body", "id", "is_deleted = 0"),
+        'comment': ("comments c JOIN posts p ON p.id = c.post_id AND p.is_deleted = 0", "c.body", "c.id",
+                    "c.is_deleted = 0"),
+        'event': ("events", "title, type, host", "id", "1 = 1"),
+    }
+
+    @classmethod
+    def statement(cls, kinds, after=False):
+        """The search SQL for `kinds` (also EXPLAINed by utils/explain_check.py).
+
+        Parameters: the query twice per kind in sorted order, then the cursor's
+        (score, score, kind, kind, id) if `after`, then the limit.
+        """
+        parts = []
+        for kind in sorted(kinds):
+            source, columns, id_column, live = cls._SOURCES[kind]
+            parts.append(
+                f"SELECT '{kind}' AS kind, CAST({id_column} AS CHAR) AS id, "
+                f"MATCH({columns}) AGAINST (%s IN NATURAL LANGUAGE MODE) AS score FROM {source} "
+                f"WHERE MATCH({columns}) AGAINST (%s IN NATURAL LANGUAGE MODE) AND {live}"
+            )
+        where_cursor = " WHERE score < %s OR (score = %s AND (kind > %s OR (kind = %s AND id > %s)))" if after else ""
+        return ("SELECT kind, id, score FROM (" + " UNION ALL ".join(parts) + ") hits" + where_cursor +
+                " ORDER BY score DESC, kind ASC, id ASC LIMIT %s")
+
+    def search(self, query, kinds=KINDS, limit=20, after=None):
+        params = [query, query] * len(kinds)
+        if after:
+            score, kind, doc_id = after
+            params.extend([score, score, kind, kind, doc_id])
+        params.append(limit)
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(self.statement(kinds, bool(after)), tuple(params))
+            return [(row['kind'], row['id'], row['score']) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
+
+
+class MemoryIndex(SearchBackend):
+    """BM25 inverted index kept in process memory, with an optional on-disk snapshot."""
+
+    def __init__(self, path=None, k1=1.2, b=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._postings = {}  # term -> {(kind, id): term frequency}
+        self._doc_terms = {}  # (kind, id) -> Counter of terms, for removal
+        self._doc_len = {}  # (kind, id) -> token count
+        self._post_comments = {}  # post id -> set of comment ids, for remove_post
+        self._total_len = 0
+        self._watermark = {'post': 0, 'comment': 0, 'event': None}
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def index(self, kind, doc_id, text, post_id=None):
+        key = (kind, str(doc_id))
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove(key)
+            if post_id is not None:
+                self._post_comments.setdefault(str(post_id), set()).add(key[1])
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[key] = tf
+            self._doc_terms[key] = terms
+            self._doc_len[key] = length = sum(terms.values())
+            self._total_len += length
+
+    def remove(self, kind, doc_id):
+        with self._lock:
+            self._remove((kind, str(doc_id)))
+
+    def remove_post(self, post_id):
+        post_id = str(post_id)
+        with self._lock:
+            self._remove(('post', post_id))
+            for comment_id in self._post_comments.pop(post_id, ()):
+                self._remove(('comment', comment_id))
+
+    def _remove(self, key):
+        terms = self._doc_terms.pop(key, None)
+        if terms is None:
+            return
+        self._total_len -= self._doc_len.pop(key)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[term]
+
+    def search(self, query, kinds=KINDS, limit=20, after=None):
+        self.ensure_loaded()
+        terms = set(tokenize(query))
+        kinds = set(kinds)
+        with self._lock:
+            n = len(self._doc_terms)
+            if not n or not terms:
+                return []
+            avg_len = self._total_len / n
+            scores = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, tf in postings.items():
+                    if key[0] not in kinds:
+                        continue
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._doc_len[key] / avg_len)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (self.k1 + 1) / norm
+        hits = ((-score, kind, doc_id) for (kind, doc_id), score in scores.items())
+        if after:
+            bound = (-after[0], after[1], after[2])
+            hits = (h for h in hits if h > bound)
+        return [(kind, doc_id, -neg) for neg, kind, doc_id in heapq.nsmallest(limit, hits)]
+
+    # Loading -------------------------------------------------------------
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            if not (self.path and self.load(self.path)):
+                self._watermark = {'post': 0, 'comment': 0, 'event': None}
+            self.catch_up()
+            self._loaded = True
+
+    def catch_up(self):
+        """Index rows written since the watermark: new posts/comments and updated events."""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            for kind, sql in (
+                ('post', "SELECT id, title, body FROM posts WHERE is_deleted = 0 AND id > %s ORDER BY id LIMIT %s"),
+                ('comment', "SELECT c.id, c.post_id, c.body FROM comments c "
+                            "JOIN posts p ON p.id = c.post_id AND p.is_deleted = 0 "
+                            "WHERE c.is_deleted = 0 AND c.id > %s ORDER BY c.id LIMIT %s"),
+            ):
+                while True:
+                    cursor.execute(sql, (self._watermark[kind], _LOAD_BATCH))
+                    rows = cursor.fetchall()
+                    for row in rows:
+                        self.index(kind, row['id'], _document_text(kind, row), row.get('post_id'))
+                    if rows:
+                        self._watermark[kind] = rows[-1]['id']
+                    if len(rows) < _LOAD_BATCH:
+                        break
+            since = self._watermark['event']
+            cursor.execute(
+                "SELECT id, title, type, host, updated_at FROM events" +
+                (" WHERE updated_at >= %s" if since else ""),
+                (since,) if since else ()
+            )
+            for row in cursor.fetchall():
+                self.index('event', row['id'], _document_text('event', row))
+                if since is None or row['updated_at'] > since:
+                    since = row['updated_at']
+            self._watermark['event'] = since
+        finally:
+            cursor.close()
+            conn.close()
+
+    def rebuild(self):
+        with self._lock:
+            self._postings, self._doc_terms, self._doc_len, self._total_len = {}, {}, {}, 0
+            self._post_comments = {}
+            self._watermark = {'post': 0, 'comment': 0, 'event': None}
+            self.catch_up()
+            self._loaded = True
+
+    def save(self, path=None):
+        path = path or self.path
+        with self._lock:
+            state = {
+                'version': 2,
+                'postings': self._postings,
+                'doc_terms': self._doc_terms,
+                'post_comments': self._post_comments,
+                'total_len': self._total_len,
+                'watermark': dict(self._watermark),
+            }
+            tmp = f"{path}.tmp"
+            with open(tmp, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """Load a snapshot written by save(); False if missing or unreadable."""
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False
+        if state.get('version') != 2:
+            return False
+        with self._lock:
+            self._postings = state['postings']
+            self._doc_terms = state['doc_terms']
+            self._post_comments = state['post_comments']
+            self._doc_len = {key: sum(terms.values()) for key, terms in self._doc_terms.items()}
+            self._total_len = state['total_len']
+            self._watermark = state['watermark']
+        return True
+
+
+def _document_text(kind, row):
+    if kind == 'post':
+        # Title words count twice
+        return f"{row['title']} {row['title']} {row['body']}"
+    if kind == 'comment':
+        return row['body']
+    return f"{row['title']} {row['type']} {row['host']}"
+
+
+def _make_backend():
+    if os.getenv('SEARCH_BACKEND', 'mysql') == 'memory':
+        return MemoryIndex(path=os.getenv('SEARCH_INDEX_PATH') or None)
+    return MySQLFulltextBackend()
+
+
+backend = _make_backend()
+if isinstance(backend, MemoryIndex) and backend.path:
+    atexit.register(lambda: backend._loaded and backend.save())
+
+
+def index_post(post_id, title, body):
+    backend.index('post', post_id, _document_text('post', {'title': title, 'body': body}))
+
+
+def index_comment(comment_id, post_id, body):
+    backend.index('comment', comment_id, body, post_id)
+
+
+def index_event(event_id, title, etype, host):
+    backend.index('event', event_id, _document_text('event', {'title': title, 'type': etype, 'host': host}))
+
+
+def remove(kind, doc_id):
+    backend.remove(kind, doc_id)
+
+
+def remove_post(post_id):
+    backend.remove_post(post_id)
+
+
+def search(query, kinds=KINDS, limit=20, after=None):
+    return backend.search(query, kinds, limit, after)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Maintain the in-process search index snapshot')
+    parser.add_argument('--rebuild', action='store_true')
+    parser.add_argument('--path', default=os.getenv('SEARCH_INDEX_PATH'))
+    args = parser.parse_args(argv)
+    if not args.rebuild or not args.path:
+        parser.error('--rebuild and a --path (or SEARCH_INDEX_PATH) are required')
+    index = MemoryIndex(path=args.path)
+    index.rebuild()
+    index.save()
+    print(f"indexed {len(index)} documents into {args.path}")
+
+
+if __name__ == '__main__':
+    main()
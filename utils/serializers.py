@@ -0,0 +1,124 @@
+"""Precompiled row encoders for tuple-cursor results.
+
+Routes select a model's `columns` with a plain (tuple) cursor and pass each row to
+the model's encoder. The encoder is generated once at import as a single dict
+literal indexing the tuple positionally, so no intermediate per-row dict is built.
+"""
+_DAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def iso(dt):
+    """'2025-01-05T17:00:00Z' for a naive UTC datetime (the events API format)."""
+    if dt is None:
+        return None
+    return dt.isoformat(timespec='seconds') + 'Z'
+
+
+def http_date(dt):
+    """RFC 1123 date, identical to what Flask's default JSON provider emits for datetimes."""
+    if dt is None:
+        return None
+    return (f"{_DAYS[dt.weekday()]}, {dt.day:02d} {_MONTHS[dt.month - 1]} {dt.year:04d} "
+            f"{dt.hour:02d}:{dt.minute:02d}:{dt.second:02d} GMT")
+
+
+def _compile(name, fields):
+    """Generate `encode(row)` for fields [(json_key, column, formatter_or_None)]."""
+    env = {}
+    items = []
+    for idx, (key, _column, fmt) in enumerate(fields):
+        if fmt is None:
+            items.append(f"{key!r}: row[{idx}]")
+        else:
+            env[f"_f{idx}"] = fmt
+            items.append(f"{key!r}: _f{idx}(row[{idx}])")
+    src = f"def encode_{name}(row):\n    return {{{', '.join(items)}}}\n"
+    exec(compile(src, f"<encoder {name}>", 'exec'), env)
+    return env[f"encode_{name}"]
+
+
+class Model:
+    def __init__(self, name, table_alias, fields):
+        self.columns = ', '.join(
+            f"{table_alias}.{column}" if table_alias else column for _, column, _ in fields
+        )
+        self.width = len(fields)
+        self.index = {column: i for i, (_, column, _) in enumerate(fields)}
+        self.encode = _compile(name, fields)
+
+
+EVENT_FIELDS = [
+    ('id', 'id', None),
+    ('title', 'title', None),
+    ('type', 'type', None),
+    ('startsAt', 'starts_at', iso),
+    ('host', 'host', None),
+    ('status', 'status', None),
+    ('capacity', 'capacity', None),
+    ('goingCount', 'going_count', None),
+    ('createdBy', 'created_by', None),
+    ('createdAt', 'created_at', iso),
+    ('updatedAt', 'updated_at', iso),
+]
+EVENT = Model('event', None, EVENT_FIELDS)
+# me_routes joins events as `e`
+EVENT_E = Model('event_e', 'e', EVENT_FIELDS)
+
+# Channel listing rows
+POST_SUMMARY_FIELDS = [
+    ('id', 'id', None),
+    ('title', 'title', None),
+    ('body', 'body', None),
+    ('user_id', 'user_id', None),
+    ('created_at', 'created_at', http_date),
+    ('likes', 'likes', None),
+    ('dislikes', 'dislikes', None),
+    ('comment_count', 'comment_count', None),
+    ('last_activity_at', 'last_activity_at', http_date),
+]
+POST_SUMMARY = Model('post_summary', None, POST_SUMMARY_FIELDS)
+# The feed joins posts as `p`
+POST_SUMMARY_P = Model('post_summary_p', 'p', POST_SUMMARY_FIELDS)
+
+# Single post view
+POST = Model('post', None, [
+    ('id', 'id', None),
+    ('channel_id', 'channel_id', None),
+    ('user_id', 'user_id', None),
+    ('title', 'title', None),
+    ('body', 'body', None),
+    ('is_locked', 'is_locked', None),
+    ('created_at', 'created_at', http_date),
+    ('comment_count', 'comment_count', None),
+    ('last_activity_at', 'last_activity_at', http_date),
+])
+
+COMMENT_FIELDS = [
+    ('id', 'id', None),
+    ('user_id', 'user_id', None),
+    ('body', 'body', None),
+    ('created_at', 'created_at', http_date),
+]
+COMMENT = Model('comment', None, COMMENT_FIELDS)
+# Search joins comments as `c` to their post
+COMMENT_C = Model('comment_c', 'c', COMMENT_FIELDS)
+
+CHANNEL = Model('channel', None, [
+    ('id', 'id', None),
+    ('name', 'name', None),
+    ('description', 'description', None),
+    ('created_at', 'created_at', http_date),
+])
+
+# Public author summary: posts and comments are readable without auth, so no email
+AUTHOR = Model('author', None, [
+    ('id', 'id', None),
+    ('name', 'name', None),
+])
+# Moderator views only
+AUTHOR_PRIVATE = Model('author_private', None, [
+    ('id', 'id', None),
+    ('name', 'name', None),
+    ('email', 'email', None),
+])
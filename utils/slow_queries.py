@@ -0,0 +1,133 @@
+"""Slow-query log with EXPLAIN capture, aggregated by statement fingerprint.
+
+Statements slower than DB_SLOW_QUERY_MS (default 200; 0 disables) are logged
+with their normalized SQL, parameter shape, calling route and an EXPLAIN plan.
+They are also ranked by total time at /metrics/slow_queries, without enabling
+MySQL's global slow log.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from flask import has_request_context, jsonify, request
+
+from utils import db_helper, metrics
+
+log = logging.getLogger(__name__)
+
+THRESHOLD = float(os.getenv('DB_SLOW_QUERY_MS', 200)) / 1000.0
+EXPLAIN_EVERY = 600  # seconds between EXPLAIN captures for the same fingerprint
+MAX_FINGERPRINTS = 500
+
+_EXPLAINABLE = ('select', 'update', 'delete', 'insert', 'replace')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER = re.compile(r'\b\d+\b')
+_SPACE = re.compile(r'\s+')
+
+_stats = {}
+_lock = threading.Lock()
+
+
+def fingerprint(sql):
+    """Normalize SQL so queries differing only in literals or IN-list length group together."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def param_shape(args):
+    if args is None:
+        return []
+    if isinstance(args, dict):
+        return {k: type(v).__name__ for k, v in args.items()}
+    return [type(v).__name__ for v in args]
+
+
+def _explain(cursor, sql, args):
+    if not sql.lstrip().lower().startswith(_EXPLAINABLE):
+        return None
+    # Use a plain cursor on the raw connection so the EXPLAIN itself isn't instrumented
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute("EXPLAIN " + sql, args)
+        return [dict(row) if isinstance(row, dict) else list(row) for row in explain_cursor.fetchall()]
+    except Exception as e:
+        return [{'error': str(e)}]
+    finally:
+        explain_cursor.close()
+
+
+def _on_query(sql, args, seconds, rowcount, cursor):
+    if not THRESHOLD or seconds < THRESHOLD:
+        return
+    batch = isinstance(args, (list, tuple)) and args and isinstance(args[0], (list, tuple, dict))
+    fp = fingerprint(sql)
+    route = request.endpoint if has_request_context() else 'background'
+    now = time.time()
+    with _lock:
+        entry = _stats.get(fp)
+        if entry is None:
+            if len(_stats) >= MAX_FINGERPRINTS:
+                # Forget the cheapest fingerprint to stay bounded
+                del _stats[min(_stats, key=lambda k: _stats[k]['total_seconds'])]
+            entry = _stats[fp] = {
+                'fingerprint': fp, 'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+                'routes': {}, 'param_shape': None, 'explain': None, 'explained_at': 0,
+            }
+        entry['count'] += 1
+        entry['total_seconds'] += seconds
+        entry['max_seconds'] = max(entry['max_seconds'], seconds)
+        entry['routes'][route] = entry['routes'].get(route, 0) + 1
+        entry['param_shape'] = 'batch' if batch else param_shape(args)
+        entry['last_seen'] = now
+        need_explain = not batch and now - entry['explained_at'] > EXPLAIN_EVERY
+        if need_explain:
+            entry['explained_at'] = now
+    if need_explain:
+        plan = _explain(cursor, sql, args)
+        with _lock:
+            entry['explain'] = plan
+    log.warning(
+        "slow query %.1fms route=%s rows=%s sql=%s params=%s plan=%s",
+        seconds * 1000, route, rowcount, fp, entry['param_shape'],
+        json.dumps(entry['explain'], default=str) if need_explain else '(cached)'
+    )
+
+
+def report(limit=50):
+    """Slow statements ranked by total time spent."""
+    with _lock:
+        entries = [dict(e, routes=dict(e['routes'])) for e in _stats.values()]
+    entries.sort(key=lambda e: e['total_seconds'], reverse=True)
+    for e in entries:
+        e['avg_seconds'] = e['total_seconds'] / e['count']
+        e.pop('explained_at', None)
+    return entries[:limit]
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def slow_queries_view():
+    denied = metrics.check_token()
+    if denied:
+        return jsonify({'error': 'Not found' if denied == 404 else 'Forbidden'}), denied
+    limit = request.args.get('limit', '50')
+    try:
+        limit = max(1, min(int(limit), MAX_FINGERPRINTS))
+    except Exception:
+        limit = 50
+    return jsonify({'thresholdMs': THRESHOLD * 1000, 'queries': report(limit)}), 200
+
+
+def init_app(app):
+    db_helper.add_query_hook(_on_query)
+    app.add_url_rule('/metrics/slow_queries', 'slow_queries', slow_queries_view)